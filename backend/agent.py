@@ -1,12 +1,147 @@
 import os
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from typing import Optional
+from dataclasses import dataclass, field
+import asyncio
+import hashlib
+import time
 import re
+import weakref
+
+from backend.cache import SQLCache
+from backend.columnar import ColumnarStore
+from backend.conversation import Conversation, est_suite
+from backend.config import settings
+from backend.database import Base
+from backend import models  # noqa: F401  (enregistre les tables dans Base.metadata)
+from backend.execution import QueryResult, executer, message_erreur, sql_litteral
+from backend.result_cache import ResultCache
+from backend.intents import IntentMatcher
+from backend.metrics import (ETAPE_EXECUTION, ETAPE_GENERATION, ETAPE_REPARATION, ETAPE_REPONSE,
+                             ETAPE_VALIDATION, Metriques, metriques)
+from backend.prompts import (PROMPT_REPONSE, PROMPT_SQL, budget_modele, construire, parties_reponse,
+                             parties_sql)
+from backend.summary import DonneesPrompt, preparer_donnees
+from backend.rollups import agregats_pris_en_charge
+from backend.renderer import POLICIES, POLICY_AUTO, POLICY_LLM, POLICY_LOCAL, rendre_reponse
+from backend.schema import SchemaPrompt, schema_depuis_metadata
+from backend.sql_guard import SqlGuard, delai_max
+
+# Schéma par défaut, tiré des modèles SQLAlchemy (l'API fournit à la place le
+# schéma introspecté de la base, enrichi de statistiques)
+SCHEMA_DEFAUT = schema_depuis_metadata(Base.metadata)
+SCHEMA_PROMPT = SCHEMA_DEFAUT.texte
+
+# Empreinte du schéma : une entrée de cache n'est valable que pour ce schéma
+SCHEMA_FINGERPRINT = SCHEMA_DEFAUT.fingerprint
+
+MESSAGE_NON_LIE = "Désolé, je ne peux répondre qu'aux questions concernant les clients, les produits et les commandes."
+MESSAGE_ECHEC = "Je n’ai pas pu répondre correctement. Merci de reformuler."
+
+# Actions demandées par la boucle de réparation (`AIAgent._reparation`) aux
+# versions synchrone et asynchrone de l'agent
+VALIDER = "valider"
+EXECUTER = "executer"
+REPARER = "reparer"
+
+# Issue d'une question dont le SQL a abouti mais pas la réponse (erreur du
+# modèle de chat, flux interrompu)
+ISSUE_REPONSE_ECHOUEE = "answer_failed"
+
+# Un sémaphore par (boucle asyncio, modèle) : limite les appels simultanés
+# vers chaque modèle amont, quel que soit le nombre de questions en attente.
+_llm_semaphores = weakref.WeakKeyDictionary()
+
+
+def llm_semaphore(model: str) -> asyncio.Semaphore:
+    per_model = _llm_semaphores.setdefault(asyncio.get_running_loop(), {})
+    if model not in per_model:
+        per_model[model] = asyncio.Semaphore(settings.llm_max_concurrency_per_model)
+    return per_model[model]
+
+
+@dataclass
+class Tentative:
+    """Une tentative d'exécution d'un SQL, avec la durée de chaque étape (ms)."""
+    sql: str
+    source: Optional[str] = None
+    erreur: Optional[str] = None
+    generation_ms: float = 0.0
+    validation_ms: float = 0.0
+    execution_ms: float = 0.0
+
+
+def _ms(debut: float) -> float:
+    return round((time.perf_counter() - debut) * 1000, 2)
+
+
+@dataclass
+class AgentResponse:
+    answer: str
+    sql: Optional[str] = None
+    params: Optional[dict] = None
+    # Origine du SQL : "intent", "cache" ou "llm"
+    source: Optional[str] = None
+    row_count: Optional[int] = None
+    truncated: bool = False
+    attempts: list = field(default_factory=list)
+    # Durées par étape (ms) et tokens consommés, seulement si l'agent est en mode debug
+    debug: Optional[dict] = None
+
 
 class AIAgent:
-    def __init__(self, api_key: str, base_url: str = "https://openrouter.ai/api/v1" ):
-        self.client = OpenAI(api_key=api_key, base_url=base_url)
+    def __init__(self, api_key: str, base_url: str = "https://openrouter.ai/api/v1",
+                 sql_cache: Optional[SQLCache] = None, client=None,
+                 intents: Optional[IntentMatcher] = None, answer_policy: str = POLICY_AUTO,
+                 max_rows: Optional[int] = None, result_cache: Optional[ResultCache] = None,
+                 schema: Optional[SchemaPrompt] = None, metrics: Optional[Metriques] = None,
+                 debug: bool = False, columnar: Optional[ColumnarStore] = None,
+                 conversation: Optional[Conversation] = None):
+        # Un client fourni (ex. issu du ClientRegistry) réutilise son pool de connexions
+        self.client = client if client is not None else self._creerClient(api_key, base_url)
+
+        # Cache question -> SQL partagé entre les requêtes (optionnel)
+        self.sql_cache = sql_cache
+
+        # Chemin rapide : SQL produit localement pour les questions fréquentes
+        self.intents = intents
+
+        # Quand faire appel au modèle de chat pour rédiger la réponse finale
+        if answer_policy not in POLICIES:
+            raise ValueError(f"answer_policy doit valoir {', '.join(POLICIES)}")
+        self.answer_policy = answer_policy
+
+        # Nombre maximal de lignes lues par requête (au-delà : résultat tronqué).
+        # Une instance d'agent sert une seule question à la fois.
+        self.max_rows = max_rows or settings.max_result_rows
+        self.dernier_resultat: Optional[QueryResult] = None
+        self.derniere_erreur: Optional[str] = None
+        self.tentatives: list = []
+
+        # Cache des résultats, invalidé par les écritures sur les tables lues
+        self.result_cache = result_cache
+
+        # Moteur en colonnes pour les agrégations (repli sur la base sinon)
+        self.columnar = columnar
+
+        # Schéma présenté au modèle SQL ; son empreinte indexe le cache question -> SQL
+        self.schema = schema or SCHEMA_DEFAUT
+
+        # Échanges précédents de la session, pour les questions de suivi
+        self.conversation = conversation
+
+        # Contrôles avant exécution (lecture seule, tables/colonnes connues, plan)
+        self.garde = SqlGuard(self.schema.tables, large_table_rows=settings.sql_guard_large_table_rows,
+                              max_full_scans=settings.sql_guard_max_full_scans)
+
+        # Métriques du processus, et détail propre à cette question en mode debug
+        self.metriques = metrics if metrics is not None else metriques
+        self.mesures: Optional[dict] = {"timings_ms": {}, "tokens": {}} if debug else None
+
+        # Budget de tokens du bloc de données envoyé au modèle de chat
+        self.data_token_budget = settings.answer_data_token_budget
+        self.derniere_compaction: Optional[DonneesPrompt] = None
         
         # Modèle spécialisé pour le SQL (très précis sur la structure)
         self.model_sql = "tngtech/deepseek-r1t2-chimera:free"
@@ -14,59 +149,54 @@ class AIAgent:
         # Modèle spécialisé pour le langage naturel (plus fluide et "humain")
         self.model_chat = "liquid/lfm-2.5-1.2b-thinking:free"
 
-    def sqlGeneration(self, question: str) -> str:
-        prompt = f"""
-        Tu es un expert SQL spécialisé en SQLite.
+    def _creerClient(self, api_key: str, base_url: str):
+        return OpenAI(api_key=api_key, base_url=base_url)
 
-        Contexte :
-        Tu disposes uniquement du schéma suivant :
+    def _noterDuree(self, etape: str, ms: float) -> None:
+        self.metriques.duree(etape, ms)
+        if self.mesures is not None:
+            durees = self.mesures["timings_ms"]
+            durees[etape] = round(durees.get(etape, 0.0) + ms, 2)
 
-        Table customers (
-            id INTEGER,
-            name TEXT,
-            email TEXT,
-            city TEXT,
-            created_at DATETIME
-        )
+    def _noterUsage(self, modele: str, response) -> None:
+        usage = getattr(response, "usage", None)
+        self.metriques.usage(modele, usage)
+        if self.mesures is not None and usage is not None:
+            tokens = self.mesures["tokens"]
+            for cle in ("prompt_tokens", "completion_tokens"):
+                tokens[cle] = tokens.get(cle, 0) + (getattr(usage, cle, 0) or 0)
 
-        Table products (
-            id INTEGER,
-            name TEXT,
-            category TEXT,
-            price REAL
-        )
+    def _terminer(self, reponse: AgentResponse, issue: str) -> AgentResponse:
+        self.metriques.issue(issue)
+        if self.mesures is not None:
+            self.mesures["attempts"] = len(self.tentatives)
+            reponse.debug = self.mesures
+        return reponse
 
-        Table orders (
-            id INTEGER,
-            customer_id INTEGER,
-            product_id INTEGER,
-            quantity INTEGER,
-            order_date DATETIME,
-            total_amount REAL
-        )
+    def _construirePrompt(self, nom: str, parties: list, modele: str) -> str:
+        construit = construire(parties, budget_modele(modele))
+        self.metriques.prompt(nom, construit)
+        if self.mesures is not None:
+            mesure = self.mesures.setdefault("prompts", {}).setdefault(nom, {"tokens": 0, "tokens_saved": 0})
+            mesure["tokens"] += construit.tokens
+            mesure["tokens_saved"] += construit.economises
+            if construit.reduites:
+                mesure["reduced"] = construit.reduites
+        return construit.texte
 
-        Règles STRICTES :
-        - Utilise UNIQUEMENT les tables et colonnes listées ci-dessus
-        - N’invente JAMAIS de colonnes ou de tables
-        - Respecte la syntaxe SQLite
-        - Si une jointure est nécessaire, utilise les clés logiques (customer_id, product_id)
-        - Ne mets AUCUN commentaire
-        - Ne mets AUCUN texte explicatif
-        - Retourne UNIQUEMENT la requête SQL valide
-
-        Tâche :
-        Génère la requête SQL correspondant exactement à la question suivante :
-
-        "{question}"
-        Si la question ne concerne pas les clients, produits ou commandes, retourne "NON_LIE".
-                """
-        
-        response = self.client.chat.completions.create(
-            model=self.model_sql,  
-            messages=[{"role": "user", "content": prompt}]
-        )
-        
-        sql = response.choices[0].message.content.strip()
+    def _promptSql(self, question: str, sql_echoue: Optional[str] = None,
+                   erreur: Optional[str] = None) -> str:
+        schema = self.schema.texte_pour(question, settings.schema_top_k_tables, settings.schema_pruning_min_tables)
+        agregats = (agregats_pris_en_charge(self.schema.dialecte)
+                    and any(t.nom.startswith("sales_") for t in self.schema.tables))
+        echanges = self.conversation.echanges if self.conversation is not None else None
+        return self._construirePrompt(
+            PROMPT_SQL,
+            parties_sql(schema, question, self.schema.dialecte, agregats, echanges, sql_echoue, erreur),
+            self.model_sql)
+
+    def _nettoyerSql(self, content: str) -> str:
+        sql = content.strip()
         
         sql = re.sub(r'```sql|```', '', sql).strip()
         match = re.search(r'(SELECT|WITH|INSERT|UPDATE|DELETE|CREATE)\b', sql, re.IGNORECASE)
@@ -75,46 +205,433 @@ class AIAgent:
             
         return sql
 
-    def ececution(self, db: Session, sql: str):
+    def sqlGeneration(self, question: str, sql_echoue: Optional[str] = None,
+                      erreur: Optional[str] = None) -> str:
+        t = time.perf_counter()
+        response = self.client.chat.completions.create(
+            model=self.model_sql,  
+            messages=[{"role": "user", "content": self._promptSql(question, sql_echoue, erreur)}]
+        )
+        self._noterDuree(ETAPE_GENERATION if sql_echoue is None else ETAPE_REPARATION, _ms(t))
+        self._noterUsage(self.model_sql, response)
+        return self._nettoyerSql(response.choices[0].message.content)
+
+    def executionBornee(self, db: Session, sql: str, params: Optional[dict] = None,
+                        offset: int = 0) -> QueryResult:
+        if self.columnar is not None:
+            resultat = self.columnar.executer(sql, params, max_rows=self.max_rows, offset=offset,
+                                              count_cap=settings.result_count_cap,
+                                              timeout=settings.sql_timeout_seconds)
+            if resultat is not None:
+                return resultat
+        run = self.result_cache.executer if self.result_cache is not None else executer
+        with delai_max(db, settings.sql_timeout_seconds):
+            return run(db, sql, params, max_rows=self.max_rows, offset=offset,
+                       yield_per=settings.result_yield_per, count_cap=settings.result_count_cap)
+
+    def ececution(self, db: Session, sql: str, params: Optional[dict] = None):
+        self.derniere_erreur = None
         try:
-            result = db.execute(text(sql))
-            return [dict(row._mapping) for row in result]
-        except Exception:
+            self.dernier_resultat = self.executionBornee(db, sql, params)
+            return self.dernier_resultat.to_dicts()
+        except Exception as e:
+            self.derniere_erreur = message_erreur(e)
             return None
 
-    def genererReponseNaturelle(self, question: str, data: list) -> str:
-        prompt = f"""
-        Tu es un assistant intelligent. Un utilisateur a posé la question : "{question}"
-        Les données récupérées de la base de données sont : {data}
-        
-        Rédige une réponse claire et concise en français en langage naturel basée sur ces données.
-        Si les données sont vides, indique qu'aucune information n'a été trouvée.
+    def validationLocale(self, db: Session, sql: str, params: Optional[dict] = None) -> Optional[str]:
+        """Motif de refus de la requête (garde-fou, compilation, plan) sans
+        l'exécuter, ou None."""
+        return self.garde.verifier(db, sql, params)
+
+    def _repriseAutorisee(self, numero: int, debut: float) -> bool:
+        return (numero + 1 < settings.sql_max_attempts
+                and time.monotonic() - debut < settings.sql_repair_budget_seconds)
+
+    def _reparation(self, sql: str, params: Optional[dict], source: str, generation_ms: float = 0.0):
+        """Boucle validation -> exécution -> réparation, commune aux deux agents.
+
+        Générateur : il émet les actions qui passent par la base ou le modèle,
+        `(VALIDER, sql, params)`, `(EXECUTER, sql, params)` ou
+        `(REPARER, sql, erreur)`, reçoit leur résultat et retourne
+        `(sql, params, source, data)`. Les durées, métriques et tentatives
+        sont tenues ici.
         """
-        
+        debut = time.monotonic()
+        self.tentatives = []
+        for numero in range(settings.sql_max_attempts):
+            tentative = Tentative(sql=sql, source=source, generation_ms=generation_ms)
+            self.tentatives.append(tentative)
+            # Les gabarits et le cache ne contiennent que du SQL déjà exécuté avec
+            # succès : seuls les contrôles textuels s'appliquent
+            t = time.perf_counter()
+            erreur = (yield VALIDER, sql, params) if source == "llm" else self.garde.verifier_statique(sql)
+            tentative.validation_ms = _ms(t)
+            self._noterDuree(ETAPE_VALIDATION, tentative.validation_ms)
+            if erreur is None:
+                t = time.perf_counter()
+                data = yield EXECUTER, sql, params
+                tentative.execution_ms = _ms(t)
+                self._noterDuree(ETAPE_EXECUTION, tentative.execution_ms)
+                if data is not None:
+                    return sql, params, source, data
+                erreur = self.derniere_erreur
+            tentative.erreur = erreur or "erreur inconnue"
+
+            if not self._repriseAutorisee(numero, debut):
+                break
+            self.metriques.reparation()
+            t = time.perf_counter()
+            precedent, sql, params, source = sql, (yield REPARER, sql, erreur), None, "llm"
+            generation_ms = _ms(t)
+            if sql == "NON_LIE" or sql == precedent:
+                break
+        return sql, params, source, None
+
+    def _realiser(self, db: Session, question_text: str, action: str, sql: str, valeur):
+        """Exécute une action de `_reparation` (`valeur` : paramètres ou erreur)."""
+        if action == VALIDER:
+            return self.validationLocale(db, sql, valeur)
+        if action == EXECUTER:
+            return self.ececution(db, sql, valeur)
+        return self.sqlGeneration(question_text, sql, valeur)
+
+    def _executerAvecReparation(self, db: Session, question_text: str, sql: str,
+                                params: Optional[dict], source: str, generation_ms: float = 0.0):
+        """Valide puis exécute le SQL ; en cas d'erreur, renvoie la requête et
+        l'erreur exacte au modèle pour correction, dans la limite de
+        `sql_max_attempts` tentatives et de `sql_repair_budget_seconds`.
+
+        Retourne `(sql, params, source, data)`, `data` valant None en cas d'échec.
+        Le détail des tentatives est conservé dans `self.tentatives`.
+        """
+        etapes = self._reparation(sql, params, source, generation_ms)
+        action = next(etapes)
+        while True:
+            try:
+                action = etapes.send(self._realiser(db, question_text, *action))
+            except StopIteration as fin:
+                return fin.value
+
+    def _blocDonnees(self, data: list, token_budget: Optional[int] = None) -> str:
+        compaction = preparer_donnees(data, token_budget=self.data_token_budget if token_budget is None
+                                      else min(token_budget, self.data_token_budget),
+                                      echantillon=settings.summary_sample_rows,
+                                      top_k=settings.summary_top_k)
+        self.derniere_compaction = compaction
+        if not compaction.resume:
+            bloc = f"Les données récupérées de la base de données sont : {compaction.texte}"
+        else:
+            bloc = ("Les données récupérées sont trop volumineuses pour être listées ; "
+                    f"en voici un résumé :\n{compaction.texte}")
+        resultat = self.dernier_resultat
+        if resultat is not None and resultat.truncated:
+            total = resultat.total_estimate
+            bloc += (f"\nRésultat tronqué à {len(data)} lignes"
+                     + (f" sur environ {total}." if total else "."))
+        return bloc
+
+    def _promptReponse(self, question: str, data: list) -> str:
+        # Au-delà du budget du modèle, les données sont résumées plus fortement
+        return self._construirePrompt(
+            PROMPT_REPONSE,
+            parties_reponse(question, self._blocDonnees(data), lambda budget: self._blocDonnees(data, budget)),
+            self.model_chat)
+
+    def _reponseLocale(self, data: list) -> Optional[str]:
+        """Réponse rédigée sans LLM, ou None si le modèle de chat est nécessaire."""
+        if self.answer_policy == POLICY_LLM:
+            return None
+        return rendre_reponse(data, force=self.answer_policy == POLICY_LOCAL)
+
+    def genererReponseNaturelle(self, question: str, data: list) -> str:
+        t = time.perf_counter()
         response = self.client.chat.completions.create(
             model=self.model_chat,  # Utilise le modèle Chat
-            messages=[{"role": "user", "content": prompt}]
+            messages=[{"role": "user", "content": self._promptReponse(question, data)}]
         )
+        self._noterDuree(ETAPE_REPONSE, _ms(t))
+        self._noterUsage(self.model_chat, response)
         return response.choices[0].message.content.strip()
     
-    def question(self, db: Session, question_text: str):
-        sql = self.sqlGeneration(question_text)
+    def _sqlLocal(self, question_text: str):
+        """Cherche un SQL sans appeler le modèle : gabarit d'intention, puis cache.
+
+        Retourne `(sql, params, source)` avec `source` valant "intent",
+        "cache" ou None si le modèle SQL doit être appelé.
+        """
+        if self.intents is not None:
+            match = self.intents.match(question_text)
+            if match is not None:
+                return match.sql, match.params, "intent"
+        if self.sql_cache is not None:
+            # Un succès du cache évite complètement l'appel au modèle SQL
+            for empreinte in self._empreintesLecture(question_text):
+                sql = self.sql_cache.get(question_text, empreinte)
+                if sql is not None:
+                    return sql, None, "cache"
+        return None, None, None
+
+    def _memoriserSql(self, question_text: str, sql: str) -> None:
+        # On ne mémorise que les requêtes qui se sont exécutées sans erreur
+        if self.sql_cache is not None:
+            self.sql_cache.set(question_text, self._empreinteCache(), sql)
+
+    def _empreinteCache(self) -> str:
+        # SQL généré avec le contexte de la conversation dans le prompt : il peut
+        # dépendre de la requête précédente, l'entrée reste propre à celle-ci
+        precedent = self.conversation.precedent if self.conversation is not None else None
+        if precedent is None:
+            return self.schema.fingerprint
+        return f"{self.schema.fingerprint}:{hashlib.sha256(precedent.sql.encode('utf-8')).hexdigest()[:12]}"
+
+    def _empreintesLecture(self, question_text: str) -> list:
+        """Entrées du cache à consulter, dans l'ordre. Une question autonome
+        reprend d'abord le SQL écrit sans contexte (entrée du schéma) ; une
+        question de suivi ("Et pour Lyon ?") seulement celui de sa conversation."""
+        empreinte = self._empreinteCache()
+        if empreinte == self.schema.fingerprint:
+            return [empreinte]
+        if est_suite(question_text):
+            return [empreinte]
+        return [self.schema.fingerprint, empreinte]
+
+    def _memoriserEchange(self, question_text: str, sql: str, params: Optional[dict], data: list) -> None:
+        if self.conversation is None:
+            return
+        # Paramètres d'un gabarit remplacés par leurs valeurs : le modèle modifie
+        # une requête exécutable, sans paramètre à lier
+        sql = sql_litteral(sql, params, self.schema.dialecte)
+        self.conversation.ajouter(question_text, sql, self.dernier_resultat, len(data))
+
+    def _reponseDonnees(self, sql: str, params: Optional[dict], source: str,
+                        data: list) -> AgentResponse:
+        resultat = self.dernier_resultat
+        self.metriques.sql(source, len(data))
+        return AgentResponse(
+            answer="", sql=sql, params=params, source=source, row_count=len(data),
+            truncated=resultat.truncated if resultat is not None else False,
+            attempts=self.tentatives,
+        )
+
+    def questionDetaillee(self, db: Session, question_text: str) -> AgentResponse:
+        sql, params, source = self._sqlLocal(question_text)
+        t = time.perf_counter()
+        if sql is None:
+            sql, source = self.sqlGeneration(question_text), "llm"
+        generation_ms = _ms(t)
         
         if sql == "NON_LIE":
-            return "Désolé, je ne peux répondre qu'aux questions concernant les clients, les produits et les commandes."
+            return self._terminer(AgentResponse(answer=MESSAGE_NON_LIE), "out_of_scope")
         
-        data = self.ececution(db, sql)
+        sql, params, source, data = self._executerAvecReparation(
+            db, question_text, sql, params, source, generation_ms)
 
         if data is None:
-            # Correction ici : utilisation de sqlGeneration au lieu de generate_sql
-            sql = self.sqlGeneration(
-                question_text + " (attention : génère une requête SQL valide SQLite)"
+            return self._terminer(AgentResponse(answer=MESSAGE_ECHEC, sql=sql, attempts=self.tentatives),
+                                  "failed")
+
+        if source == "llm":
+            self._memoriserSql(question_text, sql)
+        self._memoriserEchange(question_text, sql, params, data)
+
+        reponse = self._reponseDonnees(sql, params, source, data)
+        try:
+            answer = self._reponseLocale(data)
+            if answer is None:
+                # Correction ici : utilisation de genererReponseNaturelle au lieu de generate_natural_response
+                answer = self.genererReponseNaturelle(question_text, data)
+        except Exception:
+            self._terminer(reponse, ISSUE_REPONSE_ECHOUEE)
+            raise
+        reponse.answer = answer
+        # Issue enregistrée une fois la réponse rédigée
+        return self._terminer(reponse, "ok")
+
+    def question(self, db: Session, question_text: str):
+        return self.questionDetaillee(db, question_text).answer
+
+
+class AsyncAIAgent(AIAgent):
+    """Variante asynchrone de l'agent : appels LLM via AsyncOpenAI bornés par
+    un sémaphore par modèle, exécution SQL déportée dans un thread.
+
+    `db_lock` sérialise l'accès à une session partagée entre plusieurs agents
+    (traitement par lots) : une Session SQLAlchemy ne supporte pas les
+    accès concurrents depuis plusieurs threads.
+    """
+
+    def __init__(self, *args, db_lock: Optional[asyncio.Lock] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.db_lock = db_lock
+
+    def _creerClient(self, api_key: str, base_url: str):
+        return AsyncOpenAI(api_key=api_key, base_url=base_url)
+
+    async def _dansSession(self, fonction, *args):
+        if self.db_lock is None:
+            return await asyncio.to_thread(fonction, *args)
+        async with self.db_lock:
+            return await asyncio.to_thread(fonction, *args)
+
+    async def sqlGeneration(self, question: str, sql_echoue: Optional[str] = None,
+                            erreur: Optional[str] = None) -> str:
+        t = time.perf_counter()
+        async with llm_semaphore(self.model_sql):
+            response = await self.client.chat.completions.create(
+                model=self.model_sql,
+                messages=[{"role": "user", "content": self._promptSql(question, sql_echoue, erreur)}]
             )
-            # Correction ici : utilisation de ececution au lieu de execute_query
-            data = self.ececution(db, sql)
+        self._noterDuree(ETAPE_GENERATION if sql_echoue is None else ETAPE_REPARATION, _ms(t))
+        self._noterUsage(self.model_sql, response)
+        return self._nettoyerSql(response.choices[0].message.content)
+
+    async def ececution(self, db: Session, sql: str, params: Optional[dict] = None):
+        return await self._dansSession(AIAgent.ececution, self, db, sql, params)
+
+    async def validationLocale(self, db: Session, sql: str, params: Optional[dict] = None) -> Optional[str]:
+        return await self._dansSession(AIAgent.validationLocale, self, db, sql, params)
+
+    async def _realiser(self, db: Session, question_text: str, action: str, sql: str, valeur):
+        # Les méthodes appelées sont ici des coroutines
+        return await AIAgent._realiser(self, db, question_text, action, sql, valeur)
+
+    async def _deroulerReparation(self, db: Session, question_text: str, sql: str,
+                                  params: Optional[dict], source: str, generation_ms: float = 0.0):
+        """Pilote `_reparation` en émettant `("sql", sql)` juste avant chaque
+        exécution (SQL validé), puis `("fin", (sql, params, source, data))`."""
+        etapes = self._reparation(sql, params, source, generation_ms)
+        action = next(etapes)
+        while True:
+            if action[0] == EXECUTER:
+                yield "sql", action[1]
+            try:
+                action = etapes.send(await self._realiser(db, question_text, *action))
+            except StopIteration as fin:
+                yield "fin", fin.value
+                return
+
+    async def _executerAvecReparation(self, db: Session, question_text: str, sql: str,
+                                      params: Optional[dict], source: str, generation_ms: float = 0.0):
+        async for evenement, valeur in self._deroulerReparation(db, question_text, sql, params, source,
+                                                                 generation_ms):
+            if evenement == "fin":
+                return valeur
+
+    async def genererReponseNaturelle(self, question: str, data: list) -> str:
+        t = time.perf_counter()
+        async with llm_semaphore(self.model_chat):
+            response = await self.client.chat.completions.create(
+                model=self.model_chat,
+                messages=[{"role": "user", "content": self._promptReponse(question, data)}]
+            )
+        self._noterDuree(ETAPE_REPONSE, _ms(t))
+        self._noterUsage(self.model_chat, response)
+        return response.choices[0].message.content.strip()
+
+    async def genererReponseNaturelleStream(self, question: str, data: list):
+        """Produit la réponse en langage naturel morceau par morceau."""
+        t = time.perf_counter()
+        async with llm_semaphore(self.model_chat):
+            stream = await self.client.chat.completions.create(
+                model=self.model_chat,
+                messages=[{"role": "user", "content": self._promptReponse(question, data)}],
+                stream=True,
+                # Dernier morceau sans texte, porteur des tokens consommés
+                stream_options={"include_usage": True},
+            )
+            async for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    self._noterUsage(self.model_chat, chunk)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        self._noterDuree(ETAPE_REPONSE, _ms(t))
+
+    async def _deroulerSqlEtDonnees(self, db: Session, question_text: str):
+        """Obtient le SQL (gabarit, cache ou modèle) puis l'exécute, avec réparation.
+
+        Émet `("sql", sql)` dès qu'un SQL validé part à l'exécution (à nouveau
+        après une réparation), puis `("fin", (reponse, data))` : quand la
+        question ne peut pas aboutir, `reponse.answer` contient déjà le message
+        final et `data` vaut None. Sinon l'issue reste à enregistrer par
+        l'appelant, une fois la réponse rédigée.
+        """
+        sql, params, source = self._sqlLocal(question_text)
+        t = time.perf_counter()
+        if sql is None:
+            sql, source = await self.sqlGeneration(question_text), "llm"
+        generation_ms = _ms(t)
+
+        if sql == "NON_LIE":
+            yield "fin", (self._terminer(AgentResponse(answer=MESSAGE_NON_LIE), "out_of_scope"), None)
+            return
+
+        async for evenement, valeur in self._deroulerReparation(db, question_text, sql, params, source,
+                                                                 generation_ms):
+            if evenement == "sql":
+                yield evenement, valeur
+        sql, params, source, data = valeur
 
         if data is None:
-            return "Je n’ai pas pu répondre correctement. Merci de reformuler."
-            
-        # Correction ici : utilisation de genererReponseNaturelle au lieu de generate_natural_response
-        return self.genererReponseNaturelle(question_text, data)
+            yield "fin", (self._terminer(AgentResponse(answer=MESSAGE_ECHEC, sql=sql, attempts=self.tentatives),
+                                         "failed"), None)
+            return
+
+        if source == "llm":
+            self._memoriserSql(question_text, sql)
+        self._memoriserEchange(question_text, sql, params, data)
+        yield "fin", (self._reponseDonnees(sql, params, source, data), data)
+
+    async def _sqlEtDonnees(self, db: Session, question_text: str):
+        """`(reponse, data)` : voir `_deroulerSqlEtDonnees`."""
+        async for evenement, valeur in self._deroulerSqlEtDonnees(db, question_text):
+            if evenement == "fin":
+                return valeur
+
+    async def questionDetaillee(self, db: Session, question_text: str) -> AgentResponse:
+        reponse, data = await self._sqlEtDonnees(db, question_text)
+        if data is None:
+            return reponse
+        try:
+            answer = self._reponseLocale(data)
+            if answer is None:
+                answer = await self.genererReponseNaturelle(question_text, data)
+        except BaseException:
+            # Annulation comprise (client parti, délai dépassé)
+            self._terminer(reponse, ISSUE_REPONSE_ECHOUEE)
+            raise
+        reponse.answer = answer
+        return self._terminer(reponse, "ok")
+
+    async def question(self, db: Session, question_text: str):
+        return (await self.questionDetaillee(db, question_text)).answer
+
+    async def questionStream(self, db: Session, question_text: str, preview_rows: int = 5):
+        """Déroule le pipeline en émettant des événements `(nom, contenu)` :
+        `sql` dès que la requête validée part à l'exécution (un nouveau `sql`
+        remplace le précédent après une réparation), puis `data` (nombre de
+        lignes et aperçu), puis `token` pour chaque morceau de la réponse, et
+        enfin `done`. Un échec produit un événement `message` avant `done`."""
+        async for evenement, valeur in self._deroulerSqlEtDonnees(db, question_text):
+            if evenement == "sql":
+                yield "sql", {"sql": valeur}
+        reponse, data = valeur
+        if data is None:
+            yield "message", {"text": reponse.answer}
+            yield "done", {}
+            return
+
+        yield "data", {"row_count": reponse.row_count, "truncated": reponse.truncated,
+                       "preview": data[:preview_rows]}
+        try:
+            answer = self._reponseLocale(data)
+            if answer is not None:
+                yield "token", {"text": answer}
+            else:
+                async for token in self.genererReponseNaturelleStream(question_text, data):
+                    yield "token", {"text": token}
+        except BaseException:
+            # Erreur du modèle, ou flux fermé par le client (GeneratorExit)
+            self._terminer(reponse, ISSUE_REPONSE_ECHOUEE)
+            raise
+        self._terminer(reponse, "ok")
+        yield "done", {}
@@ -0,0 +1,96 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from backend.agent import MESSAGE_NON_LIE, AgentResponse, AsyncAIAgent
+from backend.cache import normalize_question
+
+STATUT_OK = "ok"
+STATUT_HORS_PERIMETRE = "out_of_scope"
+STATUT_ECHEC = "failed"
+STATUT_ERREUR = "error"
+
+
+@dataclass
+class ElementLot:
+    """Résultat d'une question du lot, à sa position d'origine."""
+    question: str
+    statut: str
+    reponse: Optional[AgentResponse] = None
+    erreur: Optional[str] = None
+    duree_ms: float = 0.0
+    # Question identique (une fois normalisée) à une question précédente du lot
+    doublon: bool = False
+
+
+@contextmanager
+def session_lecture(engine):
+    """Session dont toutes les requêtes lisent le même état de la base : une
+    transaction de lecture ouverte pour toute la durée du lot. Les rollbacks
+    de l'agent (SQL invalide) n'annulent qu'un point de sauvegarde, la
+    transaction englobante et son instantané sont conservés."""
+    with engine.connect() as connexion:
+        if connexion.dialect.name == "sqlite":
+            # pysqlite n'ouvre pas de transaction pour un SELECT : BEGIN explicite
+            connexion.exec_driver_sql("BEGIN")
+        else:
+            connexion = connexion.execution_options(isolation_level="REPEATABLE READ")
+            connexion.begin()
+        db = Session(bind=connexion, join_transaction_mode="create_savepoint")
+        try:
+            yield db
+        finally:
+            db.close()
+            connexion.rollback()
+
+
+def _statut(reponse: AgentResponse) -> str:
+    if reponse.row_count is not None:
+        return STATUT_OK
+    return STATUT_HORS_PERIMETRE if reponse.answer == MESSAGE_NON_LIE else STATUT_ECHEC
+
+
+async def traiter_lot(questions: list, creer_agent: Callable[[asyncio.Lock], AsyncAIAgent],
+                      db: Session, parallelisme: int = 8) -> list:
+    """Répond à une liste de questions en réutilisant le pipeline de l'agent.
+
+    Les questions identiques ne sont traitées qu'une fois. Jusqu'à
+    `parallelisme` questions progressent en même temps (appels LLM
+    concurrents) ; les requêtes SQL passent l'une après l'autre par la
+    session `db`, ouverte par l'appelant dans une seule transaction de
+    lecture : tout le lot voit le même état de la base.
+    """
+    verrou_db = asyncio.Lock()
+    limite = asyncio.Semaphore(parallelisme)
+    uniques = {}
+    for question in questions:
+        uniques.setdefault(normalize_question(question), question)
+
+    async def traiter(question: str) -> ElementLot:
+        async with limite:
+            debut = time.perf_counter()
+            try:
+                reponse = await creer_agent(verrou_db).questionDetaillee(db, question)
+                element = ElementLot(question, _statut(reponse), reponse=reponse)
+            except Exception as e:
+                element = ElementLot(question, STATUT_ERREUR, erreur=str(e))
+            element.duree_ms = round((time.perf_counter() - debut) * 1000, 2)
+            return element
+
+    cles = list(uniques)
+    elements = dict(zip(cles, await asyncio.gather(*(traiter(uniques[cle]) for cle in cles))))
+
+    resultats, vues = [], set()
+    for question in questions:
+        cle = normalize_question(question)
+        element = elements[cle]
+        if cle in vues:
+            element = ElementLot(question, element.statut, element.reponse, element.erreur,
+                                 element.duree_ms, doublon=True)
+        vues.add(cle)
+        resultats.append(element)
+    return resultats
@@ -0,0 +1,109 @@
+"""Initialisation de la base, à lancer une fois avant les workers de l'API.
+
+Crée les tables et index manquants, peuple la base si nécessaire, calcule
+les agrégats puis, en dernier, pose le drapeau de disponibilité dans
+`app_metadata`. Relancer la commande est sans effet sur une base déjà
+prête ; sur une base dont l'initialisation a été interrompue, elle reprend
+les étapes (toutes idempotentes) sans repeupler.
+
+Usage : python -m backend.bootstrap [--scale 1] [--seed 42]
+"""
+import argparse
+import time
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import DBAPIError, IntegrityError
+
+from backend.database import Base
+from backend.models import AppMetadata, Customer
+from backend.rollups import rafraichir_agregats
+from backend.seeding import Volumes, generer
+from backend.utils import optimiser_base
+
+CLE_PRET = "ready"
+# Posée avec les données initiales : verrou contre deux peuplements concurrents
+CLE_PEUPLEE = "seeded"
+
+
+def base_prete(engine) -> bool:
+    """Lecture seule : vrai si `bootstrap` a déjà été exécuté sur cette base."""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(
+                select(AppMetadata.value).where(AppMetadata.key == CLE_PRET)
+            ).first() is not None
+    except DBAPIError:
+        # Table absente : base jamais initialisée
+        return False
+
+
+def _tolerer_existants(etape, engine, tentatives: int = 3) -> None:
+    """Exécute une étape de création (tables, index) en tolérant les objets
+    créés entre-temps par un bootstrap concurrent : l'étape est relancée
+    pour créer ceux qui manquent encore."""
+    for _ in range(tentatives):
+        try:
+            etape(engine)
+            return
+        except DBAPIError as e:
+            if "already exists" not in str(e.orig).lower():
+                raise
+    etape(engine)
+
+
+def bootstrap(engine, scale: float = 1.0, seed: Optional[int] = None) -> bool:
+    """Initialise la base ; retourne False si elle l'était déjà (ou si un
+    bootstrap concurrent a posé le drapeau en premier)."""
+    if base_prete(engine):
+        return False
+
+    _tolerer_existants(Base.metadata.create_all, engine)
+    try:
+        with engine.begin() as conn:
+            # La clé est écrite en premier : elle prend le verrou d'écriture et
+            # empêche deux peuplements concurrents.
+            conn.execute(insert(AppMetadata).values(
+                key=CLE_PEUPLEE, value="1", updated_at=datetime.now()))
+            # Bases peuplées avant l'introduction du drapeau : données conservées
+            if conn.execute(select(Customer.id).limit(1)).first() is None:
+                generer(conn, Volumes.depuis_echelle(scale), seed=seed)
+    except IntegrityError:
+        # Déjà peuplée, par un bootstrap concurrent ou interrompu
+        pass
+
+    rafraichir_agregats(engine)
+    _tolerer_existants(optimiser_base, engine)
+    # Drapeau posé en dernier : les workers n'utilisent la base qu'une fois complète
+    try:
+        with engine.begin() as conn:
+            conn.execute(insert(AppMetadata).values(
+                key=CLE_PRET, value="1", updated_at=datetime.now()))
+    except IntegrityError:
+        return False
+    return True
+
+
+def main():
+    from backend.database import engine
+    from backend.result_cache import installer
+
+    # Versions publiées : le cache des workers déjà lancés voit les écritures
+    installer(engine)
+
+    parser = argparse.ArgumentParser(description="Initialisation de la base")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="facteur d'échelle du jeu de données initial")
+    parser.add_argument("--seed", type=int, default=None, help="graine pour un jeu de données reproductible")
+    args = parser.parse_args()
+
+    debut = time.perf_counter()
+    if bootstrap(engine, scale=args.scale, seed=args.seed):
+        print(f"Base initialisée en {time.perf_counter() - debut:.1f} s")
+    else:
+        print("Base déjà initialisée")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Optional
+
+
+def normalize_question(question: str) -> str:
+    """Replie casse, accents, ponctuation et espaces d'une question."""
+    text = unicodedata.normalize("NFKD", question.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^\w]+", " ", text)
+    return " ".join(text.split())
+
+
+class SQLCache:
+    """Cache persistant question normalisée + empreinte du schéma -> SQL.
+
+    Éviction LRU (via `last_access`) au-delà de `max_entries` et expiration
+    des entrées plus anciennes que `ttl_seconds`.
+    """
+
+    def __init__(self, path: str, max_entries: int = 5000, ttl_seconds: int = 7 * 24 * 3600):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sql_cache (
+                question TEXT NOT NULL,
+                schema_fingerprint TEXT NOT NULL,
+                sql TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (question, schema_fingerprint)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_sql_cache_last_access ON sql_cache (last_access)"
+        )
+
+    def get(self, question: str, schema_fingerprint: str) -> Optional[str]:
+        key = normalize_question(question)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sql, created_at FROM sql_cache WHERE question = ? AND schema_fingerprint = ?",
+                (key, schema_fingerprint),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            sql, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute(
+                    "DELETE FROM sql_cache WHERE question = ? AND schema_fingerprint = ?",
+                    (key, schema_fingerprint),
+                )
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE sql_cache SET last_access = ? WHERE question = ? AND schema_fingerprint = ?",
+                (now, key, schema_fingerprint),
+            )
+            self.hits += 1
+            return sql
+
+    def set(self, question: str, schema_fingerprint: str, sql: str) -> None:
+        key = normalize_question(question)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sql_cache VALUES (?, ?, ?, ?, ?)",
+                (key, schema_fingerprint, sql, now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM sql_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        self._conn.execute(
+            """
+            DELETE FROM sql_cache WHERE rowid IN (
+                SELECT rowid FROM sql_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_entries,),
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM sql_cache")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sql_cache").fetchone()[0]
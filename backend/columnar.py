@@ -0,0 +1,260 @@
+"""Copie en colonnes (DuckDB) des tables volumineuses, pour les agrégations.
+
+Les commandes sont ajoutées, jamais modifiées : la copie ne lit que les
+lignes dont l'identifiant dépasse celui déjà copié. Les tables de dimension
+(produits, clients), petites et modifiables, sont recopiées entièrement dès
+que leur version (voir `backend.result_cache.TableVersions`) change. La
+division entière suit SQLite (`SUM(quantity) / COUNT(*)` reste entier). Une requête de lecture qui
+agrège des tables copiées est exécutée par DuckDB ; toute autre requête,
+ou toute erreur de DuckDB (fonction SQLite inconnue, par exemple), repasse
+par le chemin SQLAlchemy habituel.
+
+DuckDB et PyArrow sont optionnels : `pip install duckdb pyarrow`.
+"""
+import re
+import threading
+import time
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import Date, DateTime, Integer, Numeric, select, func
+
+from backend.execution import LECTURE_RE, QueryResult, borner_sql, nettoyer_sql
+from backend.models import Customer, Order, Product
+from backend.result_cache import LITTERAL_RE, canonicaliser_sql, table_versions, tables_lues
+from backend.sql_guard import DelaiDepasse
+
+try:
+    import duckdb
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - dépendances optionnelles
+    duckdb = pa = None
+
+TABLES_MIROIR = [Order.__table__, Product.__table__, Customer.__table__]
+# Tables recopiées entièrement à chaque modification
+DIMENSIONS = (Product.__table__.name, Customer.__table__.name)
+AGREGAT_RE = re.compile(r"\bgroup\s+by\b|\b(?:count|sum|avg|min|max|total)\s*\(")
+# Opérateurs dont le résultat diffère entre SQLite et DuckDB : LIKE insensible
+# à la casse (ASCII) dans SQLite seulement, GLOB/REGEXP/MATCH absents ou
+# différents, || et NULL selon le type des opérandes
+OPERATEUR_DIVERGENT_RE = re.compile(r"\b(?:like|glob|regexp|match)\b|\|\|")
+APPEL_RE = re.compile(r"\b([a-z_]\w*)\s*\(")
+# Fonctions au résultat identique dans les deux moteurs ; toute autre (dates,
+# strftime, lower/upper hors ASCII, round, substr, total...) repasse par SQLite
+FONCTIONS_SURES = {"count", "sum", "avg", "min", "max", "coalesce", "nullif", "abs"}
+# Mots-clés suivis d'une parenthèse qui ne sont pas des appels de fonction
+MOTS_CLES = {"in", "exists", "as", "from", "join", "on", "and", "or", "not", "where", "over",
+             "filter", "values", "using", "select", "by", "having", "then", "else", "when", "union", "all"}
+PARAM_RE = re.compile(r"(?<!:):([a-zA-Z_]\w*)")
+
+
+def _type_duckdb(type_) -> tuple:
+    """(type DuckDB, type Arrow) d'une colonne SQLAlchemy."""
+    if isinstance(type_, DateTime):
+        return "TIMESTAMP", pa.timestamp("us")
+    if isinstance(type_, Date):
+        return "DATE", pa.date32()
+    if isinstance(type_, Numeric):
+        return "DOUBLE", pa.float64()
+    if isinstance(type_, Integer):
+        return "BIGINT", pa.int64()
+    return "VARCHAR", pa.string()
+
+
+def parametres_duckdb(sql: str) -> str:
+    """`:nom` (SQLAlchemy) -> `$nom` (DuckDB), hors littéraux."""
+    morceaux, position = [], 0
+    for m in LITTERAL_RE.finditer(sql):
+        morceaux.append(PARAM_RE.sub(r"$\1", sql[position:m.start()]))
+        morceaux.append(m.group(0))
+        position = m.end()
+    morceaux.append(PARAM_RE.sub(r"$\1", sql[position:]))
+    return "".join(morceaux)
+
+
+def _valeur(v):
+    # Mêmes valeurs que le chemin SQLite, où les dates sont des chaînes ISO
+    return v.isoformat() if isinstance(v, (date, datetime)) else v
+
+
+class ColumnarStore:
+    """Miroir DuckDB de `tables`, resynchronisé au plus toutes les
+    `intervalle_sync` secondes avant une requête."""
+
+    def __init__(self, engine, tables: list = TABLES_MIROIR, chemin: str = ":memory:",
+                 intervalle_sync: float = 2.0, taille_lot: int = 100_000,
+                 dimensions: tuple = DIMENSIONS, versions=table_versions):
+        if duckdb is None:
+            raise RuntimeError("Moteur en colonnes indisponible : pip install duckdb pyarrow")
+        self.engine = engine
+        self.tables = {t.name: t for t in tables}
+        self.intervalle_sync = intervalle_sync
+        self.taille_lot = taille_lot
+        self.dimensions = {nom for nom in dimensions if nom in self.tables}
+        self.versions = versions
+        self._connexion = duckdb.connect(chemin)
+        # Comme SQLite : division entière (sinon 7 / 2 = 3.5) et NULL plus petit que
+        # toute valeur dans les tris ; GLOBAL pour les curseurs
+        self._connexion.execute("SET GLOBAL integer_division = true")
+        self._connexion.execute("SET GLOBAL default_null_order = 'nulls_first_on_asc_last_on_desc'")
+        self._sync_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._prochaine_sync = 0.0
+        # Dernier identifiant copié par table
+        self.copie = {}
+        # Version de chaque dimension lors de sa dernière copie (None : jamais copiée)
+        self._versions_copiees = dict.fromkeys(self.dimensions)
+        self.requetes = 0
+        self.replis = 0
+        for t in tables:
+            colonnes = ", ".join(f"{c.name} {_type_duckdb(c.type)[0]}" for c in t.columns)
+            self._connexion.execute(f"CREATE TABLE IF NOT EXISTS {t.name} ({colonnes})")
+            self.copie[t.name] = self._connexion.execute(f"SELECT COALESCE(MAX(id), 0) FROM {t.name}").fetchone()[0]
+
+    def _dimensions_modifiees(self) -> list:
+        return [nom for nom in self.dimensions
+                if self.versions.versions((nom,)) != self._versions_copiees[nom]]
+
+    def _copier(self, conn, nom: str, t, depuis: int) -> int:
+        colonnes = [c.name for c in t.columns]
+        resultat = conn.exec_driver_sql(
+            f"SELECT {', '.join(colonnes)} FROM {nom} WHERE id > {int(depuis)} ORDER BY id")
+        schema = pa.schema([(c.name, _type_duckdb(c.type)[1]) for c in t.columns])
+        copiees = 0
+        while True:
+            lignes = resultat.fetchmany(self.taille_lot)
+            if not lignes:
+                break
+            lot = pa.table([pa.array(valeurs).cast(champ.type) if champ.type == pa.date32()
+                            else pa.array(valeurs, type=champ.type)
+                            for valeurs, champ in zip(zip(*lignes), schema)], schema=schema)
+            self._connexion.register("lot_arrow", lot)
+            self._connexion.execute(f"INSERT INTO {nom} SELECT * FROM lot_arrow")
+            self._connexion.unregister("lot_arrow")
+            self.copie[nom] = lignes[-1][colonnes.index("id")]
+            copiees += len(lignes)
+        return copiees
+
+    def synchroniser(self) -> int:
+        """Copie les commandes ajoutées depuis la dernière synchronisation et
+        recopie les dimensions modifiées ; retourne le nombre de lignes copiées."""
+        copiees = 0
+        with self._sync_lock:
+            # Versions lues avant la copie : une écriture pendant la copie
+            # provoquera une nouvelle copie à la synchronisation suivante
+            modifiees = {nom: self.versions.versions((nom,)) for nom in self._dimensions_modifiees()}
+            with self.engine.connect() as conn:
+                for nom, t in self.tables.items():
+                    if nom not in self.dimensions:
+                        copiees += self._copier(conn, nom, t, self.copie[nom])
+                    elif nom in modifiees:
+                        # Remplacement dans une transaction : les lectures voient l'ancienne ou la nouvelle copie
+                        self._connexion.execute("BEGIN TRANSACTION")
+                        try:
+                            self._connexion.execute(f"DELETE FROM {nom}")
+                            self.copie[nom] = 0
+                            copiees += self._copier(conn, nom, t, 0)
+                            self._connexion.execute("COMMIT")
+                        except Exception:
+                            self._connexion.execute("ROLLBACK")
+                            raise
+                        self._versions_copiees[nom] = modifiees[nom]
+            self._prochaine_sync = time.monotonic() + self.intervalle_sync
+        return copiees
+
+    def _a_jour(self) -> bool:
+        """Resynchronise si l'intervalle est écoulé. Faux si une
+        synchronisation est déjà en cours (la requête repasse par SQLite)."""
+        if time.monotonic() < self._prochaine_sync:
+            return True
+        if self._sync_lock.locked():
+            return False
+        en_retard = bool(self._dimensions_modifiees())
+        if not en_retard:
+            with self.engine.connect() as conn:
+                en_retard = any(
+                    (conn.execute(select(func.max(t.c.id))).scalar() or 0) > self.copie[nom]
+                    for nom, t in self.tables.items() if nom not in self.dimensions
+                )
+        if en_retard:
+            self.synchroniser()
+        else:
+            self._prochaine_sync = time.monotonic() + self.intervalle_sync
+        return True
+
+    def accepte(self, sql: str) -> bool:
+        """Requête de lecture qui agrège uniquement des tables copiées, sans
+        opérateur ni fonction dont DuckDB ne reproduit pas le résultat SQLite."""
+        canonique = canonicaliser_sql(sql)
+        sans_litteraux = LITTERAL_RE.sub("''", canonique)
+        if not LECTURE_RE.match(canonique) or not AGREGAT_RE.search(sans_litteraux):
+            return False
+        if OPERATEUR_DIVERGENT_RE.search(sans_litteraux):
+            return False
+        if any(f not in FONCTIONS_SURES and f not in MOTS_CLES for f in APPEL_RE.findall(sans_litteraux)):
+            return False
+        lues = tables_lues(canonique)
+        return bool(lues) and all(t in self.tables for t in lues)
+
+    def _lire(self, sql: str, params: Optional[dict], max_rows: int, offset: int,
+              count_cap: Optional[int], timeout: Optional[float]) -> QueryResult:
+        curseur = self._connexion.cursor()
+        interrompue = threading.Event()
+
+        def interrompre():
+            interrompue.set()
+            curseur.interrupt()
+
+        minuterie = threading.Timer(timeout, interrompre) if timeout else None
+        if minuterie is not None:
+            minuterie.start()
+        try:
+            curseur.execute(parametres_duckdb(borner_sql(sql, max_rows + 1, offset)), params or None)
+            columns = [d[0] for d in curseur.description]
+            rows = [tuple(_valeur(v) for v in row) for row in curseur.fetchmany(max_rows + 1)]
+            truncated = len(rows) > max_rows
+            total = offset + min(len(rows), max_rows)
+            if truncated:
+                total = None
+                if count_cap:
+                    total = curseur.execute(
+                        parametres_duckdb(f"SELECT COUNT(*) FROM (SELECT 1 FROM (\n{nettoyer_sql(sql)}\n) "
+                                          f"AS resultat LIMIT {int(count_cap)}) AS c"),
+                        params or None).fetchone()[0]
+        except Exception as e:
+            if interrompue.is_set():
+                # SQLite ne ferait pas mieux : le délai dépassé est remonté tel quel
+                raise DelaiDepasse(f"Requête interrompue : durée maximale de {timeout:g} s dépassée") from e
+            raise
+        finally:
+            if minuterie is not None:
+                minuterie.cancel()
+            curseur.close()
+        return QueryResult(columns=columns, rows=rows[:max_rows], truncated=truncated,
+                           total_estimate=total, offset=offset)
+
+    def executer(self, sql: str, params: Optional[dict] = None, max_rows: int = 1000, offset: int = 0,
+                 count_cap: Optional[int] = None, timeout: Optional[float] = None) -> Optional[QueryResult]:
+        """Résultat calculé par DuckDB, ou None si la requête doit passer par SQLite."""
+        if not self.accepte(sql):
+            return None
+        try:
+            if not self._a_jour():
+                # Synchronisation en cours dans un autre thread
+                resultat = None
+            else:
+                resultat = self._lire(sql, params, max_rows, offset, count_cap, timeout)
+        except DelaiDepasse:
+            raise
+        except Exception:
+            resultat = None
+        with self._stats_lock:
+            if resultat is None:
+                self.replis += 1
+            else:
+                self.requetes += 1
+        return resultat
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {"last_ids": dict(self.copie), "queries": self.requetes, "fallbacks": self.replis}
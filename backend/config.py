@@ -0,0 +1,127 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    # Base principale et réplique en lecture (URL SQLAlchemy). Sans réplique,
+    # les requêtes de l'agent lisent la base principale.
+    database_url: str = "sqlite:///./data/app.db"
+    database_replica_url: str = ""
+    # Pool de connexions (ignoré pour une base SQLite en mémoire)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_recycle_seconds: int = 1800
+    db_pool_timeout_seconds: float = 30.0
+    db_pool_pre_ping: bool = True
+
+    # Profil SQLite (PRAGMA appliqués à chaque connexion)
+    sqlite_cache_size_kib: int = 64 * 1024
+    sqlite_mmap_size_bytes: int = 256 * 1024 * 1024
+    sqlite_busy_timeout_ms: int = 5000
+
+    # Initialisation de la base au démarrage (pratique en développement ;
+    # en production, lancer `python -m backend.bootstrap` avant les workers)
+    bootstrap_on_startup: bool = False
+
+    # Schéma du prompt SQL introspecté (statistiques rafraîchies après le TTL)
+    schema_stats_enabled: bool = True
+    schema_stats_ttl_seconds: float = 600.0
+    schema_max_listed_values: int = 12
+    # Au-delà de `schema_pruning_min_tables` tables, seules les `schema_top_k_tables`
+    # plus pertinentes (et leurs voisines par clé étrangère) vont dans le prompt
+    schema_pruning_min_tables: int = 20
+    schema_top_k_tables: int = 5
+
+    # Réparation du SQL : tentatives au total (première comprise) et budget de temps
+    sql_max_attempts: int = 2
+    sql_repair_budget_seconds: float = 20.0
+
+    # Garde-fou avant exécution : durée maximale d'une requête, seuil de
+    # « grosse table » et nombre de parcours complets tolérés dans un plan
+    sql_timeout_seconds: float = 10.0
+    sql_guard_large_table_rows: int = 100_000
+    sql_guard_max_full_scans: int = 3
+
+    # Regroupement des questions identiques en cours de traitement (/ask)
+    coalescing_enabled: bool = True
+
+    # Métriques du pipeline (/metrics) ; `metrics_debug_fields` joint à chaque
+    # réponse de /ask le détail par étape (sinon seulement avec "debug": true)
+    metrics_enabled: bool = True
+    metrics_debug_fields: bool = False
+
+    # Traitement par lots (/ask/batch) : questions traitées en parallèle et taille maximale d'un lot
+    batch_parallelism: int = 8
+    batch_max_questions: int = 500
+
+    # Cache question -> SQL (persistant dans un fichier SQLite local)
+    sql_cache_enabled: bool = True
+    sql_cache_path: str = "./data/sql_cache.db"
+    sql_cache_max_entries: int = 5000
+    sql_cache_ttl_seconds: int = 7 * 24 * 3600
+
+    # Gabarits SQL locaux (aucun appel LLM pour les questions reconnues)
+    intents_enabled: bool = True
+
+    # Réponse finale : "auto" (rendu local si possible), "llm" ou "local"
+    answer_policy: str = "auto"
+
+    # Exécution bornée : lignes lues par requête, taille des lots, pagination
+    max_result_rows: int = 1000
+    result_yield_per: int = 500
+    result_count_cap: int = 100_000
+    max_page_size: int = 1000
+    query_registry_max_entries: int = 1000
+
+    # Cache des résultats de requêtes (mémoire du processus)
+    result_cache_enabled: bool = True
+    result_cache_max_bytes: int = 64 * 1024 * 1024
+    # Durée de vie d'une entrée (écritures hors SQLAlchemy) et relecture des
+    # versions de tables publiées par les autres processus
+    result_cache_ttl_seconds: float = 300.0
+    table_versions_poll_seconds: float = 1.0
+
+    # Rafraîchissement périodique des agrégats sales_* par l'API (0 : désactivé,
+    # rafraîchir alors avec `python -m backend.rollups`)
+    rollups_refresh_interval_seconds: float = 0.0
+
+    # Copie en colonnes (DuckDB, optionnel) de orders/products/customers pour
+    # les agrégations ; ":memory:" ou chemin d'un fichier DuckDB persistant
+    columnar_enabled: bool = False
+    columnar_path: str = ":memory:"
+    columnar_sync_interval_seconds: float = 2.0
+
+    # Mémoire de conversation (questions de suivi) : échanges gardés par
+    # session, octets par session, sessions en mémoire, expiration d'inactivité
+    conversation_enabled: bool = True
+    conversation_max_turns: int = 5
+    conversation_max_bytes_per_session: int = 8 * 1024
+    conversation_max_sessions: int = 10_000
+    conversation_ttl_seconds: float = 1800.0
+
+    # Budget de tokens des prompts par modèle (JSON, ex. {"modele": 4000}) et
+    # budget par défaut ; au-delà, données puis historique sont réduits
+    prompt_token_budget: int = 8000
+    prompt_token_budgets: dict[str, int] = {}
+
+    # Résumé des résultats volumineux avant le modèle de chat
+    answer_data_token_budget: int = 1500
+    summary_sample_rows: int = 5
+    summary_top_k: int = 5
+
+    # Nombre maximal d'appels simultanés vers un même modèle LLM
+    llm_max_concurrency_per_model: int = 32
+
+    # Registre de clients LLM (pool de connexions keep-alive partagé)
+    llm_base_url: str = "https://openrouter.ai/api/v1"
+    llm_pool_max_clients: int = 32
+    llm_pool_idle_ttl_seconds: float = 600.0
+    llm_timeout_seconds: float = 60.0
+    llm_max_retries: int = 2
+    llm_max_connections: int = 100
+    llm_max_keepalive_connections: int = 20
+    llm_keepalive_expiry_seconds: float = 30.0
+
+
+settings = Settings()
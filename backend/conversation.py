@@ -0,0 +1,183 @@
+"""Mémoire de conversation par session, pour les questions de suivi
+("Et pour le mois d'après ?").
+
+Chaque session garde ses derniers échanges (question, SQL exécuté, résumé
+du résultat) dans un tampon circulaire borné en nombre d'échanges et en
+octets ; les sessions inactives expirent et les moins récemment utilisées
+sont évincées au-delà de `max_sessions`.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Optional
+
+from backend.cache import normalize_question
+from backend.execution import QueryResult
+
+# Longueur maximale d'une valeur citée dans le résumé d'un résultat
+MAX_VALEUR = 40
+
+# Marques d'une question de suivi, sur la question normalisée (sans accents) :
+# "Et pour Lyon ?", "Pour Lyon ?", "En février ?", "Seulement à Paris",
+# "Même chose en 2024", "Le mois suivant ?", "Et celui de Lyon ?"
+SUITE_RE = re.compile(
+    r"^(?:et|mais|puis|ensuite|alors|pareil|idem|meme chose|pour|en|a|au|aux|sur|par|avec|sans"
+    r"|seulement|uniquement|juste|sauf|hors|maintenant)\b"
+    r"|\b(?:meme chose|pareil|idem|aussi|egalement|plutot|precedente?s?|suivante?s?|d apres|d avant"
+    r"|celui|celle|ceux|celles|cela|ceci)\b"
+)
+# Pronom complément après un verbe, avant normalisation : "Trie-les par ville"
+PRONOM_RE = re.compile(r"\w-(?:les|la|le|en|y|leur)\b", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class Echange:
+    question: str
+    sql: str
+    # Résumé compact du résultat (nombre de lignes, colonnes, première ligne)
+    resume: str
+
+    @property
+    def taille(self) -> int:
+        """Octets occupés par le texte de l'échange (UTF-8)."""
+        return sum(len(s.encode("utf-8")) for s in (self.question, self.sql, self.resume))
+
+
+def est_suite(question: str) -> bool:
+    """Vrai si la question fait manifestement suite à la précédente."""
+    return bool(PRONOM_RE.search(question) or SUITE_RE.search(normalize_question(question)))
+
+
+def _court(valeur) -> str:
+    texte = str(valeur)
+    return texte if len(texte) <= MAX_VALEUR else texte[:MAX_VALEUR - 1] + "…"
+
+
+def resumer_resultat(resultat: Optional[QueryResult], lignes: int) -> str:
+    """`12 lignes ; colonnes : city, ca ; 1re ligne : city=Paris, ca=1200.5`"""
+    resume = f"{lignes} lignes" + (" (tronqué)" if resultat is not None and resultat.truncated else "")
+    if resultat is None or not resultat.columns:
+        return resume
+    resume += f" ; colonnes : {', '.join(resultat.columns)}"
+    if resultat.rows:
+        premiere = ", ".join(f"{c}={_court(v)}" for c, v in zip(resultat.columns, resultat.rows[0]))
+        resume += f" ; 1re ligne : {premiere}"
+    return resume
+
+
+class _Session:
+    __slots__ = ("echanges", "taille", "vue_le")
+
+    def __init__(self, max_tours: int):
+        self.echanges = deque(maxlen=max_tours)
+        self.taille = 0
+        self.vue_le = time.monotonic()
+
+
+class ConversationStore:
+    """Échanges récents de chaque session, bornés en mémoire.
+
+    - au plus `max_tours` échanges par session (les plus anciens sortent) ;
+    - au plus `max_bytes_session` octets de texte par session ;
+    - au plus `max_sessions` sessions (éviction LRU), expirées après
+      `ttl_seconds` d'inactivité.
+    """
+
+    def __init__(self, max_sessions: int = 10_000, max_tours: int = 5,
+                 max_bytes_session: int = 8 * 1024, ttl_seconds: float = 1800.0):
+        self.max_sessions = max_sessions
+        self.max_tours = max_tours
+        self.max_bytes_session = max_bytes_session
+        self.ttl_seconds = ttl_seconds
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.taille = 0
+        self.evictions = 0
+
+    def _retirer(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id)
+        self.taille -= session.taille
+
+    def _active(self, session_id: str) -> Optional[_Session]:
+        session = self._sessions.get(session_id)
+        if session is not None and time.monotonic() - session.vue_le > self.ttl_seconds:
+            self._retirer(session_id)
+            self.evictions += 1
+            return None
+        return session
+
+    def echanges(self, session_id: str) -> list:
+        """Échanges de la session, du plus ancien au plus récent."""
+        with self._lock:
+            session = self._active(session_id)
+            if session is None:
+                return []
+            session.vue_le = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            return list(session.echanges)
+
+    def ajouter(self, session_id: str, echange: Echange) -> None:
+        if echange.taille > self.max_bytes_session:
+            return
+        with self._lock:
+            session = self._active(session_id)
+            if session is None:
+                session = self._sessions[session_id] = _Session(self.max_tours)
+            if len(session.echanges) == self.max_tours:
+                session.taille -= session.echanges[0].taille
+                self.taille -= session.echanges[0].taille
+            session.echanges.append(echange)
+            session.taille += echange.taille
+            self.taille += echange.taille
+            while session.taille > self.max_bytes_session:
+                ancien = session.echanges.popleft()
+                session.taille -= ancien.taille
+                self.taille -= ancien.taille
+            session.vue_le = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._retirer(next(iter(self._sessions)))
+                self.evictions += 1
+
+    def oublier(self, session_id: str) -> None:
+        with self._lock:
+            if session_id in self._sessions:
+                self._retirer(session_id)
+
+    def session(self, session_id: str) -> "Conversation":
+        return Conversation(self, session_id)
+
+    def taille_session(self, session_id: str) -> int:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return session.taille if session is not None else 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "exchanges": sum(len(s.echanges) for s in self._sessions.values()),
+                "bytes": self.taille,
+                "max_bytes_per_session": self.max_bytes_session,
+                "max_sessions": self.max_sessions,
+                "evictions": self.evictions,
+            }
+
+
+class Conversation:
+    """Vue sur une session, transmise à l'agent : contexte lu au début de la
+    question, échange ajouté une fois la requête exécutée avec succès."""
+
+    def __init__(self, store: ConversationStore, session_id: str):
+        self.store = store
+        self.session_id = session_id
+        self.echanges = store.echanges(session_id)
+
+    @property
+    def precedent(self) -> Optional[Echange]:
+        return self.echanges[-1] if self.echanges else None
+
+    def ajouter(self, question: str, sql: str, resultat: Optional[QueryResult], lignes: int) -> None:
+        self.store.ajouter(self.session_id, Echange(question, sql, resumer_resultat(resultat, lignes)))
@@ -1,15 +1,72 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./data/app.db"
+from backend.config import settings
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+SQLALCHEMY_DATABASE_URL = settings.database_url
+
+
+def configurer_sqlite(engine) -> None:
+    """Profil lecture/analytique appliqué à chaque connexion SQLite :
+    WAL (lectures concurrentes sans bloquer l'écriture), synchronous NORMAL,
+    cache de pages et mmap élargis, tables temporaires en mémoire."""
+
+    @event.listens_for(engine, "connect")
+    def _pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # Connexion en lecture seule (réplique) : le mode WAL est fixé par la base principale
+        if engine.url.query.get("mode") != "ro":
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        # Valeur négative : taille du cache en KiB plutôt qu'en pages
+        cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kib)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size_bytes)}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        cursor.close()
+
+
+def creer_engine(url: str, pool_size: int = 5, max_overflow: int = 10, pool_recycle: int = 1800,
+                 pool_timeout: float = 30.0, pool_pre_ping: bool = True):
+    """Engine SQLAlchemy pour `url`, avec le pool de connexions demandé.
+
+    SQLite : connexions partagées entre threads et profil de performance ;
+    une base en mémoire garde le pool par défaut (une seule base par connexion).
+    """
+    url = make_url(url)
+    options = {"pool_pre_ping": pool_pre_ping}
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if url.database in (None, "", ":memory:"):
+            engine = create_engine(url, **options)
+            configurer_sqlite(engine)
+            return engine
+    options.update(pool_size=pool_size, max_overflow=max_overflow, pool_recycle=pool_recycle,
+                   pool_timeout=pool_timeout)
+    engine = create_engine(url, **options)
+    if url.get_backend_name() == "sqlite":
+        configurer_sqlite(engine)
+    return engine
+
+
+def _depuis_settings(url: str):
+    return creer_engine(url, pool_size=settings.db_pool_size, max_overflow=settings.db_max_overflow,
+                        pool_recycle=settings.db_pool_recycle_seconds,
+                        pool_timeout=settings.db_pool_timeout_seconds,
+                        pool_pre_ping=settings.db_pool_pre_ping)
+
+
+# Base principale : écritures (bootstrap, peuplement, agrégats) et administration
+engine = _depuis_settings(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Réplique en lecture : requêtes de l'agent, pagination des résultats, statistiques du schéma
+read_engine = _depuis_settings(settings.database_replica_url) if settings.database_replica_url else engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 Base = declarative_base()
 
 def get_db():
@@ -18,3 +75,10 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,169 @@
+import base64
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.dialects import registry
+from sqlalchemy.orm import Session
+
+LECTURE_RE = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+# Littéraux (conservés tels quels) ou commentaires (groupe 1, retirés)
+JETON_RE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|(--[^\n]*|/\*.*?\*/)", re.DOTALL)
+
+
+@dataclass
+class QueryResult:
+    """Résultat compact : noms de colonnes + lignes sous forme de tuples."""
+    columns: list
+    rows: list
+    truncated: bool = False
+    # Nombre total de lignes : exact si non tronqué, sinon borné par `count_cap`
+    total_estimate: Optional[int] = None
+    offset: int = 0
+
+    def to_dicts(self) -> list:
+        return [dict(zip(self.columns, row)) for row in self.rows]
+
+
+def nettoyer_sql(sql: str) -> str:
+    """Retire les commentaires (hors littéraux) et le `;` final, pour que la
+    requête puisse être encapsulée dans une sous-requête."""
+    sql = JETON_RE.sub(lambda m: " " if m.group(1) else m.group(0), sql)
+    return sql.strip().rstrip(";").strip()
+
+
+def borner_sql(sql: str, limit: int, offset: int = 0) -> str:
+    """Encapsule une requête de lecture pour imposer LIMIT/OFFSET.
+
+    La requête d'origine est conservée telle quelle en sous-requête : un
+    LIMIT plus petit écrit par le modèle reste donc respecté.
+    """
+    sql = nettoyer_sql(sql)
+    if not LECTURE_RE.match(sql):
+        return sql
+    # Retours à la ligne : un commentaire oublié ne peut pas avaler la parenthèse
+    bornee = f"SELECT * FROM (\n{sql}\n) AS resultat LIMIT {int(limit)}"
+    if offset:
+        bornee += f" OFFSET {int(offset)}"
+    return bornee
+
+
+def _statement(sql: str, params: Optional[dict]):
+    statement = text(sql)
+    return statement.bindparams(**params) if params else statement
+
+
+def sql_litteral(sql: str, params: Optional[dict], dialecte: str = "sqlite") -> str:
+    """Requête avec ses paramètres remplacés par des littéraux du dialecte,
+    exécutable telle quelle (pour la reprendre dans un prompt, par exemple)."""
+    if not params:
+        return sql
+    return str(_statement(sql, params).compile(dialect=registry.load(dialecte)(),
+                                               compile_kwargs={"literal_binds": True}))
+
+
+def compter(db: Session, sql: str, params: Optional[dict] = None, cap: int = 100_000) -> int:
+    """Compte les lignes d'une requête sans dépasser `cap` (estimation bornée)."""
+    sql = f"SELECT COUNT(*) FROM (SELECT 1 FROM (\n{nettoyer_sql(sql)}\n) AS resultat LIMIT {int(cap)}) AS c"
+    return db.execute(_statement(sql, params)).scalar()
+
+
+def executer(db: Session, sql: str, params: Optional[dict] = None, max_rows: int = 1000,
+             offset: int = 0, yield_per: int = 500, count_cap: Optional[int] = None) -> QueryResult:
+    """Exécute une requête en lisant au plus `max_rows` lignes.
+
+    Une ligne de plus est demandée pour savoir si le résultat est tronqué ;
+    les lignes sont lues par lots (`yield_per`, curseur serveur quand le
+    pilote le permet) au lieu d'être toutes matérialisées.
+    """
+    statement = _statement(borner_sql(sql, max_rows + 1, offset), params)
+    result = db.execute(statement.execution_options(yield_per=yield_per))
+    try:
+        columns = list(result.keys())
+        rows = [tuple(row) for row in islice(result, max_rows + 1)]
+    finally:
+        close = getattr(result, "close", None)
+        if close is not None:
+            close()
+
+    truncated = len(rows) > max_rows
+    rows = rows[:max_rows]
+    total = offset + len(rows)
+    if truncated:
+        total = compter(db, sql, params, cap=count_cap) if count_cap else None
+    return QueryResult(columns=columns, rows=rows, truncated=truncated,
+                       total_estimate=total, offset=offset)
+
+
+def message_erreur(exc: Exception) -> str:
+    """Message court de l'erreur renvoyée par la base (sans la requête ni
+    le lien de documentation ajoutés par SQLAlchemy)."""
+    origine = getattr(exc, "orig", None)
+    return str(origine if origine is not None else exc).strip().splitlines()[0]
+
+
+def valider_sql(db: Session, sql: str, params: Optional[dict] = None) -> Optional[str]:
+    """Fait compiler la requête par la base (EXPLAIN) sans l'exécuter.
+
+    Retourne le message d'erreur (table ou colonne inconnue, erreur de
+    syntaxe...) ou None si la requête est valide.
+    """
+    try:
+        list(db.execute(_statement(f"EXPLAIN {nettoyer_sql(sql)}", params)))
+    except Exception as e:
+        db.rollback()
+        return message_erreur(e)
+    return None
+
+
+def encoder_curseur(offset: int) -> str:
+    return base64.urlsafe_b64encode(str(offset).encode()).decode()
+
+
+def decoder_curseur(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    try:
+        offset = int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except ValueError:
+        raise ValueError("Curseur invalide")
+    if offset < 0:
+        raise ValueError("Curseur invalide")
+    return offset
+
+
+@dataclass
+class RegisteredQuery:
+    sql: str
+    params: dict = field(default_factory=dict)
+
+
+class QueryRegistry:
+    """Garde en mémoire (LRU borné) les requêtes exécutées par l'agent pour
+    permettre la récupération paginée de leur résultat complet, sans jamais
+    accepter de SQL arbitraire de la part du client."""
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._queries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, sql: str, params: Optional[dict] = None) -> str:
+        query_id = uuid.uuid4().hex
+        with self._lock:
+            self._queries[query_id] = RegisteredQuery(sql=sql, params=dict(params or {}))
+            while len(self._queries) > self.max_entries:
+                self._queries.popitem(last=False)
+        return query_id
+
+    def get(self, query_id: str) -> Optional[RegisteredQuery]:
+        with self._lock:
+            query = self._queries.get(query_id)
+            if query is not None:
+                self._queries.move_to_end(query_id)
+            return query
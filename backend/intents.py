@@ -0,0 +1,167 @@
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Callable, Optional
+
+from backend.cache import normalize_question
+
+
+@dataclass
+class IntentMatch:
+    name: str
+    sql: str
+    params: dict = field(default_factory=dict)
+
+
+MOIS = {
+    "janvier": 1, "fevrier": 2, "mars": 3, "avril": 4, "mai": 5, "juin": 6,
+    "juillet": 7, "aout": 8, "septembre": 9, "octobre": 10, "novembre": 11, "decembre": 12,
+}
+NOMBRES = {"un": 1, "une": 1, "deux": 2, "trois": 3, "quatre": 4, "cinq": 5, "six": 6,
+           "dix": 10, "douze": 12}
+TABLES = {"client": "customers", "produit": "products", "commande": "orders"}
+
+_MOIS_RE = "|".join(MOIS)
+_NOMBRE_RE = r"\d+|" + "|".join(NOMBRES)
+
+
+def _nombre(token: str) -> int:
+    return int(token) if token.isdigit() else NOMBRES[token]
+
+
+def _ajouter_mois(d: date, n: int) -> date:
+    """Premier jour du mois situé `n` mois après celui de `d`."""
+    index = d.year * 12 + d.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _dernier_mois(mois: int, today: date) -> date:
+    """Premier jour de l'occurrence la plus récente (non future) de `mois`."""
+    year = today.year if mois <= today.month else today.year - 1
+    return date(year, mois, 1)
+
+
+def _count(m, today):
+    table = TABLES[m.group(1)]
+    return f"SELECT COUNT(*) AS nombre FROM {table}", {}
+
+
+def _top_produits(m, today):
+    limit = _nombre(m.group(1)) if m.group(1) else 5
+    sql = (
+        "SELECT p.name AS produit, SUM(o.quantity) AS quantite_vendue "
+        "FROM orders o JOIN products p ON p.id = o.product_id "
+        "GROUP BY p.id, p.name ORDER BY quantite_vendue DESC LIMIT :limit"
+    )
+    return sql, {"limit": limit}
+
+
+def _produit_le_plus_vendu(m, today):
+    sql, _ = _top_produits(m, today)
+    return sql, {"limit": 1}
+
+
+def _fenetre_chiffre_affaires(periode: str, today: date):
+    if periode == "du mois dernier":
+        return _ajouter_mois(today, -1), _ajouter_mois(today, 0)
+    if periode in ("de ce mois", "de ce mois ci", "du mois en cours"):
+        return _ajouter_mois(today, 0), today + timedelta(days=1)
+    if periode in ("de cette annee", "de l annee en cours"):
+        return date(today.year, 1, 1), today + timedelta(days=1)
+    if periode == "de l annee derniere":
+        return date(today.year - 1, 1, 1), date(today.year, 1, 1)
+    jours = re.fullmatch(r"des (\d+) derniers jours", periode)
+    return today - timedelta(days=int(jours.group(1))), today + timedelta(days=1)
+
+
+def _chiffre_affaires(m, today):
+    debut, fin = _fenetre_chiffre_affaires(m.group(1), today)
+    sql = (
+        "SELECT COALESCE(SUM(total_amount), 0) AS chiffre_affaires FROM orders "
+        "WHERE order_date >= :debut AND order_date < :fin"
+    )
+    return sql, {"debut": debut.isoformat(), "fin": fin.isoformat()}
+
+
+def _clients_inactifs(m, today):
+    depuis = today - timedelta(days=30 * _nombre(m.group(1)))
+    sql = (
+        "SELECT c.id, c.name, c.email, MAX(o.order_date) AS derniere_commande "
+        "FROM customers c LEFT JOIN orders o ON o.customer_id = c.id "
+        "GROUP BY c.id, c.name, c.email "
+        "HAVING MAX(o.order_date) IS NULL OR MAX(o.order_date) < :depuis "
+        "ORDER BY derniere_commande"
+    )
+    return sql, {"depuis": depuis.isoformat()}
+
+
+def _comparer_mois(m, today):
+    params = {}
+    selects = []
+    for i, nom in enumerate((m.group(1), m.group(2)), start=1):
+        debut = _dernier_mois(MOIS[nom], today)
+        params.update({f"mois{i}": nom, f"debut{i}": debut.isoformat(),
+                       f"fin{i}": _ajouter_mois(debut, 1).isoformat()})
+        selects.append(
+            f"SELECT :mois{i} AS mois, COALESCE(SUM(total_amount), 0) AS chiffre_affaires, "
+            f"COUNT(*) AS nombre_commandes FROM orders "
+            f"WHERE order_date >= :debut{i} AND order_date < :fin{i}"
+        )
+    return " UNION ALL ".join(selects), params
+
+
+# Chaque motif doit couvrir toute la question normalisée (fullmatch) : une
+# question plus riche ("combien de clients a paris") part vers le LLM.
+TEMPLATES: list[tuple[str, str, Callable]] = [
+    ("compter", r"(?:combien (?:de |d )|nombre (?:de |d )|nombre total (?:de |d ))"
+                r"(client|produit|commande)s? ?(?:avons nous|avez vous|y a t il|existe t il|"
+                r"au total|en tout|enregistres|en base)?", _count),
+    ("top_produits", r"(?:quels sont |donne moi |liste |affiche )?les (" + _NOMBRE_RE + r")? ?"
+                     r"produits les plus vendus", _top_produits),
+    ("produit_le_plus_vendu", r"(?:quel est )?le produit le plus vendu()", _produit_le_plus_vendu),
+    ("chiffre_affaires", r"(?:quel est |donne moi )?(?:le )?(?:chiffre d affaires|ca) "
+                         r"(du mois dernier|de ce mois|de ce mois ci|du mois en cours|de cette annee|"
+                         r"de l annee en cours|de l annee derniere|des \d+ derniers jours)", _chiffre_affaires),
+    ("clients_inactifs", r"(?:quels sont les |quels |les |liste des )?clients (?:qui )?"
+                         r"n ont (?:pas|plus) commande depuis (" + _NOMBRE_RE + r") mois", _clients_inactifs),
+    ("comparer_mois", r"compare(?:r)? (?:les )?ventes (?:de |d |du mois de )?(" + _MOIS_RE + r") "
+                      r"(?:et|avec|a) (?:celles )?(?:de |d )?(" + _MOIS_RE + r")", _comparer_mois),
+]
+
+
+class IntentMatcher:
+    """Reconnaît les formes de questions fréquentes et produit un SQL
+    paramétré sans appel au LLM. Les compteurs mesurent le taux de succès."""
+
+    def __init__(self, today: Optional[Callable[[], date]] = None):
+        self._today = today or date.today
+        self._templates = [(name, re.compile(pattern), build) for name, pattern, build in TEMPLATES]
+        self._lock = threading.Lock()
+        self.hits = Counter()
+        self.misses = 0
+
+    def match(self, question: str) -> Optional[IntentMatch]:
+        text = normalize_question(question)
+        for name, pattern, build in self._templates:
+            m = pattern.fullmatch(text)
+            if m:
+                sql, params = build(m, self._today())
+                with self._lock:
+                    self.hits[name] += 1
+                return IntentMatch(name=name, sql=sql, params=params)
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = sum(self.hits.values())
+            total = hits + self.misses
+            return {
+                "hits": hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+                "by_template": dict(self.hits),
+            }
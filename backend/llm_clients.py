@@ -0,0 +1,149 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+from openai import (
+    AsyncOpenAI,
+    OpenAI,
+    DEFAULT_CONNECTION_LIMITS,
+    DefaultAsyncHttpxClient,
+    DefaultHttpxClient,
+)
+
+# Classe `Limits` du client HTTP embarqué par le SDK OpenAI : on la récupère
+# via le SDK pour rester aligné sur la version du client HTTP qu'il utilise.
+Limits = type(DEFAULT_CONNECTION_LIMITS)
+
+
+class ClientRegistry:
+    """Registre de clients OpenAI partagés par tout le processus.
+
+    Un client (et donc son pool de connexions keep-alive) est conservé par
+    couple (api_key, base_url) et par mode sync/async. Le registre est borné :
+    les clients inutilisés depuis `idle_ttl_seconds` sont retirés, puis le
+    moins récemment utilisé dès que `max_clients` est dépassé. Un client
+    retiré reste utilisable par les requêtes qui le détiennent encore : il
+    n'est fermé (pool de connexions libéré) que `timeout` secondes après son
+    retrait, lors d'un appel suivant à `get`, ou par `fermer` à l'arrêt.
+    """
+
+    def __init__(self, max_clients: int = 32, idle_ttl_seconds: float = 600.0,
+                 timeout: float = 60.0, max_retries: int = 2,
+                 max_connections: int = 100, max_keepalive_connections: int = 20,
+                 keepalive_expiry: float = 30.0):
+        self.max_clients = max_clients
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.limits = Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.closed = 0
+        self._clients = OrderedDict()
+        # Clients retirés en attente de fermeture : [(client, retiré à)]
+        self._retires = []
+        # Fermetures asynchrones en cours (référence gardée jusqu'à leur fin)
+        self._fermetures = set()
+        self._lock = threading.Lock()
+
+    def _create(self, api_key: str, base_url: str, asynchronous: bool):
+        if asynchronous:
+            http_client = DefaultAsyncHttpxClient(limits=self.limits, timeout=self.timeout)
+            return AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client,
+                               max_retries=self.max_retries)
+        http_client = DefaultHttpxClient(limits=self.limits, timeout=self.timeout)
+        return OpenAI(api_key=api_key, base_url=base_url, http_client=http_client,
+                      max_retries=self.max_retries)
+
+    def get(self, api_key: str, base_url: str, asynchronous: bool = True):
+        key = (api_key, base_url, asynchronous)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            a_fermer = self._echus(now)
+            entry = self._clients.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._clients.move_to_end(key)
+                entry[1] = now
+                client = entry[0]
+            else:
+                self.misses += 1
+                client = self._create(api_key, base_url, asynchronous)
+                self._clients[key] = [client, now]
+                while len(self._clients) > self.max_clients:
+                    _, (evince, _) = self._clients.popitem(last=False)
+                    self._retirer(evince, now)
+        for retire in a_fermer:
+            self._fermer(retire)
+        return client
+
+    def _evict_idle(self, now: float) -> None:
+        # L'OrderedDict est trié du moins au plus récemment utilisé
+        while self._clients:
+            key, (client, last_used) = next(iter(self._clients.items()))
+            if now - last_used <= self.idle_ttl_seconds:
+                break
+            del self._clients[key]
+            self._retirer(client, now)
+
+    def _retirer(self, client, now: float) -> None:
+        self._retires.append((client, now))
+        self.evictions += 1
+
+    def _echus(self, now: float) -> list:
+        """Clients retirés depuis plus de `timeout` : plus aucune requête ne les utilise."""
+        echus = [client for client, retire in self._retires if now - retire >= self.timeout]
+        if echus:
+            self._retires = [(client, retire) for client, retire in self._retires
+                             if now - retire < self.timeout]
+            self.closed += len(echus)
+        return echus
+
+    def _fermer(self, client) -> None:
+        if not isinstance(client, AsyncOpenAI):
+            client.close()
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(client.close())
+            return
+        tache = loop.create_task(client.close())
+        self._fermetures.add(tache)
+        tache.add_done_callback(self._fermetures.discard)
+
+    async def fermer(self) -> None:
+        """Ferme tous les clients, retirés ou non (arrêt du processus)."""
+        with self._lock:
+            clients = [client for client, _ in self._retires]
+            clients += [client for client, _ in self._clients.values()]
+            self._retires = []
+            self._clients.clear()
+            self.closed += len(clients)
+        for client in clients:
+            if isinstance(client, AsyncOpenAI):
+                await client.close()
+            else:
+                client.close()
+        if self._fermetures:
+            await asyncio.gather(*self._fermetures)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "clients": len(self._clients),
+                "max_clients": self.max_clients,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "closed": self.closed,
+                "reuse_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
@@ -1,38 +1,344 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from backend.database import engine, Base, get_db
-from backend.utils import seed_db
-from backend.agent import AIAgent
-from pydantic import BaseModel
+from backend.database import engine, read_engine, get_read_db, ReadSessionLocal, Base
+from backend.bootstrap import base_prete, bootstrap
+from backend.agent import AsyncAIAgent
+from backend.batch import session_lecture, traiter_lot
+from backend.cache import SQLCache, normalize_question
+from backend.columnar import ColumnarStore
+from backend.config import settings
+from backend.conversation import ConversationStore
+from backend.execution import QueryRegistry, decoder_curseur, encoder_curseur, executer
+from backend.intents import IntentMatcher
+from backend.llm_clients import ClientRegistry
+from backend.metrics import metriques, server_timing
+from backend.result_cache import ResultCache, installer, table_versions
+from backend.rollups import agregats_pris_en_charge, etat_agregats, notes_agregats, rafraichir_periodiquement
+from backend.schema import SchemaCatalog
+from backend.singleflight import SingleFlight
+from backend.sql_guard import delai_max
+from pydantic import BaseModel, Field
+import hashlib
+import json
 import os
+import threading
+import time
+from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Create tables
-Base.metadata.create_all(bind=engine)
-
 app = FastAPI(title="AI Data Agent API")
 
-# Seed database on startup
+# Cache question -> SQL partagé par toutes les requêtes du processus
+sql_cache = SQLCache(
+    settings.sql_cache_path,
+    max_entries=settings.sql_cache_max_entries,
+    ttl_seconds=settings.sql_cache_ttl_seconds,
+) if settings.sql_cache_enabled else None
+
+# Clients LLM réutilisés d'une requête à l'autre (évite TCP+TLS à chaque appel)
+llm_clients = ClientRegistry(
+    max_clients=settings.llm_pool_max_clients,
+    idle_ttl_seconds=settings.llm_pool_idle_ttl_seconds,
+    timeout=settings.llm_timeout_seconds,
+    max_retries=settings.llm_max_retries,
+    max_connections=settings.llm_max_connections,
+    max_keepalive_connections=settings.llm_max_keepalive_connections,
+    keepalive_expiry=settings.llm_keepalive_expiry_seconds,
+)
+
+# Résultats de requêtes partagés, invalidés à chaque écriture sur une table lue
+result_cache = ResultCache(max_bytes=settings.result_cache_max_bytes,
+                           ttl_seconds=settings.result_cache_ttl_seconds) \
+    if settings.result_cache_enabled else None
+
+# Écritures de ce processus suivies sur les deux engines (la réplique peut être
+# la base principale elle-même) ; celles des autres processus (peuplement,
+# agrégats) à travers les versions publiées en base
+for _engine in (engine, read_engine):
+    installer(_engine)
+table_versions.lier(read_engine, intervalle=settings.table_versions_poll_seconds)
+
+# Requêtes exécutées par l'agent, relues par la pagination de /results
+query_registry = QueryRegistry(max_entries=settings.query_registry_max_entries)
+
+# Copie en colonnes des grosses tables, synchronisée depuis la base (optionnelle)
+columnar_store = ColumnarStore(
+    read_engine, chemin=settings.columnar_path, intervalle_sync=settings.columnar_sync_interval_seconds,
+) if settings.columnar_enabled else None
+
+# Échanges récents de chaque session, pour les questions de suivi
+conversations = ConversationStore(
+    max_sessions=settings.conversation_max_sessions,
+    max_tours=settings.conversation_max_turns,
+    max_bytes_session=settings.conversation_max_bytes_per_session,
+    ttl_seconds=settings.conversation_ttl_seconds,
+) if settings.conversation_enabled else None
+
+# Gabarits SQL locaux pour les formes de questions les plus fréquentes
+intents = IntentMatcher() if settings.intents_enabled else None
+
+# Questions identiques simultanées : un seul pipeline, résultat partagé
+single_flight = SingleFlight() if settings.coalescing_enabled else None
+
+# Schéma du prompt SQL, introspecté une fois et invalidé aux changements de schéma
+schema_catalog = SchemaCatalog(
+    read_engine, Base.metadata,
+    stats_enabled=settings.schema_stats_enabled,
+    stats_ttl_seconds=settings.schema_stats_ttl_seconds,
+    max_valeurs=settings.schema_max_listed_values,
+    notes=notes_agregats,
+)
+
+arret_agregats = threading.Event()
+
+# Démarrage en lecture seule : création et peuplement de la base relèvent de
+# `python -m backend.bootstrap`, lancé une fois avant les workers
 @app.on_event("startup")
 def startup_event():
-    db = next(get_db())
-    seed_db(db)
+    if settings.bootstrap_on_startup:
+        bootstrap(engine)
+    app.state.pret = base_prete(engine)
+    if app.state.pret:
+        schema_catalog.get()
+        if columnar_store is not None:
+            # Copie initiale en arrière-plan : les requêtes passent par SQLite en attendant
+            threading.Thread(target=columnar_store.synchroniser, daemon=True).start()
+        if settings.rollups_refresh_interval_seconds > 0 and agregats_pris_en_charge(engine.dialect.name):
+            # Écrit sur la base principale ; les autres workers attendent le verrou du filigrane
+            threading.Thread(target=rafraichir_periodiquement, daemon=True,
+                             args=(engine, settings.rollups_refresh_interval_seconds, arret_agregats)).start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    arret_agregats.set()
+    await llm_clients.fermer()
 
 class QuestionRequest(BaseModel):
     question: str
     api_key: str
+    # Joint à la réponse le détail par étape (durées, tokens, tentatives)
+    debug: bool = False
+    # Identifiant de conversation choisi par le client : les questions d'une même
+    # session peuvent faire suite aux précédentes ("Et pour le mois d'après ?")
+    session_id: Optional[str] = Field(default=None, max_length=128)
+
+class BatchRequest(BaseModel):
+    questions: list[str] = Field(min_length=1)
+    api_key: str
+
+def _agent(api_key: str, db_lock=None, debug: bool = False, session_id: Optional[str] = None) -> AsyncAIAgent:
+    client = llm_clients.get(api_key, settings.llm_base_url)
+    conversation = conversations.session(session_id) if conversations is not None and session_id else None
+    return AsyncAIAgent(api_key=api_key, base_url=settings.llm_base_url,
+                        sql_cache=sql_cache, client=client, intents=intents,
+                        answer_policy=settings.answer_policy, result_cache=result_cache,
+                        schema=schema_catalog.get(), db_lock=db_lock, debug=debug,
+                        columnar=columnar_store, conversation=conversation)
 
 @app.get("/")
 def read_root():
     return {"message": "AI Data Agent API is running"}
 
+@app.get("/ready")
+def readiness():
+    # Relu tant que la base n'est pas prête, pour prendre en compte un bootstrap lancé après le démarrage
+    if not getattr(app.state, "pret", False):
+        app.state.pret = base_prete(engine)
+    if not app.state.pret:
+        raise HTTPException(status_code=503, detail="Base non initialisée : lancez python -m backend.bootstrap")
+    return {"ready": True}
+
+@app.get("/llm/pool")
+def llm_pool_stats():
+    return llm_clients.stats()
+
+@app.get("/results/cache")
+def result_cache_stats():
+    return result_cache.stats() if result_cache is not None else {}
+
+@app.get("/columnar")
+def columnar_stats():
+    return columnar_store.stats() if columnar_store is not None else {}
+
+@app.get("/conversations")
+def conversations_stats():
+    return conversations.stats() if conversations is not None else {}
+
+@app.delete("/conversations/{session_id}")
+def forget_conversation(session_id: str):
+    if conversations is not None:
+        conversations.oublier(session_id)
+    return {"forgotten": session_id}
+
+@app.get("/ask/coalescing")
+def coalescing_stats():
+    return single_flight.stats() if single_flight is not None else {}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    """Métriques au format texte Prometheus."""
+    compteurs = {}
+    for prefixe, aide, stats in (
+        ("ai_agent_result_cache", "cache des résultats", result_cache.stats() if result_cache else None),
+        ("ai_agent_intents", "gabarits SQL locaux", intents.stats() if intents else None),
+        ("ai_agent_llm_pool", "clients LLM réutilisés", llm_clients.stats()),
+    ):
+        if stats:
+            compteurs[f"{prefixe}_hits_total"] = (f"Succès : {aide}", stats["hits"])
+            compteurs[f"{prefixe}_misses_total"] = (f"Échecs : {aide}", stats["misses"])
+    if single_flight is not None:
+        stats = single_flight.stats()
+        compteurs["ai_agent_ask_coalesced_total"] = ("Questions /ask regroupées avec une identique en cours",
+                                                     stats["coalesced"])
+    jauges = {}
+    if conversations is not None:
+        stats = conversations.stats()
+        compteurs["ai_agent_conversation_evictions_total"] = ("Sessions de conversation évincées ou expirées",
+                                                              stats["evictions"])
+        jauges["ai_agent_conversation_sessions"] = ("Sessions de conversation en mémoire", stats["sessions"])
+        jauges["ai_agent_conversation_bytes"] = ("Octets de texte des échanges mémorisés", stats["bytes"])
+    return PlainTextResponse(metriques.exposer(compteurs, jauges), media_type="text/plain; version=0.0.4")
+
+@app.get("/schema")
+def read_schema():
+    schema = schema_catalog.get()
+    return {"fingerprint": schema.fingerprint, "prompt": schema.texte}
+
+@app.get("/rollups")
+def rollups_state(db: Session = Depends(get_read_db)):
+    etat = etat_agregats(db)
+    return {"watermark": etat.filigrane, "latest_order_id": etat.derniere_commande,
+            "pending_orders": etat.en_retard,
+            "refreshed_at": etat.rafraichi_le.isoformat() if etat.rafraichi_le else None}
+
+@app.get("/intents/stats")
+def intents_stats():
+    return intents.stats() if intents is not None else {}
+
+def _cle_question(api_key: str, question: str, debug: bool = False, session_id: Optional[str] = None) -> tuple:
+    """Clé de regroupement : question normalisée, session, schéma et version des données."""
+    schema = schema_catalog.get()
+    tables = tuple(t.nom for t in schema.tables)
+    return (hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16], normalize_question(question),
+            schema.fingerprint, table_versions.versions(tables), debug, session_id)
+
+async def _repondre(api_key: str, question: str, debug: bool = False, session_id: Optional[str] = None):
+    # Session propre au calcul : il peut survivre à la requête qui l'a lancé
+    db = ReadSessionLocal()
+    try:
+        return await _agent(api_key, debug=debug, session_id=session_id).questionDetaillee(db, question)
+    finally:
+        db.close()
+
 @app.post("/ask")
-def ask_question(request: QuestionRequest, db: Session = Depends(get_db)):
-    agent = AIAgent(api_key=request.api_key)
+async def ask_question(request: QuestionRequest, response: Response = None):
+    debug = request.debug or settings.metrics_debug_fields
     try:
-        response = agent.question(db, request.question)
-        return {"response": response}
+        if single_flight is None:
+            result = await _repondre(request.api_key, request.question, debug, request.session_id)
+        else:
+            result = await single_flight.run(
+                _cle_question(request.api_key, request.question, debug, request.session_id),
+                lambda: _repondre(request.api_key, request.question, debug, request.session_id))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+    body = {"response": result.answer}
+    if result.row_count is not None:
+        # Le résultat complet reste accessible page par page via /results
+        body["query_id"] = query_registry.register(result.sql, result.params)
+        body["row_count"] = result.row_count
+        body["truncated"] = result.truncated
+    if result.debug is not None:
+        body["debug"] = result.debug
+        if response is not None:
+            response.headers["Server-Timing"] = server_timing(result.debug["timings_ms"])
+    return body
+
+@app.post("/ask/batch")
+async def ask_batch(request: BatchRequest):
+    if len(request.questions) > settings.batch_max_questions:
+        raise HTTPException(status_code=413,
+                            detail=f"Lot limité à {settings.batch_max_questions} questions")
+    debut = time.perf_counter()
+    with session_lecture(read_engine) as db:
+        elements = await traiter_lot(request.questions, lambda verrou: _agent(request.api_key, verrou),
+                                     db, parallelisme=settings.batch_parallelism)
+
+    results, query_ids = [], {}
+    for element in elements:
+        item = {"question": element.question, "status": element.statut,
+                "duration_ms": element.duree_ms, "deduplicated": element.doublon}
+        reponse = element.reponse
+        if reponse is None:
+            item["error"] = element.erreur
+        else:
+            item["response"] = reponse.answer
+            item["source"] = reponse.source
+            if reponse.row_count is not None:
+                # Un seul query_id pour les doublons d'une même question
+                if id(reponse) not in query_ids:
+                    query_ids[id(reponse)] = query_registry.register(reponse.sql, reponse.params)
+                item.update(sql=reponse.sql, query_id=query_ids[id(reponse)],
+                            row_count=reponse.row_count, truncated=reponse.truncated)
+        results.append(item)
+    return {
+        "results": results,
+        "unique_questions": sum(not element.doublon for element in elements),
+        "duration_ms": round((time.perf_counter() - debut) * 1000, 2),
+    }
+
+@app.get("/results/{query_id}")
+def read_results(query_id: str, cursor: str = None,
+                 page_size: int = Query(100, ge=1, le=settings.max_page_size),
+                 db: Session = Depends(get_read_db)):
+    query = query_registry.get(query_id)
+    if query is None:
+        raise HTTPException(status_code=404, detail="Requête inconnue ou expirée")
+    try:
+        offset = decoder_curseur(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Même moteur que la première page de l'agent
+    page = columnar_store.executer(query.sql, query.params, max_rows=page_size, offset=offset,
+                                   timeout=settings.sql_timeout_seconds) if columnar_store is not None else None
+    if page is None:
+        run = result_cache.executer if result_cache is not None else executer
+        with delai_max(db, settings.sql_timeout_seconds):
+            page = run(db, query.sql, query.params, max_rows=page_size, offset=offset,
+                       yield_per=settings.result_yield_per)
+    return {
+        "columns": page.columns,
+        "rows": page.rows,
+        "next_cursor": encoder_curseur(offset + len(page.rows)) if page.truncated else None,
+    }
+
+
+def _sse(event: str, payload: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False, default=str)}\n\n"
+
+
+@app.post("/ask/stream")
+async def ask_question_stream(request: QuestionRequest):
+    agent = _agent(request.api_key, session_id=request.session_id)
+
+    async def events():
+        # Session ouverte pour toute la durée du flux, fermée à sa fin
+        db = ReadSessionLocal()
+        try:
+            async for event, payload in agent.questionStream(db, request.question):
+                yield _sse(event, payload)
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
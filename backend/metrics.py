@@ -0,0 +1,176 @@
+import bisect
+import threading
+from typing import Optional
+
+from backend.config import settings
+
+# Bornes des histogrammes (format Prometheus : compteurs cumulés par borne)
+BORNES_SECONDES = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BORNES_TOKENS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+BORNES_LIGNES = (0, 1, 10, 100, 1000, 10_000, 100_000)
+
+# Étapes chronométrées du pipeline
+ETAPE_GENERATION = "sql_generation"
+ETAPE_REPARATION = "sql_repair"
+ETAPE_VALIDATION = "validation"
+ETAPE_EXECUTION = "execution"
+ETAPE_REPONSE = "answer_generation"
+
+
+def _etiquettes(noms: tuple, valeurs: tuple) -> str:
+    if not noms:
+        return ""
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(noms, valeurs)) + "}"
+
+
+def _nombre(valeur: float) -> str:
+    return repr(float(valeur)) if isinstance(valeur, float) else str(valeur)
+
+
+class Compteur:
+    def __init__(self, nom: str, aide: str, etiquettes: tuple = ()):
+        self.nom = nom
+        self.aide = aide
+        self.etiquettes = etiquettes
+        self.valeurs = {}
+
+    def inc(self, valeurs: tuple = (), n: float = 1) -> None:
+        self.valeurs[valeurs] = self.valeurs.get(valeurs, 0) + n
+
+    def lignes(self) -> list:
+        lignes = [f"# HELP {self.nom} {self.aide}", f"# TYPE {self.nom} counter"]
+        for valeurs, total in sorted(self.valeurs.items()):
+            lignes.append(f"{self.nom}{_etiquettes(self.etiquettes, valeurs)} {_nombre(total)}")
+        return lignes
+
+
+class Histogramme:
+    def __init__(self, nom: str, aide: str, bornes: tuple, etiquettes: tuple = ()):
+        self.nom = nom
+        self.aide = aide
+        self.bornes = bornes
+        self.etiquettes = etiquettes
+        # valeurs d'étiquettes -> [compte par borne (+Inf en dernier), somme, nombre]
+        self.series = {}
+
+    def observer(self, valeur: float, valeurs: tuple = ()) -> None:
+        serie = self.series.get(valeurs)
+        if serie is None:
+            serie = self.series[valeurs] = [[0] * (len(self.bornes) + 1), 0.0, 0]
+        serie[0][bisect.bisect_left(self.bornes, valeur)] += 1
+        serie[1] += valeur
+        serie[2] += 1
+
+    def lignes(self) -> list:
+        lignes = [f"# HELP {self.nom} {self.aide}", f"# TYPE {self.nom} histogram"]
+        for valeurs, (comptes, somme, nombre) in sorted(self.series.items()):
+            cumul = 0
+            for borne, compte in zip(self.bornes + ("+Inf",), comptes):
+                cumul += compte
+                le = borne if borne == "+Inf" else _nombre(borne)
+                lignes.append(f"{self.nom}_bucket"
+                              f"{_etiquettes(self.etiquettes + ('le',), valeurs + (le,))} {cumul}")
+            lignes.append(f"{self.nom}_sum{_etiquettes(self.etiquettes, valeurs)} {_nombre(somme)}")
+            lignes.append(f"{self.nom}_count{_etiquettes(self.etiquettes, valeurs)} {nombre}")
+        return lignes
+
+
+class Metriques:
+    """Métriques du pipeline de l'agent, exposées au format texte Prometheus.
+
+    Désactivées, chaque méthode d'enregistrement rend la main immédiatement :
+    aucun verrou, aucune allocation sur le chemin des requêtes.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.durees = Histogramme("ai_agent_stage_duration_seconds",
+                                  "Durée de chaque étape du pipeline", BORNES_SECONDES, ("stage",))
+        self.tokens = Histogramme("ai_agent_llm_tokens", "Tokens par appel au modèle",
+                                  BORNES_TOKENS, ("model", "kind"))
+        self.lignes_lues = Histogramme("ai_agent_rows_returned", "Lignes renvoyées par requête SQL",
+                                       BORNES_LIGNES)
+        self.sources = Compteur("ai_agent_sql_source_total",
+                                "Origine du SQL exécuté (intent et cache : sans appel au modèle)", ("source",))
+        self.reparations = Compteur("ai_agent_sql_repairs_total",
+                                    "Nouvelles générations de SQL après une erreur")
+        self.echecs = Compteur("ai_agent_sql_failures_total",
+                               "Questions sans SQL exécutable après toutes les tentatives")
+        self.questions = Compteur("ai_agent_questions_total", "Questions traitées par issue", ("outcome",))
+        self.tokens_prompt = Compteur("ai_agent_prompt_tokens_total",
+                                      "Tokens des prompts envoyés (comptés localement)", ("prompt",))
+        self.tokens_economises = Compteur("ai_agent_prompt_tokens_saved_total",
+                                          "Tokens retirés des prompts par la réduction au budget du modèle",
+                                          ("prompt",))
+        self.reductions = Compteur("ai_agent_prompt_reductions_total",
+                                   "Prompts réduits pour tenir dans le budget du modèle", ("prompt",))
+
+    def duree(self, etape: str, ms: float) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self.durees.observer(ms / 1000, (etape,))
+
+    def usage(self, modele: str, usage) -> None:
+        """Tokens d'un appel au modèle (`usage` de la réponse OpenAI, éventuellement absent)."""
+        if not self.enabled or usage is None:
+            return
+        with self._lock:
+            self.tokens.observer(getattr(usage, "prompt_tokens", 0) or 0, (modele, "prompt"))
+            self.tokens.observer(getattr(usage, "completion_tokens", 0) or 0, (modele, "completion"))
+
+    def prompt(self, nom: str, construit) -> None:
+        """Taille d'un prompt construit (`prompts.PromptConstruit`) et tokens économisés."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.tokens_prompt.inc((nom,), construit.tokens)
+            self.tokens_economises.inc((nom,), construit.economises)
+            if construit.reduites:
+                self.reductions.inc((nom,))
+
+    def sql(self, source: str, lignes: int) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self.sources.inc((source,))
+            self.lignes_lues.observer(lignes)
+
+    def reparation(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self.reparations.inc()
+
+    def issue(self, issue: str) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self.questions.inc((issue,))
+            if issue == "failed":
+                self.echecs.inc()
+
+    def exposer(self, compteurs: Optional[dict] = None, jauges: Optional[dict] = None) -> str:
+        """Texte de /metrics. `compteurs` et `jauges` ajoutent des valeurs
+        externes {nom: (aide, valeur)} (caches, regroupement, mémoire...)."""
+        with self._lock:
+            lignes = []
+            for metrique in (self.durees, self.tokens, self.lignes_lues, self.sources,
+                             self.reparations, self.echecs, self.questions, self.tokens_prompt,
+                             self.tokens_economises, self.reductions):
+                lignes += metrique.lignes()
+        for nom, (aide, valeur) in (compteurs or {}).items():
+            lignes += [f"# HELP {nom} {aide}", f"# TYPE {nom} counter", f"{nom} {_nombre(valeur)}"]
+        for nom, (aide, valeur) in (jauges or {}).items():
+            lignes += [f"# HELP {nom} {aide}", f"# TYPE {nom} gauge", f"{nom} {_nombre(valeur)}"]
+        return "\n".join(lignes) + "\n"
+
+
+def server_timing(mesures: dict) -> str:
+    """En-tête Server-Timing à partir des durées par étape (ms)."""
+    return ", ".join(f"{etape};dur={ms:g}" for etape, ms in mesures.items())
+
+
+# Métriques du processus, partagées par tous les agents
+metriques = Metriques(enabled=settings.metrics_enabled)
@@ -1,26 +1,38 @@
-from sqlalchemy import Column, Integer, String, Date, Numeric, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, DateTime, Numeric, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from backend.database import Base
 
 class Customer(Base):
     __tablename__ = "customers"
+    __table_args__ = {"info": {"description": "clients : nom, email, ville, date d'inscription"}}
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
     email = Column(String)
-    city = Column(String)
+    city = Column(String, index=True)
     created_at = Column(Date)
     orders = relationship("Order", back_populates="customer")
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = {"info": {"description": "produits du catalogue : nom, catégorie, prix"}}
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
-    category = Column(String)
+    category = Column(String, index=True)
     price = Column(Numeric)
     orders = relationship("Order", back_populates="product")
 
 class Order(Base):
     __tablename__ = "orders"
+    # Index composites couvrants, alignés sur les requêtes produites par l'agent :
+    # - fenêtres de dates sur le chiffre d'affaires (WHERE order_date ... SUM(total_amount))
+    # - jointures / regroupements par produit (SUM(quantity), SUM(total_amount))
+    # - dernière commande par client (MAX(order_date) GROUP BY customer_id)
+    __table_args__ = (
+        Index("ix_orders_date_amount", "order_date", "total_amount"),
+        Index("ix_orders_product_qty_amount", "product_id", "quantity", "total_amount"),
+        Index("ix_orders_customer_date", "customer_id", "order_date"),
+        {"info": {"description": "commandes et ventes : client, produit, quantité, date, montant, chiffre d'affaires"}},
+    )
     id = Column(Integer, primary_key=True, index=True)
     customer_id = Column(Integer, ForeignKey("customers.id"))
     product_id = Column(Integer, ForeignKey("products.id"))
@@ -30,3 +42,51 @@ class Order(Base):
     
     customer = relationship("Customer", back_populates="orders")
     product = relationship("Product", back_populates="orders")
+
+
+class AppMetadata(Base):
+    """Paires clé/valeur d'administration (drapeau de disponibilité, etc.),
+    écrites par `backend.bootstrap` et seulement lues par l'application."""
+    __tablename__ = "app_metadata"
+    key = Column(String, primary_key=True)
+    value = Column(String)
+    updated_at = Column(DateTime)
+
+
+# Agrégats des ventes, maintenus incrémentalement par `backend.rollups` :
+# les questions analytiques y lisent quelques milliers de lignes au lieu de
+# parcourir toute la table orders.
+class SalesDaily(Base):
+    __tablename__ = "sales_daily"
+    __table_args__ = {"info": {"description": "agrégats des ventes par jour et catégorie : chiffre d'affaires, "
+                                              "quantité vendue, nombre de commandes"}}
+    day = Column(Date, primary_key=True)
+    category = Column(String, primary_key=True)
+    orders_count = Column(Integer)
+    quantity = Column(Integer)
+    revenue = Column(Numeric)
+
+class SalesMonthly(Base):
+    __tablename__ = "sales_monthly"
+    __table_args__ = (
+        Index("ix_sales_monthly_city", "city"),
+        {"info": {"description": "agrégats des ventes par mois, catégorie et ville du client : chiffre "
+                                 "d'affaires, quantité vendue, nombre de commandes"}},
+    )
+    # Mois au format AAAA-MM
+    month = Column(String, primary_key=True)
+    category = Column(String, primary_key=True)
+    city = Column(String, primary_key=True)
+    orders_count = Column(Integer)
+    quantity = Column(Integer)
+    revenue = Column(Numeric)
+
+class SalesMonthlyProduct(Base):
+    __tablename__ = "sales_monthly_products"
+    __table_args__ = {"info": {"description": "agrégats des ventes par mois et produit : chiffre d'affaires, "
+                                              "quantité vendue, nombre de commandes"}}
+    month = Column(String, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    orders_count = Column(Integer)
+    quantity = Column(Integer)
+    revenue = Column(Numeric)
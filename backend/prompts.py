@@ -0,0 +1,234 @@
+"""Construction des prompts envoyés aux modèles SQL et de chat.
+
+Un prompt est une suite de parties, de la plus stable à la plus variable :
+consignes (fixes pour un dialecte), schéma, contexte de la conversation,
+question, puis données ou erreur à corriger. Le début du prompt est ainsi
+identique d'une question à l'autre, ce que les fournisseurs exploitent pour
+la mise en cache de prompt.
+
+Les consignes sont rendues et compactées (indentation, lignes vides) une
+seule fois. Au-delà du budget de tokens du modèle, les parties réductibles
+sont réduites dans l'ordre : données, puis historique de la conversation.
+"""
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Optional
+
+from backend.config import settings
+from backend.summary import estimer_tokens
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    tiktoken = None
+
+# Encodage tiktoken utilisé pour compter les tokens (approximation pour les
+# modèles non OpenAI, bien plus proche que l'estimation par caractères)
+ENCODAGE = "cl100k_base"
+
+# Noms des prompts dans les métriques
+PROMPT_SQL = "sql"
+PROMPT_REPONSE = "answer"
+
+# Ordre de réduction des parties quand le budget est dépassé
+REDUCTION_DONNEES = 1
+REDUCTION_HISTORIQUE = 2
+
+# Dialecte de la base -> (nom présenté au modèle, fonctions de date à utiliser)
+DIALECTES = {
+    "sqlite": ("SQLite", "date('now', '-30 days'), strftime('%Y-%m', colonne)"),
+    "postgresql": ("PostgreSQL", "CURRENT_DATE - INTERVAL '30 days', to_char(colonne, 'YYYY-MM'), "
+                                 "date_trunc('month', colonne)"),
+    "mysql": ("MySQL", "CURDATE() - INTERVAL 30 DAY, DATE_FORMAT(colonne, '%Y-%m')"),
+}
+
+
+@lru_cache(maxsize=1)
+def _encodeur():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding(ENCODAGE)
+    except Exception:
+        # Fichier d'encodage ni en cache ni téléchargeable (hors ligne)
+        return None
+
+
+def compter_tokens(texte: str) -> int:
+    """Tokens d'un texte : tiktoken s'il est installé, sinon estimation
+    (~4 caractères par token)."""
+    encodeur = _encodeur()
+    if encodeur is None:
+        return estimer_tokens(texte)
+    return len(encodeur.encode(texte, disallowed_special=()))
+
+
+def compacter(texte: str) -> str:
+    """Retire l'indentation, les espaces de fin de ligne et les lignes vides."""
+    return "\n".join(ligne.strip() for ligne in texte.splitlines() if ligne.strip())
+
+
+def budget_modele(modele: str) -> int:
+    return settings.prompt_token_budgets.get(modele, settings.prompt_token_budget)
+
+
+@dataclass
+class Partie:
+    """Morceau de prompt. Une partie d'`ordre` > 0 est réductible :
+    `reduire(budget)` en renvoie une version d'au plus `budget` tokens
+    ("" pour la retirer)."""
+    nom: str
+    texte: str
+    ordre: int = 0
+    reduire: Optional[Callable[[int], str]] = None
+    # Segments pré-rendus : texte déjà compacté et tokens mesurés une fois
+    compacte: bool = False
+    tokens: Optional[int] = None
+
+
+def segment(nom: str, texte: str) -> Partie:
+    """Partie fixe, compactée et mesurée une fois pour toutes."""
+    compact = compacter(texte)
+    return Partie(nom, compact, compacte=True, tokens=compter_tokens(compact))
+
+
+@dataclass
+class PromptConstruit:
+    texte: str
+    tokens: int
+    # Tokens du prompt complet, avant réduction au budget
+    tokens_avant_reduction: int
+    budget: int
+    # Parties réduites pour tenir dans le budget
+    reduites: list = field(default_factory=list)
+
+    @property
+    def economises(self) -> int:
+        """Tokens retirés par la réduction au budget (le compactage des
+        consignes, propre à ce module, n'est pas compté)."""
+        return max(0, self.tokens_avant_reduction - self.tokens)
+
+    @property
+    def depasse(self) -> bool:
+        """Budget dépassé même après réduction (consignes, schéma et question
+        ne sont jamais tronqués)."""
+        return self.tokens > self.budget
+
+
+def construire(parties: list, budget: int) -> PromptConstruit:
+    textes, tokens = [], []
+    for partie in parties:
+        texte = partie.texte if partie.compacte else compacter(partie.texte)
+        textes.append(texte)
+        tokens.append(partie.tokens if partie.tokens is not None else compter_tokens(texte))
+    avant_reduction = sum(tokens)
+
+    reduites = []
+    reductibles = sorted((i for i, p in enumerate(parties) if p.ordre > 0 and p.reduire is not None),
+                         key=lambda i: parties[i].ordre)
+    for i in reductibles:
+        if sum(tokens) <= budget:
+            break
+        reste = max(0, budget - (sum(tokens) - tokens[i]))
+        textes[i] = compacter(parties[i].reduire(reste))
+        tokens[i] = compter_tokens(textes[i])
+        reduites.append(parties[i].nom)
+    return PromptConstruit("\n".join(t for t in textes if t), sum(tokens), avant_reduction, budget, reduites)
+
+
+# --- Prompt SQL ---------------------------------------------------------------
+
+@lru_cache(maxsize=32)
+def consignes_sql(dialecte: str, agregats: bool) -> Partie:
+    """Rôle et règles du modèle SQL, rendus une fois par dialecte."""
+    # Dialecte inconnu : son nom SQLAlchemy, sans indication de fonctions
+    nom, dates = DIALECTES.get(dialecte, (dialecte, None))
+    regle_dates = f"- Pour les dates, utilise les fonctions {nom}, par exemple {dates}" if dates else ""
+    # Règle seulement si la base contient les tables d'agrégats
+    regle_agregats = ("- Pour un chiffre d'affaires, une quantité vendue ou un nombre de commandes par jour, "
+                      "mois, catégorie, ville ou produit, lis les tables d'agrégats sales_* plutôt que orders "
+                      "(revenue = chiffre d'affaires) ; si elles sont en retard, complète avec orders"
+                      if agregats else "")
+    return segment("consignes", f"""
+        Tu es un expert SQL spécialisé en {nom}.
+
+        Règles STRICTES :
+        - Utilise UNIQUEMENT les tables et colonnes du schéma ci-dessous
+        - N’invente JAMAIS de colonnes ou de tables
+        - Respecte la syntaxe {nom}
+        {regle_dates}
+        - Si une jointure est nécessaire, utilise les clés étrangères indiquées (->)
+        {regle_agregats}
+        - Les lignes "--" donnent des statistiques : pour filtrer, reprends exactement les valeurs et dates indiquées
+        - Ne mets AUCUN commentaire ni texte explicatif
+        - Retourne UNIQUEMENT la requête SQL valide
+        - Si la question ne concerne pas les clients, produits ou commandes, retourne "NON_LIE"
+
+        Schéma :
+        """)
+
+
+def bloc_conversation(echanges: list) -> str:
+    """Questions précédentes, puis SQL et résumé du dernier échange, que le
+    modèle modifie plutôt que de repartir de zéro."""
+    if not echanges:
+        return ""
+    precedent = echanges[-1]
+    anciennes = "".join(f'- "{e.question}"\n' for e in echanges[:-1])
+    return (f"Contexte de la conversation (questions précédentes de l'utilisateur) :\n"
+            f"{anciennes}Dernière question : \"{precedent.question}\"\n"
+            f"Dernière requête exécutée :\n{precedent.sql}\n"
+            f"Résultat : {precedent.resume}\n"
+            "Si la question est une suite de la conversation, reprends cette requête et ne modifie que "
+            "ce qui change (période, filtre, regroupement, tri) ; sinon ignore ce contexte.")
+
+
+def _reduire_conversation(echanges: list) -> Callable[[int], str]:
+    def reduire(budget: int) -> str:
+        # Les questions les plus anciennes partent en premier
+        for debut in range(len(echanges)):
+            texte = bloc_conversation(echanges[debut:])
+            if compter_tokens(texte) <= budget:
+                return texte
+        return ""
+    return reduire
+
+
+def bloc_reparation(sql_echoue: Optional[str], erreur: Optional[str]) -> str:
+    if sql_echoue is None:
+        return ""
+    return (f"Ta requête précédente a échoué :\n{sql_echoue}\n"
+            f"Erreur renvoyée par la base : {erreur or 'erreur inconnue'}\n"
+            "Corrige-la en tenant compte de cette erreur.")
+
+
+def parties_sql(schema: str, question: str, dialecte: str = "sqlite", agregats: bool = False,
+                echanges: Optional[list] = None, sql_echoue: Optional[str] = None,
+                erreur: Optional[str] = None) -> list:
+    echanges = list(echanges or [])
+    return [
+        consignes_sql(dialecte, agregats),
+        Partie("schema", schema),
+        Partie("conversation", bloc_conversation(echanges), REDUCTION_HISTORIQUE,
+               _reduire_conversation(echanges)),
+        Partie("question", f'Question : "{question}"\n'
+                           "Génère la requête SQL correspondant exactement à cette question."),
+        Partie("reparation", bloc_reparation(sql_echoue, erreur)),
+    ]
+
+
+# --- Prompt de réponse --------------------------------------------------------
+
+CONSIGNES_REPONSE = segment("consignes", """
+        Tu es un assistant intelligent.
+        Rédige une réponse claire et concise en français en langage naturel basée sur les données ci-dessous.
+        Si les données sont vides, indique qu'aucune information n'a été trouvée.
+        """)
+
+
+def parties_reponse(question: str, donnees: str, reduire_donnees: Callable[[int], str]) -> list:
+    return [
+        CONSIGNES_REPONSE,
+        Partie("question", f'Question de l\'utilisateur : "{question}"'),
+        Partie("donnees", donnees, REDUCTION_DONNEES, reduire_donnees),
+    ]
@@ -0,0 +1,98 @@
+import re
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional
+
+# Colonnes dont les valeurs sont des montants en euros. Pas d'alias nus comme
+# "total" ou "ventes", souvent donnés à un COUNT(*)
+MONTANT_RE = re.compile(r"montant|amount|chiffre|revenu|prix|price|depense|^ca$", re.IGNORECASE)
+
+# Entiers affichés sans séparateur de milliers (identifiants, années)
+SANS_MILLIERS_RE = re.compile(r"id$|^annee$|^year$", re.IGNORECASE)
+
+# Politiques de génération de la réponse finale
+POLICY_AUTO = "auto"    # rendu local dès que la forme du résultat le permet
+POLICY_LLM = "llm"      # toujours le modèle de chat
+POLICY_LOCAL = "local"  # jamais le modèle de chat
+POLICIES = (POLICY_AUTO, POLICY_LLM, POLICY_LOCAL)
+
+MESSAGE_VIDE = "Aucune information n'a été trouvée pour cette question."
+
+
+def _grouper_milliers(entier: str) -> str:
+    signe = "-" if entier.startswith("-") else ""
+    chiffres = entier.lstrip("-")
+    groupes = []
+    while chiffres:
+        groupes.insert(0, chiffres[-3:])
+        chiffres = chiffres[:-3]
+    return signe + "\u202f".join(groupes)
+
+
+def formater_nombre(valeur, decimales: int = 2) -> str:
+    """Formate un nombre à la française : `1 234 567,89`."""
+    if isinstance(valeur, int):
+        return _grouper_milliers(str(valeur))
+    entier, fraction = f"{float(valeur):.{decimales}f}".split(".")
+    return f"{_grouper_milliers(entier)},{fraction}"
+
+
+def formater_valeur(colonne: str, valeur) -> str:
+    if valeur is None:
+        return "—"
+    if isinstance(valeur, bool):
+        return "oui" if valeur else "non"
+    if isinstance(valeur, datetime):
+        return valeur.strftime("%d/%m/%Y %H:%M")
+    if isinstance(valeur, date):
+        return valeur.strftime("%d/%m/%Y")
+    if isinstance(valeur, str) and re.fullmatch(r"\d{4}-\d{2}-\d{2}", valeur):
+        # SQLite renvoie les dates sous forme de texte ISO
+        return date.fromisoformat(valeur).strftime("%d/%m/%Y")
+    if isinstance(valeur, (int, float, Decimal)):
+        if MONTANT_RE.search(colonne):
+            return f"{formater_nombre(valeur)} €"
+        if isinstance(valeur, int):
+            return str(valeur) if SANS_MILLIERS_RE.search(colonne) else formater_nombre(valeur)
+        return formater_nombre(valeur, decimales=2).rstrip("0").rstrip(",")
+    return str(valeur)
+
+
+def libelle(colonne: str) -> str:
+    texte = re.sub(r"[_\s]+", " ", colonne).strip()
+    return texte[:1].upper() + texte[1:]
+
+
+def _cellule(colonne: str, valeur) -> str:
+    return formater_valeur(colonne, valeur).replace("|", "\\|").replace("\n", " ")
+
+
+def rendre_reponse(data: list, max_rows: int = 10, max_columns: int = 6,
+                   force: bool = False) -> Optional[str]:
+    """Rédige localement la réponse pour un résultat scalaire, une ligne ou un
+    petit tableau. Retourne None quand le résultat mérite un résumé par le
+    modèle de chat (sauf si `force`, auquel cas le tableau est tronqué)."""
+    if not data:
+        return MESSAGE_VIDE
+
+    colonnes = list(data[0].keys())
+    if len(data) == 1 and len(colonnes) == 1:
+        colonne = colonnes[0]
+        return f"{libelle(colonne)} : **{formater_valeur(colonne, data[0][colonne])}**"
+
+    if len(data) == 1:
+        return "\n".join(f"- {libelle(c)} : {formater_valeur(c, data[0][c])}" for c in colonnes)
+
+    if not force and (len(data) > max_rows or len(colonnes) > max_columns):
+        return None
+
+    lignes = data[:max_rows]
+    tableau = [
+        "| " + " | ".join(libelle(c) for c in colonnes) + " |",
+        "|" + "---|" * len(colonnes),
+    ]
+    tableau += ["| " + " | ".join(_cellule(c, ligne[c]) for c in colonnes) + " |" for ligne in lignes]
+    entete = f"{len(data)} résultat(s) :"
+    if len(data) > len(lignes):
+        entete = f"{len(data)} résultat(s), voici les {len(lignes)} premiers :"
+    return entete + "\n\n" + "\n".join(tableau)
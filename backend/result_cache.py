@@ -0,0 +1,304 @@
+import re
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from backend.execution import LECTURE_RE, QueryResult, executer
+from backend.models import AppMetadata
+from backend.sql_guard import sources
+
+# Littéraux chaîne ('...') et identifiants entre guillemets ("..."), à préserver tels quels
+LITTERAL_RE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"")
+ECRITURE_DEBUT = (r"^\s*(?:insert(?:\s+or\s+\w+)?\s+into|replace\s+into|update(?:\s+or\s+\w+)?"
+                  r"|delete\s+from)\s+")
+# Identifiant nu ou entre guillemets, crochets, accents graves
+IDENTIFIANT = r"(?:\"\w+\"|`\w+`|\[\w+\]|\w+)"
+# Table écrite, éventuellement qualifiée (schéma, base attachée) : seul le
+# dernier identifiant est capturé (UPDATE public.orders -> orders)
+TABLE_ECRITE_RE = re.compile(
+    ECRITURE_DEBUT + rf"(?:{IDENTIFIANT}\s*\.\s*)*({IDENTIFIANT})(?=[\s(]|$)",
+    re.IGNORECASE,
+)
+# Écriture dont la table n'a pas pu être lue ("ma table") : tout est invalidé
+ECRITURE_DEBUT_RE = re.compile(ECRITURE_DEBUT, re.IGNORECASE)
+# Table listée après une sous-requête : FROM (SELECT ...) t, products. Peut
+# aussi capturer une colonne (count(x) n, city) : une table de trop ne fait
+# qu'invalider plus souvent, une table oubliée rendrait le cache périmé.
+APRES_SOUS_REQUETE_RE = re.compile(r"\)\s*(?:as\s+)?[a-z_]\w*\s*,\s*([a-z_]\w*)\b(?!\s*\()")
+DDL_RE = re.compile(r"^\s*(?:create|drop|alter)\b", re.IGNORECASE)
+
+# Version « globale » : incrémentée par les changements de schéma
+TOUTES_TABLES = "*"
+
+# Versions partagées entre processus : une ligne `table_version:<table>` de
+# app_metadata par table, incrémentée dans la transaction qui l'a modifiée
+PREFIXE_VERSION = "table_version:"
+PUBLICATION_VERSION = {
+    "sqlite": ("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'app_metadata'",
+               "CURRENT_TIMESTAMP"),
+    "postgresql": ("SELECT 1 FROM information_schema.tables WHERE table_name = 'app_metadata'",
+                   "CURRENT_TIMESTAMP"),
+}
+
+
+def canonicaliser_sql(sql: str) -> str:
+    """Forme canonique d'une requête : casse et espaces normalisés en dehors
+    des littéraux, qui sont conservés à l'identique."""
+    morceaux = []
+    position = 0
+    for m in LITTERAL_RE.finditer(sql):
+        morceaux.append(_normaliser(sql[position:m.start()]))
+        morceaux.append(m.group(0))
+        position = m.end()
+    morceaux.append(_normaliser(sql[position:]))
+    canonique = "".join(morceaux).strip()
+    return canonique.rstrip(";").strip()
+
+
+def _normaliser(fragment: str) -> str:
+    fragment = re.sub(r"\s+", " ", fragment.lower())
+    return re.sub(r"\s*([(),])\s*", r"\1", fragment)
+
+
+def tables_lues(sql_canonique: str) -> tuple:
+    """Tables de tous les FROM et JOIN, y compris celles d'une liste séparée
+    par des virgules (`FROM customers c, orders o`)."""
+    sans_litteraux = LITTERAL_RE.sub("''", sql_canonique)
+    tables = set(sources(sans_litteraux).values())
+    tables.update(APRES_SOUS_REQUETE_RE.findall(sans_litteraux))
+    return tuple(sorted(tables))
+
+
+class TableVersions:
+    """Compteurs de version par table, incrémentés à chaque COMMIT qui a
+    modifié la table. Une entrée de cache enregistre les versions des tables
+    lues : toute écriture ultérieure la rend inaccessible.
+
+    Les écritures des autres processus (peuplement, agrégats, bootstrap)
+    sont vues à travers les versions publiées dans app_metadata par
+    `_valider_ecritures`, relues au plus toutes les `intervalle` secondes
+    une fois la base liée par `lier`.
+    """
+
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.engine = None
+        self.intervalle = 1.0
+        self._publiees = {}
+        self._prochaine_lecture = 0.0
+        self._lecture_lock = threading.Lock()
+
+    def lier(self, engine, intervalle: float = 1.0) -> None:
+        self.engine = engine
+        self.intervalle = intervalle
+        self._prochaine_lecture = 0.0
+
+    def _lire_publiees(self) -> dict:
+        if self.engine is None:
+            return {}
+        with self._lecture_lock:
+            if time.monotonic() >= self._prochaine_lecture:
+                try:
+                    with self.engine.connect() as conn:
+                        lignes = conn.execute(select(AppMetadata.key, AppMetadata.value)
+                                              .where(AppMetadata.key.like(f"{PREFIXE_VERSION}%"))).all()
+                    self._publiees = {cle[len(PREFIXE_VERSION):]: int(valeur) for cle, valeur in lignes}
+                except DBAPIError:
+                    # Base antérieure à app_metadata : seules les versions locales comptent
+                    self._publiees = {}
+                self._prochaine_lecture = time.monotonic() + self.intervalle
+            return self._publiees
+
+    def versions(self, tables: tuple) -> tuple:
+        publiees = self._lire_publiees()
+        with self._lock:
+            return tuple((self._versions.get(t, 0), publiees.get(t, 0)) for t in (TOUTES_TABLES,) + tables)
+
+    def incrementer(self, tables) -> None:
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+
+table_versions = TableVersions()
+
+
+def table_ecrite(statement: str) -> Optional[str]:
+    """Table modifiée par une instruction SQL, `TOUTES_TABLES` pour un
+    changement de schéma ou une table illisible, None pour une lecture."""
+    m = TABLE_ECRITE_RE.match(statement)
+    if m:
+        return m.group(1).strip('"`[]').lower()
+    if ECRITURE_DEBUT_RE.match(statement) or DDL_RE.match(statement):
+        return TOUTES_TABLES
+    return None
+
+
+def _noter_ecriture(conn, cursor, statement, parameters, context, executemany):
+    table = table_ecrite(statement)
+    if table is not None:
+        conn.info.setdefault("tables_modifiees", set()).add(table)
+
+
+# Engines dont la base a une table app_metadata (seul le résultat positif est gardé)
+_publication_possible = weakref.WeakKeyDictionary()
+
+
+def _publier_versions(conn, tables: set) -> None:
+    """Incrémente les versions partagées, dans la transaction en cours de
+    validation. Passe par un curseur DBAPI : ni événement SQLAlchemy, ni
+    interférence avec le curseur de la requête (RETURNING)."""
+    requetes = PUBLICATION_VERSION.get(conn.dialect.name)
+    tables = tables - {AppMetadata.__tablename__}
+    if requetes is None or not tables:
+        return
+    existence, maintenant = requetes
+    if TOUTES_TABLES in tables:
+        # Changement de schéma : app_metadata a pu être créée ou supprimée
+        _publication_possible.pop(conn.engine, None)
+    curseur = conn.connection.dbapi_connection.cursor()
+    try:
+        if not _publication_possible.get(conn.engine):
+            curseur.execute(existence)
+            if curseur.fetchone() is None:
+                return
+            _publication_possible[conn.engine] = True
+        for table in sorted(tables):
+            # Noms issus de TABLE_ECRITE_RE (\w+) ou "*" : sans risque d'injection
+            cle = f"{PREFIXE_VERSION}{table}"
+            curseur.execute(
+                f"INSERT INTO app_metadata (key, value, updated_at) VALUES ('{cle}', '1', {maintenant}) "
+                f"ON CONFLICT (key) DO UPDATE SET value = CAST(CAST(app_metadata.value AS INTEGER) + 1 AS TEXT), "
+                f"updated_at = {maintenant}"
+            )
+    finally:
+        curseur.close()
+
+
+def _valider_ecritures(conn):
+    tables = conn.info.pop("tables_modifiees", None)
+    if tables:
+        _publier_versions(conn, tables)
+        table_versions.incrementer(tables)
+
+
+def _annuler_ecritures(conn):
+    conn.info.pop("tables_modifiees", None)
+
+
+ECOUTEURS = (("after_cursor_execute", _noter_ecriture), ("commit", _valider_ecritures),
+             ("rollback", _annuler_ecritures))
+
+
+def installer(engine: Engine) -> None:
+    """Suit les écritures faites par `engine` : versions locales incrémentées
+    et versions partagées publiées à chaque COMMIT. À appeler pour chaque
+    engine de l'application qui peut écrire (sans effet si déjà fait)."""
+    for nom, ecouteur in ECOUTEURS:
+        if not event.contains(engine, nom, ecouteur):
+            event.listen(engine, nom, ecouteur)
+
+
+def _taille(resultat: QueryResult) -> int:
+    """Estimation de l'empreinte mémoire d'un résultat (en octets)."""
+    taille = sys.getsizeof(resultat.rows) + sum(sys.getsizeof(c) for c in resultat.columns)
+    for ligne in resultat.rows:
+        taille += sys.getsizeof(ligne) + sum(sys.getsizeof(v) for v in ligne)
+    return taille
+
+
+class ResultCache:
+    """Cache LRU des résultats de requêtes, borné en mémoire.
+
+    Clé : SQL canonique, paramètres, bornes de lecture et versions des
+    tables lues (écritures de ce processus et versions publiées par les
+    autres). Une entrée expire de toute façon après `ttl_seconds`, pour les
+    écritures qui ne passent pas par SQLAlchemy (chargement externe).
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, versions: TableVersions = table_versions,
+                 ttl_seconds: Optional[float] = 300.0):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_entry_bytes = max_bytes // 4
+        self.versions = versions
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.taille = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cle(self, sql: str, params: Optional[dict], max_rows: int, offset: int = 0) -> Optional[tuple]:
+        """Clé de cache, calculée AVANT l'exécution (None si non cachable)."""
+        if not LECTURE_RE.match(sql):
+            return None
+        canonique = canonicaliser_sql(sql)
+        tables = tables_lues(canonique)
+        params_cle = tuple(sorted((params or {}).items()))
+        return canonique, params_cle, max_rows, offset, self.versions.versions(tables)
+
+    def get(self, cle: Optional[tuple]) -> Optional[QueryResult]:
+        if cle is None:
+            return None
+        with self._lock:
+            entree = self._entries.get(cle)
+            if entree is not None and entree[2] is not None and time.monotonic() >= entree[2]:
+                self.taille -= self._entries.pop(cle)[1]
+                entree = None
+            if entree is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(cle)
+            self.hits += 1
+            return entree[0]
+
+    def put(self, cle: Optional[tuple], resultat: QueryResult) -> None:
+        if cle is None:
+            return
+        taille = _taille(resultat)
+        if taille > self.max_entry_bytes:
+            return
+        with self._lock:
+            ancienne = self._entries.pop(cle, None)
+            if ancienne is not None:
+                self.taille -= ancienne[1]
+            expire = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+            self._entries[cle] = (resultat, taille, expire)
+            self.taille += taille
+            while self.taille > self.max_bytes and self._entries:
+                _, (_, taille_evincee, _) = self._entries.popitem(last=False)
+                self.taille -= taille_evincee
+                self.evictions += 1
+
+    def executer(self, db: Session, sql: str, params: Optional[dict] = None, max_rows: int = 1000,
+                 offset: int = 0, **kwargs) -> QueryResult:
+        """`execution.executer` précédé d'une lecture du cache."""
+        cle = self.cle(sql, params, max_rows, offset)
+        resultat = self.get(cle)
+        if resultat is None:
+            resultat = executer(db, sql, params, max_rows=max_rows, offset=offset, **kwargs)
+            self.put(cle, resultat)
+        return resultat
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.taille,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
@@ -0,0 +1,104 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Optional
+
+import numpy as np
+
+MOT_RE = re.compile(r"[a-z0-9]+")
+
+# Mots trop fréquents dans les questions pour distinguer une table d'une autre
+MOTS_VIDES = {
+    "le", "la", "les", "un", "une", "des", "du", "de", "d", "l", "et", "ou", "a", "au", "aux",
+    "en", "par", "pour", "sur", "dans", "avec", "qui", "que", "quel", "quelle", "quels",
+    "quelles", "est", "sont", "ont", "nous", "vous", "il", "elle", "ils", "ce", "ces", "cet",
+    "combien", "liste", "donne", "affiche", "moi", "y", "ne", "pas", "plus", "moins",
+    "the", "of", "and", "id",
+}
+
+
+def _sans_accents(texte: str) -> str:
+    return unicodedata.normalize("NFKD", texte).encode("ascii", "ignore").decode("ascii")
+
+
+def _racine(mot: str) -> str:
+    """Racinisation minimale (pluriels français et anglais)."""
+    if len(mot) > 4 and mot.endswith("ies"):
+        return mot[:-3] + "y"
+    if len(mot) > 3 and mot[-1] in "sx":
+        return mot[:-1]
+    return mot
+
+
+def tokeniser(texte: str) -> list:
+    texte = _sans_accents(texte.lower()).replace("_", " ")
+    return [_racine(mot) for mot in MOT_RE.findall(texte) if mot not in MOTS_VIDES]
+
+
+class TableRetriever:
+    """Index TF-IDF local des tables (nom, colonnes, description, valeurs
+    d'exemple) : sélectionne les tables utiles à une question, sans appel
+    réseau, pour ne mettre dans le prompt SQL que la partie utile du schéma.
+    """
+
+    def __init__(self, tables: list, stats: Optional[dict] = None):
+        self.tables = tables
+        self.noms = [t.nom for t in tables]
+        documents = [self._document(t, (stats or {}).get(t.nom, [])) for t in tables]
+
+        vocabulaire = sorted({mot for doc in documents for mot in doc})
+        self._index = {mot: i for i, mot in enumerate(vocabulaire)}
+        frequences = np.zeros((len(tables), len(vocabulaire)))
+        for ligne, doc in enumerate(documents):
+            for mot, n in doc.items():
+                frequences[ligne, self._index[mot]] = 1 + math.log(n)
+        presence = (frequences > 0).sum(axis=0)
+        self._idf = np.log((1 + len(tables)) / (1 + presence)) + 1
+        matrice = frequences * self._idf
+        normes = np.linalg.norm(matrice, axis=1, keepdims=True)
+        self._matrice = matrice / np.where(normes == 0, 1, normes)
+
+        # Voisinage par clés étrangères (table -> tables référencées)
+        self._references = {t.nom: {cible for _, cible, _ in t.cles_etrangeres} for t in tables}
+
+    @staticmethod
+    def _document(t, stats: list) -> Counter:
+        # Le nom et la description pèsent plus que les colonnes et les valeurs
+        mots = tokeniser(t.nom) * 3 + tokeniser(getattr(t, "description", "") or "") * 2
+        for c in t.colonnes:
+            mots += tokeniser(c.nom)
+        for stat in stats:
+            mots += tokeniser(stat)
+        return Counter(mots)
+
+    def scores(self, question: str) -> np.ndarray:
+        vecteur = np.zeros(len(self._index))
+        for mot, n in Counter(tokeniser(question)).items():
+            i = self._index.get(mot)
+            if i is not None:
+                vecteur[i] = 1 + math.log(n)
+        vecteur *= self._idf
+        norme = np.linalg.norm(vecteur)
+        if norme == 0:
+            return np.zeros(len(self.noms))
+        return self._matrice @ (vecteur / norme)
+
+    def selection(self, question: str, top_k: int = 5) -> list:
+        """Noms des `top_k` tables les plus proches de la question, complétés
+        par les tables qu'elles référencent et par les tables de liaison qui
+        relient deux tables retenues. Ordre du schéma conservé."""
+        scores = self.scores(question)
+        ordre = np.argsort(-scores, kind="stable")[:top_k]
+        retenues = {self.noms[i] for i in ordre if scores[i] > 0}
+        if not retenues:
+            retenues = {self.noms[i] for i in ordre}
+
+        voisines = set()
+        for nom in retenues:
+            voisines |= self._references.get(nom, set())
+        for nom, references in self._references.items():
+            if len(references & retenues) >= 2:
+                voisines.add(nom)
+        retenues |= voisines
+        return [nom for nom in self.noms if nom in retenues]
@@ -0,0 +1,192 @@
+"""Agrégats des ventes (tables sales_*), maintenus incrémentalement.
+
+Les commandes sont ajoutées, jamais modifiées : chaque rafraîchissement
+n'agrège que les commandes dont l'identifiant dépasse le filigrane
+(`rollups_watermark` dans `app_metadata`) et les ajoute aux lignes existantes
+(upsert), puis avance le filigrane. `--full` reconstruit tout.
+
+Seuls SQLite et PostgreSQL sont pris en charge : sur un autre dialecte, les
+rafraîchissements ne font rien et le prompt SQL ne mentionne pas les agrégats.
+L'API peut rafraîchir périodiquement (`ROLLUPS_REFRESH_INTERVAL_SECONDS`).
+
+Usage : python -m backend.rollups [--full]
+"""
+import argparse
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import DBAPIError
+
+from backend.database import Base
+from backend.models import AppMetadata, Order, SalesDaily, SalesMonthly, SalesMonthlyProduct
+
+CLE_FILIGRANE = "rollups_watermark"
+TABLES_AGREGATS = [SalesDaily.__table__, SalesMonthly.__table__, SalesMonthlyProduct.__table__]
+
+# Mois AAAA-MM d'une date, selon le dialecte
+MOIS = {
+    "sqlite": "strftime('%Y-%m', o.order_date)",
+    "postgresql": "to_char(o.order_date, 'YYYY-MM')",
+}
+
+# (table, clés de regroupement, expressions des clés, jointures)
+AGREGATS = [
+    ("sales_daily", ("day", "category"), ("o.order_date", "p.category"),
+     "JOIN products p ON p.id = o.product_id"),
+    ("sales_monthly", ("month", "category", "city"), ("{mois}", "p.category", "c.city"),
+     "JOIN products p ON p.id = o.product_id JOIN customers c ON c.id = o.customer_id"),
+    ("sales_monthly_products", ("month", "product_id"), ("{mois}", "o.product_id"), ""),
+]
+
+
+@dataclass
+class EtatAgregats:
+    # Dernière commande agrégée, dernière commande en base
+    filigrane: int
+    derniere_commande: int
+    rafraichi_le: Optional[datetime] = None
+
+    @property
+    def en_retard(self) -> int:
+        """Nombre (borne haute) de commandes pas encore agrégées."""
+        return max(0, self.derniere_commande - self.filigrane)
+
+
+def agregats_pris_en_charge(dialecte: str) -> bool:
+    return dialecte in MOIS
+
+
+def requetes_upsert(dialecte: str) -> list:
+    """INSERT ... SELECT ... ON CONFLICT qui ajoute aux agrégats les commandes
+    d'identifiant dans ]:depuis, :jusqua]."""
+    if dialecte not in MOIS:
+        raise NotImplementedError(f"Agrégats non pris en charge pour le dialecte {dialecte}")
+    requetes = []
+    for table, cles, expressions, jointures in AGREGATS:
+        expressions = [e.format(mois=MOIS[dialecte]) for e in expressions]
+        requetes.append(
+            f"INSERT INTO {table} ({', '.join(cles)}, orders_count, quantity, revenue) "
+            f"SELECT {', '.join(expressions)}, COUNT(*), SUM(o.quantity), SUM(o.total_amount) "
+            f"FROM orders o {jointures} WHERE o.id > :depuis AND o.id <= :jusqua "
+            f"GROUP BY {', '.join(expressions)} "
+            f"ON CONFLICT ({', '.join(cles)}) DO UPDATE SET "
+            f"orders_count = {table}.orders_count + excluded.orders_count, "
+            f"quantity = {table}.quantity + excluded.quantity, "
+            f"revenue = {table}.revenue + excluded.revenue"
+        )
+    return requetes
+
+
+def _lire_filigrane(conn) -> tuple:
+    ligne = conn.execute(
+        select(AppMetadata.value, AppMetadata.updated_at).where(AppMetadata.key == CLE_FILIGRANE)
+    ).first()
+    return (int(ligne.value), ligne.updated_at) if ligne else (0, None)
+
+
+def etat_agregats(conn) -> EtatAgregats:
+    filigrane, rafraichi_le = _lire_filigrane(conn)
+    derniere = conn.execute(select(func.max(Order.id))).scalar() or 0
+    return EtatAgregats(filigrane, derniere, rafraichi_le)
+
+
+def rafraichir_agregats(engine) -> int:
+    """Agrège les commandes ajoutées depuis le dernier rafraîchissement ;
+    retourne le nombre de commandes traitées (0 sur un dialecte non pris en charge)."""
+    if not agregats_pris_en_charge(engine.dialect.name):
+        return 0
+    Base.metadata.create_all(engine, tables=TABLES_AGREGATS + [AppMetadata.__table__])
+    with engine.begin() as conn:
+        # Le filigrane est écrit en premier : il prend le verrou d'écriture et
+        # deux rafraîchissements concurrents ne peuvent pas agréger deux fois
+        maintenant = datetime.now()
+        touche = conn.execute(
+            AppMetadata.__table__.update().where(AppMetadata.key == CLE_FILIGRANE).values(updated_at=maintenant)
+        ).rowcount
+        if not touche:
+            conn.execute(AppMetadata.__table__.insert().values(key=CLE_FILIGRANE, value="0", updated_at=maintenant))
+        depuis, _ = _lire_filigrane(conn)
+        jusqua = conn.execute(select(func.max(Order.id))).scalar() or 0
+        if jusqua <= depuis:
+            return 0
+
+        bornes = {"depuis": depuis, "jusqua": jusqua}
+        traitees = conn.execute(
+            select(func.count()).select_from(Order).where(Order.id > depuis, Order.id <= jusqua)
+        ).scalar()
+        for requete in requetes_upsert(conn.dialect.name):
+            conn.execute(text(requete), bornes)
+        conn.execute(
+            AppMetadata.__table__.update().where(AppMetadata.key == CLE_FILIGRANE).values(value=str(jusqua))
+        )
+    return traitees
+
+
+def reconstruire_agregats(engine) -> int:
+    """Vide les agrégats et les recalcule sur toutes les commandes."""
+    if not agregats_pris_en_charge(engine.dialect.name):
+        return 0
+    Base.metadata.create_all(engine, tables=TABLES_AGREGATS + [AppMetadata.__table__])
+    with engine.begin() as conn:
+        for table in TABLES_AGREGATS:
+            conn.execute(table.delete())
+        conn.execute(AppMetadata.__table__.delete().where(AppMetadata.key == CLE_FILIGRANE))
+    return rafraichir_agregats(engine)
+
+
+def notes_agregats(engine) -> dict:
+    """Lignes de statistiques du prompt SQL : fraîcheur des agrégats."""
+    if not agregats_pris_en_charge(engine.dialect.name):
+        return {}
+    try:
+        with engine.connect() as conn:
+            etat = etat_agregats(conn)
+    except DBAPIError:
+        # Base antérieure aux agrégats : rien à signaler
+        return {}
+    if etat.en_retard:
+        note = (f"agrégats en retard : jusqu'à {etat.en_retard} commandes récentes non prises en compte, "
+                "utilise orders pour les périodes les plus récentes")
+    else:
+        note = "agrégats à jour de toutes les commandes"
+    return {table.name: [note] for table in TABLES_AGREGATS}
+
+
+def rafraichir_periodiquement(engine, intervalle: float, arret: threading.Event) -> None:
+    """Rafraîchit les agrégats toutes les `intervalle` secondes jusqu'à `arret`.
+    Plusieurs processus peuvent tourner en même temps : le filigrane les sérialise."""
+    while not arret.wait(intervalle):
+        try:
+            rafraichir_agregats(engine)
+        except DBAPIError:
+            # Base verrouillée ou indisponible : nouvel essai au prochain intervalle
+            pass
+
+
+def main():
+    from backend.database import engine
+    from backend.result_cache import installer
+
+    installer(engine)
+
+    parser = argparse.ArgumentParser(description="Rafraîchissement des agrégats de ventes")
+    parser.add_argument("--full", action="store_true", help="reconstruit les agrégats depuis zéro")
+    args = parser.parse_args()
+
+    if not agregats_pris_en_charge(engine.dialect.name):
+        print(f"Agrégats non pris en charge pour le dialecte {engine.dialect.name}")
+        return
+    debut = time.perf_counter()
+    traitees = reconstruire_agregats(engine) if args.full else rafraichir_agregats(engine)
+    with engine.connect() as conn:
+        etat = etat_agregats(conn)
+    print(f"{traitees} commandes agrégées en {time.perf_counter() - debut:.1f} s "
+          f"(filigrane : commande {etat.filigrane})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+import hashlib
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from sqlalchemy import MetaData, column, func, inspect, select, table
+from sqlalchemy.dialects import sqlite
+
+from backend.result_cache import TableVersions, table_versions
+from backend.retriever import TableRetriever
+
+# Tables techniques jamais présentées au modèle SQL
+TABLES_EXCLUES = {"app_metadata"}
+
+
+@dataclass
+class ColonneSchema:
+    nom: str
+    type: str
+    cle_primaire: bool = False
+    indexee: bool = False
+
+
+@dataclass
+class TableSchema:
+    nom: str
+    colonnes: list
+    # (colonne, table référencée, colonne référencée)
+    cles_etrangeres: list = field(default_factory=list)
+    # Description en langage naturel (info["description"] du modèle), pour la sélection des tables
+    description: str = ""
+    # Nombre de lignes, renseigné avec les statistiques
+    lignes: Optional[int] = None
+
+
+@dataclass
+class SchemaPrompt:
+    """Bloc de schéma inséré dans le prompt SQL.
+
+    `fingerprint` ne dépend que de la structure (tables, colonnes, types,
+    clés) : les statistiques peuvent être rafraîchies sans invalider le
+    cache question -> SQL.
+    """
+    texte: str
+    fingerprint: str
+    tables: list
+    stats: Optional[dict] = None
+    # Dialecte de la base interrogée (nom SQLAlchemy : sqlite, postgresql...)
+    dialecte: str = "sqlite"
+    _retriever: Optional[TableRetriever] = field(default=None, repr=False, compare=False)
+
+    def texte_pour(self, question: str, top_k: int = 5, min_tables: int = 20) -> str:
+        """Schéma restreint aux tables utiles à la question (et à leurs
+        voisines par clé étrangère) ; schéma complet pour les petites bases."""
+        if len(self.tables) < min_tables:
+            return self.texte
+        if self._retriever is None:
+            self._retriever = TableRetriever(self.tables, self.stats)
+        noms = set(self._retriever.selection(question, top_k))
+        return formater_schema([t for t in self.tables if t.nom in noms], self.stats)
+
+
+def _visible(nom: str) -> bool:
+    return nom not in TABLES_EXCLUES and not nom.startswith("sqlite_")
+
+
+def tables_depuis_metadata(metadata: MetaData, dialect=None) -> list:
+    """Structure décrite par les modèles SQLAlchemy (sans connexion)."""
+    dialect = dialect or sqlite.dialect()
+    tables = []
+    for t in sorted(metadata.sorted_tables, key=lambda t: t.name):
+        if not _visible(t.name):
+            continue
+        indexees = {c.name for index in t.indexes for c in list(index.columns)[:1]}
+        indexees |= {c.name for c in t.columns if c.index}
+        colonnes = [ColonneSchema(c.name, c.type.compile(dialect=dialect), c.primary_key, c.name in indexees)
+                    for c in t.columns]
+        fks = [(fk.parent.name, fk.column.table.name, fk.column.name) for fk in t.foreign_keys]
+        tables.append(TableSchema(t.name, colonnes, sorted(fks), t.info.get("description", "")))
+    return tables
+
+
+def tables_depuis_base(engine) -> list:
+    """Structure réelle de la base, lue avec `inspect(engine)`."""
+    inspecteur = inspect(engine)
+    tables = []
+    for nom in sorted(inspecteur.get_table_names()):
+        if not _visible(nom):
+            continue
+        pk = set(inspecteur.get_pk_constraint(nom).get("constrained_columns") or [])
+        # Seule la première colonne d'un index sert à filtrer sans parcours complet
+        indexees = {index["column_names"][0] for index in inspecteur.get_indexes(nom) if index["column_names"]}
+        colonnes = [
+            ColonneSchema(c["name"], c["type"].compile(dialect=engine.dialect), c["name"] in pk,
+                          c["name"] in indexees or c["name"] in pk)
+            for c in inspecteur.get_columns(nom)
+        ]
+        fks = [
+            (colonne, fk["referred_table"], reference)
+            for fk in inspecteur.get_foreign_keys(nom)
+            for colonne, reference in zip(fk["constrained_columns"], fk["referred_columns"])
+        ]
+        tables.append(TableSchema(nom, colonnes, sorted(fks)))
+    return tables
+
+
+def _ligne_table(t: TableSchema) -> str:
+    colonnes = ", ".join(f"{c.nom} {c.type}" + (" PK" if c.cle_primaire else "") for c in t.colonnes)
+    return f"{t.nom}({colonnes})"
+
+
+def empreinte(tables: list) -> str:
+    structure = "\n".join(_ligne_table(t) + repr(t.cles_etrangeres) for t in tables)
+    return hashlib.sha256(structure.encode("utf-8")).hexdigest()[:16]
+
+
+def _est_texte(type_: str) -> bool:
+    return any(mot in type_.upper() for mot in ("CHAR", "TEXT", "STRING", "CLOB"))
+
+
+def _est_date(type_: str) -> bool:
+    return any(mot in type_.upper() for mot in ("DATE", "TIME"))
+
+
+def collecter_stats(engine, tables: list, max_valeurs: int = 12) -> dict:
+    """Statistiques bon marché qui aident le modèle à écrire ses filtres :
+    nombre de lignes, valeurs des colonnes texte peu variées (catégories),
+    nombre de valeurs des colonnes texte indexées (villes), plage des
+    colonnes de date. Retourne {table: [lignes]} et renseigne `TableSchema.lignes`."""
+    stats = {}
+    with engine.connect() as conn:
+        for t in tables:
+            source = table(t.nom, *(column(c.nom) for c in t.colonnes))
+            t.lignes = conn.execute(select(func.count()).select_from(source)).scalar()
+            lignes = [f"{t.lignes} lignes"]
+            for c in t.colonnes:
+                col = source.c[c.nom]
+                if _est_date(c.type):
+                    debut, fin = conn.execute(select(func.min(col), func.max(col))).one()
+                    if debut is not None:
+                        lignes.append(f"{c.nom} du {debut} au {fin}")
+                elif _est_texte(c.type):
+                    # Le LIMIT arrête la lecture dès que la colonne s'avère trop variée
+                    valeurs = conn.execute(
+                        select(col).where(col.isnot(None)).distinct().limit(max_valeurs + 1)
+                    ).scalars().all()
+                    if len(valeurs) <= max_valeurs:
+                        lignes.append(f"{c.nom} ∈ {{{', '.join(sorted(map(str, valeurs)))}}}")
+                    elif c.indexee:
+                        distinctes = conn.execute(select(func.count(col.distinct()))).scalar()
+                        lignes.append(f"{c.nom} : {distinctes} valeurs distinctes")
+            stats[t.nom] = lignes
+    return stats
+
+
+def formater_schema(tables: list, stats: Optional[dict] = None) -> str:
+    """Schéma compact : une ligne par table, puis les clés étrangères et,
+    le cas échéant, les statistiques."""
+    lignes = []
+    for t in tables:
+        lignes.append(_ligne_table(t))
+        for colonne, cible, reference in t.cles_etrangeres:
+            lignes.append(f"  {t.nom}.{colonne} -> {cible}.{reference}")
+        for stat in (stats or {}).get(t.nom, []):
+            lignes.append(f"  -- {stat}")
+    return "\n".join(lignes)
+
+
+def schema_depuis_metadata(metadata: MetaData) -> SchemaPrompt:
+    tables = tables_depuis_metadata(metadata)
+    return SchemaPrompt(formater_schema(tables), empreinte(tables), tables)
+
+
+def _ajouter_descriptions(tables: list, metadata: MetaData) -> None:
+    for t in tables:
+        modele = metadata.tables.get(t.nom)
+        if modele is not None:
+            t.description = modele.info.get("description", "")
+
+
+class SchemaCatalog:
+    """Schéma du prompt SQL, introspecté une fois puis mis en cache.
+
+    La structure est reconstruite après un changement de schéma dans le
+    processus (DDL, suivi par `table_versions`). Les statistiques, plus
+    coûteuses, sont collectées dans un thread et rafraîchies à l'expiration
+    de `stats_ttl_seconds` : `get()`, appelé depuis les routes asynchrones,
+    sert toujours le dernier instantané sans attendre. Repli sur les modèles
+    SQLAlchemy quand la base n'est pas encore initialisée. `notes(engine)`
+    complète les statistiques ({table: [lignes]}), par exemple la fraîcheur
+    des agrégats.
+    """
+
+    def __init__(self, engine, metadata: MetaData, stats_enabled: bool = True,
+                 stats_ttl_seconds: float = 600.0, max_valeurs: int = 12,
+                 versions: TableVersions = table_versions,
+                 notes: Optional[Callable[..., dict]] = None):
+        self.engine = engine
+        self.metadata = metadata
+        self.stats_enabled = stats_enabled
+        self.stats_ttl_seconds = stats_ttl_seconds
+        self.max_valeurs = max_valeurs
+        self.versions = versions
+        self.notes = notes
+        self.rafraichissements = 0
+        self._courant: Optional[SchemaPrompt] = None
+        self._version = None
+        # Dernières statistiques collectées, reprises par une nouvelle structure
+        self._stats: Optional[dict] = None
+        self._expiration = 0.0
+        self._collecte: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> SchemaPrompt:
+        version = self.versions.versions(())
+        with self._lock:
+            if self._courant is None or version != self._version:
+                self._courant = self._construire()
+                self._version = version
+                self._expiration = 0.0
+                self.rafraichissements += 1
+            if (self.stats_enabled and self._courant.stats is not None
+                    and time.monotonic() >= self._expiration
+                    and (self._collecte is None or not self._collecte.is_alive())):
+                self._expiration = time.monotonic() + self.stats_ttl_seconds
+                self._collecte = threading.Thread(target=self._collecter, args=(self._courant,), daemon=True)
+                self._collecte.start()
+            return self._courant
+
+    def attendre(self, timeout: Optional[float] = None) -> None:
+        """Attend la fin de la collecte de statistiques en cours, s'il y en a une."""
+        collecte = self._collecte
+        if collecte is not None:
+            collecte.join(timeout)
+
+    def invalider(self) -> None:
+        with self._lock:
+            self._courant = None
+
+    def _schema(self, tables: list, stats: Optional[dict]) -> SchemaPrompt:
+        return SchemaPrompt(formater_schema(tables, stats), empreinte(tables), tables, stats,
+                            dialecte=self.engine.dialect.name)
+
+    def _construire(self) -> SchemaPrompt:
+        """Structure seule (introspection), avec les dernières statistiques connues."""
+        tables = tables_depuis_base(self.engine)
+        if not tables:
+            schema = schema_depuis_metadata(self.metadata)
+            schema.dialecte = self.engine.dialect.name
+            return schema
+        _ajouter_descriptions(tables, self.metadata)
+        stats = None
+        if self.stats_enabled:
+            # Tables nouvelles sans statistiques jusqu'à la prochaine collecte
+            stats = {t.nom: (self._stats or {}).get(t.nom, []) for t in tables}
+        return self._schema(tables, stats)
+
+    def _collecter(self, schema: SchemaPrompt) -> None:
+        try:
+            stats = collecter_stats(self.engine, schema.tables, self.max_valeurs)
+            if self.notes is not None:
+                for nom, lignes in self.notes(self.engine).items():
+                    if nom in stats:
+                        stats[nom] = stats[nom] + lignes
+        except Exception:
+            # Base indisponible : l'instantané courant reste servi, nouvel essai au prochain délai
+            return
+        with self._lock:
+            self._stats = stats
+            # Structure inchangée pendant la collecte : statistiques publiées
+            if self._courant is schema:
+                self._courant = self._schema(schema.tables, stats)
@@ -0,0 +1,187 @@
+"""Moteur de peuplement en masse pour les tests de charge.
+
+Les valeurs sont générées de façon vectorisée (tableaux NumPy, réservoirs de
+noms/villes/mots Faker pré-générés) puis insérées par lots avec
+`executemany` dans une seule transaction.
+
+Usage : python -m backend.seeding --scale 4000 --seed 42   (~1M commandes)
+"""
+import argparse
+import math
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+from faker import Faker
+from sqlalchemy import func, select, text
+
+from backend.models import Customer, Product, Order
+from backend.rollups import TABLES_AGREGATS, rafraichir_agregats, reconstruire_agregats
+
+CATEGORIES = ['Électronique', 'Vêtements', 'Maison', 'Sport', 'Livres']
+TAILLE_RESERVOIR = 1000
+
+
+@dataclass
+class Volumes:
+    customers: int
+    products: int
+    orders: int
+
+    @classmethod
+    def depuis_echelle(cls, scale: float) -> "Volumes":
+        """Échelle 1 = jeu de démonstration (60 clients, 30 produits, 250 commandes).
+        Le catalogue produits croît moins vite que les clients et les commandes."""
+        return cls(
+            customers=max(1, round(60 * scale)),
+            products=max(1, round(30 * math.sqrt(scale))),
+            orders=max(0, round(250 * scale)),
+        )
+
+
+def _reservoirs(seed: Optional[int]):
+    fake = Faker(['fr_FR'])
+    if seed is not None:
+        fake.seed_instance(seed)
+    noms = np.array([fake.name() for _ in range(TAILLE_RESERVOIR)], dtype=object)
+    villes = np.array([fake.city() for _ in range(TAILLE_RESERVOIR // 5)], dtype=object)
+    mots = np.array([fake.word().capitalize() for _ in range(TAILLE_RESERVOIR // 2)], dtype=object)
+    domaines = np.array([fake.free_email_domain() for _ in range(10)], dtype=object)
+    return noms, villes, mots, domaines
+
+
+def _dates(rng, n: int, jours: int, today: np.datetime64) -> np.ndarray:
+    """`n` dates ISO tirées uniformément dans les `jours` derniers jours."""
+    return np.datetime_as_string(today - rng.integers(0, jours + 1, size=n).astype("timedelta64[D]"))
+
+
+def _marqueurs(dialect, n: int) -> str:
+    if dialect.paramstyle == "qmark":
+        return ", ".join("?" * n)
+    if dialect.paramstyle == "numeric":
+        return ", ".join(f":{i}" for i in range(1, n + 1))
+    return ", ".join(["%s"] * n)
+
+
+def _inserer(conn, table, colonnes: dict, batch_size: int) -> None:
+    """Insère des colonnes déjà typées par lots de `batch_size` lignes.
+
+    On passe directement par `executemany` du pilote : les valeurs sont déjà
+    au format attendu, le traitement ligne à ligne de SQLAlchemy est évité.
+    """
+    cles = list(colonnes)
+    n = len(colonnes[cles[0]])
+    sql = (f"INSERT INTO {table.name} ({', '.join(cles)}) "
+           f"VALUES ({_marqueurs(conn.dialect, len(cles))})")
+    for debut in range(0, n, batch_size):
+        fin = min(debut + batch_size, n)
+        tranches = [colonnes[c][debut:fin].tolist() for c in cles]
+        conn.exec_driver_sql(sql, list(zip(*tranches)))
+
+
+def _prochain_id(conn, model) -> int:
+    return (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def generer(conn, volumes: Volumes, seed: Optional[int] = None, batch_size: int = 50_000) -> Volumes:
+    """Ajoute `volumes` lignes aux tables via la connexion `conn` (sans commit)."""
+    rng = np.random.default_rng(seed)
+    noms, villes, mots, domaines = _reservoirs(seed)
+    today = np.datetime64("today", "D")
+
+    # Identifiants attribués à l'avance : les commandes référencent clients et
+    # produits sans relire la base.
+    premier_client = _prochain_id(conn, Customer)
+    premier_produit = _prochain_id(conn, Product)
+    premiere_commande = _prochain_id(conn, Order)
+
+    ids_clients = np.arange(premier_client, premier_client + volumes.customers)
+    choix_noms = noms[rng.integers(0, len(noms), size=volumes.customers)]
+    emails = np.array([
+        f"{nom.lower().replace(' ', '.')}.{i}@{domaine}"
+        for nom, i, domaine in zip(choix_noms, ids_clients,
+                                   domaines[rng.integers(0, len(domaines), size=volumes.customers)])
+    ], dtype=object)
+    _inserer(conn, Customer.__table__, {
+        "id": ids_clients,
+        "name": choix_noms,
+        "email": emails,
+        "city": villes[rng.integers(0, len(villes), size=volumes.customers)],
+        "created_at": _dates(rng, volumes.customers, 3 * 365, today),
+    }, batch_size)
+
+    prix = np.round(rng.uniform(10, 1000, size=volumes.products), 2)
+    _inserer(conn, Product.__table__, {
+        "id": np.arange(premier_produit, premier_produit + volumes.products),
+        "name": mots[rng.integers(0, len(mots), size=volumes.products)],
+        "category": np.array(CATEGORIES, dtype=object)[rng.integers(0, len(CATEGORIES), size=volumes.products)],
+        "price": prix,
+    }, batch_size)
+
+    if volumes.orders:
+        index_produits = rng.integers(0, volumes.products, size=volumes.orders)
+        quantites = rng.integers(1, 6, size=volumes.orders)
+        _inserer(conn, Order.__table__, {
+            "id": np.arange(premiere_commande, premiere_commande + volumes.orders),
+            "customer_id": rng.integers(premier_client, premier_client + volumes.customers, size=volumes.orders),
+            "product_id": index_produits + premier_produit,
+            "quantity": quantites,
+            "order_date": _dates(rng, volumes.orders, 365, today),
+            "total_amount": np.round(prix[index_produits] * quantites, 2),
+        }, batch_size)
+    return volumes
+
+
+def seed_bulk(engine, scale: float = 1.0, seed: Optional[int] = None, batch_size: int = 50_000,
+              volumes: Optional[Volumes] = None) -> Volumes:
+    """Peuple la base en une transaction, complète les agrégats de ventes puis
+    met à jour les statistiques."""
+    volumes = volumes or Volumes.depuis_echelle(scale)
+    with engine.begin() as conn:
+        generer(conn, volumes, seed=seed, batch_size=batch_size)
+    # Seules les commandes ajoutées sont agrégées
+    rafraichir_agregats(engine)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    return volumes
+
+
+def main():
+    from backend.database import Base, engine
+    from backend.result_cache import installer
+
+    installer(engine)
+
+    parser = argparse.ArgumentParser(description="Peuplement en masse de la base")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="facteur d'échelle (1 = 60 clients, 30 produits, 250 commandes)")
+    parser.add_argument("--seed", type=int, default=None, help="graine pour un jeu de données reproductible")
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--customers", type=int, help="remplace le nombre de clients déduit de l'échelle")
+    parser.add_argument("--products", type=int, help="remplace le nombre de produits déduit de l'échelle")
+    parser.add_argument("--orders", type=int, help="remplace le nombre de commandes déduit de l'échelle")
+    parser.add_argument("--reset", action="store_true", help="vide les tables avant de peupler")
+    args = parser.parse_args()
+
+    volumes = Volumes.depuis_echelle(args.scale)
+    volumes.customers = args.customers or volumes.customers
+    volumes.products = args.products or volumes.products
+    volumes.orders = args.orders if args.orders is not None else volumes.orders
+
+    if args.reset:
+        Base.metadata.drop_all(engine, tables=TABLES_AGREGATS + [Order.__table__, Product.__table__,
+                                                                 Customer.__table__])
+        Base.metadata.create_all(engine)
+        # Agrégats vides et filigrane remis à zéro
+        reconstruire_agregats(engine)
+    Base.metadata.create_all(engine)
+
+    debut = time.perf_counter()
+    seed_bulk(engine, seed=args.seed, batch_size=args.batch_size, volumes=volumes)
+    print(f"{volumes.customers} clients, {volumes.products} produits, {volumes.orders} commandes "
+          f"insérés en {time.perf_counter() - debut:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
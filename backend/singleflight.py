@@ -0,0 +1,53 @@
+import asyncio
+import threading
+import weakref
+
+
+class SingleFlight:
+    """Regroupe les appels concurrents portant la même clé : le premier lance
+    le calcul, les suivants attendent son résultat (ou son exception) au lieu
+    de relancer tout le pipeline.
+
+    Le calcul tourne dans sa propre tâche : l'annulation d'un appelant (client
+    déconnecté) n'interrompt pas les autres. Rien n'est mémorisé une fois le
+    calcul terminé ; c'est le rôle des caches.
+    """
+
+    def __init__(self):
+        # Une table des calculs en cours par boucle asyncio
+        self._en_cours = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def run(self, cle, factory):
+        """Résultat de `await factory()`, partagé avec les appels concurrents de même clé."""
+        taches = self._en_cours.setdefault(asyncio.get_running_loop(), {})
+        tache = taches.get(cle)
+        with self._lock:
+            if tache is None:
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+        if tache is None:
+            tache = asyncio.ensure_future(factory())
+            taches[cle] = tache
+
+            def _terminer(t):
+                taches.pop(cle, None)
+                # Exception consommée même si tous les appelants ont été annulés
+                if not t.cancelled():
+                    t.exception()
+
+            tache.add_done_callback(_terminer)
+        return await asyncio.shield(tache)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.leaders + self.coalesced
+            return {
+                "in_flight": sum(len(taches) for taches in list(self._en_cours.values())),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "coalescing_rate": round(self.coalesced / total, 4) if total else 0.0,
+            }
@@ -0,0 +1,203 @@
+import re
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from backend.execution import LECTURE_RE, message_erreur, nettoyer_sql, valider_sql
+
+CHAINE_RE = re.compile(r"'(?:[^']|'')*'")
+COMMENTAIRE_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+# REPLACE suivi d'une parenthèse est la fonction de chaîne, pas l'ordre SQL
+ECRITURE_RE = re.compile(
+    r"\b(insert|update|delete|drop|alter|create|attach|detach|pragma|vacuum|reindex|analyze|"
+    r"replace(?!\s*\()|truncate|grant|revoke)\b"
+)
+CTE_RE = re.compile(r"(?:\bwith|,)\s*(?:recursive\s+)?([a-z_]\w*)\s*(?:\([^)]*\))?\s+as\s*(?:not\s+)?(?:materialized\s+)?\(")
+SOURCE_RE = re.compile(r"\b(?:from|join)\s+(?P<suite>[a-z_][^()]*?)(?=\b(?:where|group|order|limit|having|"
+                       r"union|except|intersect|window|on|using|left|right|inner|outer|full|cross|"
+                       r"natural|join)\b|\)|$)")
+REFERENCE_RE = re.compile(r"^([a-z_]\w*)(?:\s+(?:as\s+)?([a-z_]\w*))?$")
+QUALIFIEE_RE = re.compile(r"\b([a-z_]\w*)\.([a-z_]\w*)\b")
+SCAN_RE = re.compile(r"^SCAN (\w+)")
+FONCTION_RE = re.compile(r"\(\s*(?!select\b)(?:[\w']+\s+)+$")
+
+
+class DelaiDepasse(TimeoutError):
+    pass
+
+
+def _normaliser(sql: str) -> str:
+    """SQL en minuscules, sans commentaires ni littéraux chaîne."""
+    return CHAINE_RE.sub("''", COMMENTAIRE_RE.sub(" ", nettoyer_sql(sql))).lower()
+
+
+def sources(sql_normalise: str) -> dict:
+    """Tables lues et leurs alias : {alias ou nom: table}."""
+    references = {}
+    for m in SOURCE_RE.finditer(sql_normalise):
+        if FONCTION_RE.search(sql_normalise[:m.start()]):
+            # FROM d'une fonction : extract(year from x), trim(both ' ' from x)...
+            continue
+        for morceau in m.group("suite").split(","):
+            ref = REFERENCE_RE.match(morceau.strip())
+            if ref:
+                table, alias = ref.groups()
+                references[table] = table
+                if alias:
+                    references[alias] = table
+    return references
+
+
+class SqlGuard:
+    """Contrôles avant exécution d'une requête produite par le modèle :
+    lecture seule (une seule requête SELECT/WITH), tables et colonnes
+    qualifiées connues du schéma, et plan d'exécution sans parcours complet
+    répété d'une grosse table (jointure sans condition indexable, sous-requête
+    corrélée) ni trop de parcours complets. Les colonnes non qualifiées sont
+    vérifiées par la compilation de la requête."""
+
+    def __init__(self, tables: list, large_table_rows: int = 100_000, max_full_scans: int = 3):
+        self.colonnes = {t.nom.lower(): {c.nom.lower() for c in t.colonnes} for t in tables}
+        self.lignes = {t.nom.lower(): getattr(t, "lignes", None) or 0 for t in tables}
+        self.large_table_rows = large_table_rows
+        self.max_full_scans = max_full_scans
+
+    def verifier_statique(self, sql: str) -> Optional[str]:
+        """Message de refus, ou None si la requête passe les contrôles textuels."""
+        normalise = _normaliser(sql)
+        if ";" in normalise:
+            return "Une seule requête est autorisée"
+        if not LECTURE_RE.match(normalise):
+            return "Seules les requêtes de lecture (SELECT ou WITH) sont autorisées"
+        ecriture = ECRITURE_RE.search(normalise)
+        if ecriture:
+            return f"Instruction interdite : {ecriture.group(1).upper()}"
+        if not self.colonnes:
+            return None
+
+        ctes = set(CTE_RE.findall(normalise))
+        references = sources(normalise)
+        for table in sorted(set(references.values())):
+            if table not in self.colonnes and table not in ctes:
+                return f"Table inconnue : {table}"
+        for qualificatif, colonne in QUALIFIEE_RE.findall(normalise):
+            table = references.get(qualificatif, qualificatif)
+            if table in self.colonnes and colonne not in self.colonnes[table]:
+                return f"Colonne inconnue : {table}.{colonne}"
+        return None
+
+    def verifier_plan(self, db: Session, sql: str, params: Optional[dict] = None) -> Optional[str]:
+        """Compile la requête et inspecte son plan (SQLite : EXPLAIN QUERY
+        PLAN ; autres bases : simple EXPLAIN de validation)."""
+        if db.get_bind().dialect.name != "sqlite":
+            return valider_sql(db, sql, params)
+        statement = text(f"EXPLAIN QUERY PLAN {nettoyer_sql(sql)}")
+        try:
+            plan = db.execute(statement.bindparams(**params) if params else statement).fetchall()
+        except Exception as e:
+            db.rollback()
+            return message_erreur(e)
+
+        references = sources(_normaliser(sql))
+        # Sous-requêtes corrélées : réévaluées pour chaque ligne de la requête englobante
+        repetees = {noeud for noeud, _, _, detail in plan if detail.startswith("CORRELATED")}
+        boucles = {}
+        parcourues = []
+        for noeud, parent, _, detail in plan:
+            scan = SCAN_RE.match(detail)
+            if scan is None:
+                if detail.startswith("SEARCH"):
+                    boucles[parent] = boucles.get(parent, 0) + 1
+                continue
+            table = references.get(scan.group(1).lower(), scan.group(1).lower())
+            if self.lignes.get(table, 0) >= self.large_table_rows:
+                if boucles.get(parent, 0) or parent in repetees:
+                    return (f"Parcours complet de {table} répété pour chaque ligne d'une autre table : "
+                            "ajoute une condition de jointure ou un filtre sur une colonne indexée")
+                parcourues.append(table)
+            boucles[parent] = boucles.get(parent, 0) + 1
+        if len(parcourues) > self.max_full_scans:
+            return (f"Trop de parcours complets de grosses tables ({', '.join(parcourues)}) : "
+                    "filtre davantage")
+        return None
+
+    def verifier(self, db: Session, sql: str, params: Optional[dict] = None) -> Optional[str]:
+        return self.verifier_statique(sql) or self.verifier_plan(db, sql, params)
+
+
+# Délai côté serveur des autres bases, en ms : (pose, retour à la valeur de
+# session, délai annulé avec la transaction avortée par une erreur)
+DELAIS_SERVEUR = {
+    "postgresql": ("SET LOCAL statement_timeout = {ms}", "SET LOCAL statement_timeout TO DEFAULT", True),
+    "mysql": ("SET SESSION max_execution_time = {ms}", "SET SESSION max_execution_time = DEFAULT", False),
+}
+# Messages des drivers pour une requête interrompue (SQLite, PostgreSQL, MySQL)
+INTERROMPUE_RE = re.compile(r"interrupted|statement timeout|maximum statement execution time", re.IGNORECASE)
+
+
+def _connexion_sqlite(db: Session):
+    if db.get_bind().dialect.name != "sqlite":
+        return None
+    return db.connection().connection.driver_connection
+
+
+def _depasse(e: DBAPIError, secondes: float) -> Exception:
+    if INTERROMPUE_RE.search(str(e.orig)):
+        return DelaiDepasse(f"Requête interrompue : durée maximale de {secondes:g} s dépassée")
+    return e
+
+
+@contextmanager
+def _delai_serveur(db: Session, secondes: float, instructions: tuple):
+    """Délai posé par la base elle-même (PostgreSQL : `SET LOCAL`, limité à la
+    transaction en cours ; MySQL : variable de session rétablie en sortie)."""
+    pose, retour, transactionnel = instructions
+    db.execute(text(pose.format(ms=max(1, int(secondes * 1000)))))
+    reussi = False
+    try:
+        yield
+        reussi = True
+    except DBAPIError as e:
+        erreur = _depasse(e, secondes)
+        if erreur is e:
+            raise
+        raise erreur from e
+    finally:
+        # Une transaction PostgreSQL avortée n'accepte plus d'instruction :
+        # le délai disparaît avec son rollback
+        if reussi or not transactionnel:
+            db.execute(text(retour))
+
+
+@contextmanager
+def delai_max(db: Session, secondes: Optional[float], pas: int = 10_000):
+    """Interrompt la requête en cours au-delà de `secondes` (SQLite : progress
+    handler appelé toutes les `pas` instructions de la machine virtuelle ;
+    PostgreSQL et MySQL : délai d'exécution côté serveur)."""
+    if not secondes:
+        yield
+        return
+    instructions = DELAIS_SERVEUR.get(db.get_bind().dialect.name)
+    if instructions is not None:
+        with _delai_serveur(db, secondes, instructions):
+            yield
+        return
+    connexion = _connexion_sqlite(db)
+    if connexion is None:
+        yield
+        return
+    limite = time.monotonic() + secondes
+    connexion.set_progress_handler(lambda: time.monotonic() > limite, pas)
+    try:
+        yield
+    except DBAPIError as e:
+        erreur = _depasse(e, secondes)
+        if erreur is e:
+            raise
+        raise erreur from e
+    finally:
+        connexion.set_progress_handler(None, pas)
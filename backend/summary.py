@@ -0,0 +1,96 @@
+import math
+from dataclasses import dataclass
+
+import pandas as pd
+
+
+def estimer_tokens(texte: str) -> int:
+    """Estimation grossière du nombre de tokens (~4 caractères par token)."""
+    return math.ceil(len(texte) / 4)
+
+
+@dataclass
+class DonneesPrompt:
+    """Bloc de données inséré dans le prompt de réponse, avec sa mesure."""
+    texte: str
+    tokens_bruts: int
+    tokens_envoyes: int
+    resume: bool
+
+    @property
+    def reduction(self) -> float:
+        if not self.tokens_bruts:
+            return 0.0
+        return round(1 - self.tokens_envoyes / self.tokens_bruts, 4)
+
+
+def _nombre(valeur) -> str:
+    if isinstance(valeur, float) and not valeur.is_integer():
+        return f"{valeur:.2f}"
+    return str(int(valeur)) if isinstance(valeur, float) else str(valeur)
+
+
+def _resumer_colonne(nom: str, serie: pd.Series, top_k: int) -> str:
+    non_nuls = serie.dropna()
+    manquants = len(serie) - len(non_nuls)
+    suffixe = f", {manquants} vides" if manquants else ""
+    if non_nuls.empty:
+        return f"- {nom} : toutes les valeurs sont vides"
+
+    if pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie):
+        # SQLAlchemy renvoie Numeric en Decimal et SQLite les dates en texte
+        numerique = pd.to_numeric(non_nuls, errors="coerce")
+        if numerique.notna().all():
+            non_nuls = numerique.astype(float)
+        else:
+            dates = pd.to_datetime(non_nuls, errors="coerce", format="ISO8601")
+            if dates.notna().all():
+                non_nuls = dates
+
+    if pd.api.types.is_bool_dtype(non_nuls):
+        non_nuls = non_nuls.astype(str)
+    if pd.api.types.is_numeric_dtype(non_nuls):
+        valeurs = non_nuls.to_numpy(dtype=float)
+        return (f"- {nom} (nombre) : min {_nombre(valeurs.min())}, max {_nombre(valeurs.max())}, "
+                f"moyenne {_nombre(valeurs.mean())}, somme {_nombre(valeurs.sum())}{suffixe}")
+    if pd.api.types.is_datetime64_any_dtype(non_nuls):
+        return (f"- {nom} (date) : du {non_nuls.min().date().isoformat()} "
+                f"au {non_nuls.max().date().isoformat()}{suffixe}")
+
+    frequences = non_nuls.astype(str).value_counts()
+    top = ", ".join(f"{valeur} ({n})" for valeur, n in frequences.head(top_k).items())
+    return f"- {nom} (texte) : {len(frequences)} valeurs distinctes ; les plus fréquentes : {top}{suffixe}"
+
+
+def resumer_resultat(data: list, echantillon: int = 5, top_k: int = 5) -> str:
+    """Résumé compact d'un résultat : statistiques par colonne (calculées de
+    façon vectorisée avec pandas/NumPy) suivies de quelques lignes d'exemple."""
+    df = pd.DataFrame.from_records(data)
+    lignes = [f"{len(df)} lignes, colonnes : {', '.join(map(str, df.columns))}"]
+    lignes += [_resumer_colonne(str(nom), df[nom], top_k) for nom in df.columns]
+    if echantillon:
+        lignes.append(f"Exemple ({min(echantillon, len(data))} premières lignes) : {data[:echantillon]}")
+    return "\n".join(lignes)
+
+
+def preparer_donnees(data: list, token_budget: int = 1500, echantillon: int = 5,
+                     top_k: int = 5) -> DonneesPrompt:
+    """Choisit la représentation des données envoyée au modèle de chat.
+
+    Les résultats qui tiennent dans `token_budget` sont envoyés tels quels ;
+    au-delà, on envoie un résumé statistique et un échantillon réduit
+    jusqu'à respecter le budget.
+    """
+    brut = str(data)
+    tokens_bruts = estimer_tokens(brut)
+    if tokens_bruts <= token_budget:
+        return DonneesPrompt(brut, tokens_bruts, tokens_bruts, resume=False)
+
+    texte = resumer_resultat(data, echantillon=echantillon, top_k=top_k)
+    while estimer_tokens(texte) > token_budget and (echantillon > 0 or top_k > 1):
+        if echantillon > 0:
+            echantillon -= 1
+        else:
+            top_k -= 1
+        texte = resumer_resultat(data, echantillon=echantillon, top_k=top_k)
+    return DonneesPrompt(texte, tokens_bruts, estimer_tokens(texte), resume=True)
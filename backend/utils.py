@@ -1,56 +1,28 @@
-from faker import Faker
+from sqlalchemy import text
 from sqlalchemy.orm import Session
-from .models import Customer, Product, Order
-import random
-from datetime import datetime, timedelta
+from .database import Base
+from .models import Customer
+from .seeding import Volumes, generer
 
-fake = Faker(['fr_FR'])
+
+def optimiser_base(engine):
+    """Crée les index manquants (bases créées avant leur ajout) puis met à
+    jour les statistiques de l'optimiseur."""
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+        conn.execute(text("ANALYZE"))
 
 def seed_db(db: Session):
+    """Jeu de démonstration (60 clients, 30 produits, 250 commandes), inséré
+    une seule fois ; les volumes plus importants passent par `backend.seeding`."""
     if db.query(Customer).count() > 0:
         return
 
-    # Generate Customers
-    customers = []
-    for _ in range(60):
-        customer = Customer(
-            name=fake.name(),
-            email=fake.email(),
-            city=fake.city(),
-            created_at=fake.date_between(start_date='-3y', end_date='today')
-        )
-        db.add(customer)
-        customers.append(customer)
-    
-    # Generate Products
-    products = []
-    categories = ['Électronique', 'Vêtements', 'Maison', 'Sport', 'Livres']
-    for _ in range(30):
-        product = Product(
-            name=fake.word().capitalize(),
-            category=random.choice(categories),
-            price=round(random.uniform(10, 1000), 2)
-        )
-        db.add(product)
-        products.append(product)
-    
+    generer(db.connection(), Volumes.depuis_echelle(1))
     db.commit()
 
-
-    for _ in range(250):
-        customer = random.choice(customers)
-        product = random.choice(products)
-        quantity = random.randint(1, 5)
-        order_date = fake.date_between(start_date='-1y', end_date='today')
-        total_amount = round(float(product.price) * quantity, 2)
-        
-        order = Order(
-            customer_id=customer.id,
-            product_id=product.id,
-            quantity=quantity,
-            order_date=order_date,
-            total_amount=total_amount
-        )
-        db.add(order)
-    
+    # Statistiques à jour pour que l'optimiseur choisisse les bons index
+    db.execute(text("ANALYZE"))
     db.commit()
@@ -0,0 +1,97 @@
+"""Compare SQLite (profil de performance, index composites) et la copie en
+colonnes DuckDB sur des agrégations typiques : regroupements et fenêtres de
+dates. Mesure aussi la copie initiale et la synchronisation incrémentale.
+
+Usage : python -m benchmarks.bench_columnar [--orders 1000000 10000000] [--repeat 3]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.columnar import ColumnarStore
+from backend.database import Base, configurer_sqlite
+from backend.execution import executer
+from backend.seeding import Volumes, generer
+from backend.utils import optimiser_base
+
+REQUETES = {
+    "CA par catégorie": (
+        "SELECT p.category, SUM(o.total_amount) AS ca FROM orders o "
+        "JOIN products p ON p.id = o.product_id GROUP BY p.category"),
+    "CA par ville (top 10)": (
+        "SELECT c.city, SUM(o.total_amount) AS ca FROM orders o JOIN customers c ON c.id = o.customer_id "
+        "GROUP BY c.city ORDER BY ca DESC LIMIT 10"),
+    "CA par mois": (
+        "SELECT strftime('%Y-%m', order_date) AS mois, SUM(total_amount) AS ca, COUNT(*) AS n "
+        "FROM orders GROUP BY mois ORDER BY mois"),
+    "fenêtre de 30 jours": (
+        "SELECT COUNT(*), SUM(total_amount), AVG(quantity) FROM orders WHERE order_date >= :debut"),
+    "panier moyen par client": (
+        "SELECT customer_id, AVG(total_amount) AS panier FROM orders GROUP BY customer_id "
+        "ORDER BY panier DESC LIMIT 20"),
+}
+
+
+def _chrono(fonction, repeat: int) -> float:
+    meilleur = float("inf")
+    for _ in range(repeat):
+        debut = time.perf_counter()
+        fonction()
+        meilleur = min(meilleur, time.perf_counter() - debut)
+    return meilleur * 1000
+
+
+def mesurer(n_commandes: int, repeat: int, seed: int) -> None:
+    with tempfile.TemporaryDirectory() as dossier:
+        engine = create_engine(f"sqlite:///{os.path.join(dossier, 'bench.db')}")
+        configurer_sqlite(engine)
+        Base.metadata.create_all(engine)
+        debut = time.perf_counter()
+        with engine.begin() as conn:
+            generer(conn, Volumes.depuis_echelle(n_commandes / 250), seed=seed)
+        optimiser_base(engine)
+        print(f"\n== {n_commandes} commandes (génération {time.perf_counter() - debut:.1f} s)")
+
+        store = ColumnarStore(engine, intervalle_sync=3600)
+        debut = time.perf_counter()
+        copiees = store.synchroniser()
+        print(f"copie initiale en colonnes : {copiees} lignes en {time.perf_counter() - debut:.1f} s")
+        with engine.begin() as conn:
+            generer(conn, Volumes(customers=10, products=1, orders=10_000), seed=seed + 1)
+        debut = time.perf_counter()
+        copiees = store.synchroniser()
+        print(f"synchronisation incrémentale : {copiees} lignes en {time.perf_counter() - debut:.2f} s")
+
+        db = sessionmaker(bind=engine)()
+        params = {"debut": time.strftime("%Y-%m-%d", time.localtime(time.time() - 30 * 86400))}
+        print(f"{'requête':<26} {'SQLite ms':>10} {'DuckDB ms':>10} {'gain':>7}")
+        for nom, sql in REQUETES.items():
+            p = params if ":debut" in sql else None
+            attendu = executer(db, sql, p).rows
+            obtenu = store.executer(sql, p)
+            if obtenu is None or len(obtenu.rows) != len(attendu):
+                print(f"{nom:<26} résultat DuckDB indisponible ou différent, ignoré")
+                continue
+            sqlite_ms = _chrono(lambda: executer(db, sql, p), repeat)
+            duckdb_ms = _chrono(lambda: store.executer(sql, p), repeat)
+            print(f"{nom:<26} {sqlite_ms:>10.1f} {duckdb_ms:>10.1f} {sqlite_ms / duckdb_ms:>6.1f}x")
+        db.close()
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    for n in args.orders:
+        mesurer(n, args.repeat, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Compare les requêtes analytiques de l'agent sur une base SQLite sans index
+secondaires (PRAGMA par défaut) et avec le profil de performance
+(index composites, WAL, cache/mmap, ANALYZE).
+
+Usage : python -m benchmarks.bench_indexes [--orders 1000000] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, text
+
+from backend.database import Base, configurer_sqlite
+from backend.intents import IntentMatcher
+from backend import models  # noqa: F401  (enregistre les tables dans Base.metadata)
+
+QUESTIONS = [
+    "Combien de commandes avons-nous ?",
+    "Quels sont les 5 produits les plus vendus ?",
+    "Quel est le chiffre d'affaires du mois dernier ?",
+    "Quels clients n'ont pas commandé depuis 3 mois ?",
+    "Compare les ventes de janvier et février",
+]
+
+# Requêtes typiques produites par le modèle SQL (filtres et jointures)
+REQUETES_LLM = {
+    "ventes_par_ville": (
+        "SELECT c.city, SUM(o.total_amount) AS ca FROM orders o "
+        "JOIN customers c ON c.id = o.customer_id WHERE c.city = 'Paris' GROUP BY c.city"
+    ),
+    "ventes_par_categorie": (
+        "SELECT p.category, SUM(o.quantity) AS qte FROM orders o "
+        "JOIN products p ON p.id = o.product_id WHERE p.category = 'Sport' GROUP BY p.category"
+    ),
+    "commandes_d_un_client": "SELECT COUNT(*) FROM orders WHERE customer_id = 42",
+}
+
+VILLES = ["Paris", "Lyon", "Marseille", "Toulouse", "Nice", "Nantes", "Lille", "Bordeaux"]
+CATEGORIES = ["Électronique", "Vêtements", "Maison", "Sport", "Livres"]
+
+
+def generer_base(chemin: str, n_orders: int, seed: int = 42) -> None:
+    rng = random.Random(seed)
+    engine = create_engine(f"sqlite:///{chemin}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+    n_customers, n_products = max(n_orders // 20, 60), 200
+    debut = date.today() - timedelta(days=730)
+    conn = sqlite3.connect(chemin)
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.executemany(
+        "INSERT INTO customers (id, name, email, city, created_at) VALUES (?, ?, ?, ?, ?)",
+        ((i, f"Client {i}", f"client{i}@example.com", rng.choice(VILLES),
+          (debut + timedelta(days=rng.randrange(730))).isoformat()) for i in range(1, n_customers + 1)),
+    )
+    prix = {i: round(rng.uniform(10, 1000), 2) for i in range(1, n_products + 1)}
+    conn.executemany(
+        "INSERT INTO products (id, name, category, price) VALUES (?, ?, ?, ?)",
+        ((i, f"Produit {i}", rng.choice(CATEGORIES), prix[i]) for i in prix),
+    )
+
+    def commandes():
+        for i in range(1, n_orders + 1):
+            produit, quantite = rng.randrange(1, n_products + 1), rng.randint(1, 5)
+            yield (i, rng.randrange(1, n_customers + 1), produit, quantite,
+                   (debut + timedelta(days=rng.randrange(730))).isoformat(),
+                   round(prix[produit] * quantite, 2))
+
+    conn.executemany(
+        "INSERT INTO orders (id, customer_id, product_id, quantity, order_date, total_amount) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        commandes(),
+    )
+    conn.commit()
+    conn.close()
+
+
+def supprimer_index_secondaires(chemin: str) -> None:
+    conn = sqlite3.connect(chemin)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if set(index.columns.keys()) != {"id"}:
+                conn.execute(f"DROP INDEX IF EXISTS {index.name}")
+    conn.commit()
+    conn.close()
+
+
+def mesurer(engine, requetes: dict, repeat: int) -> dict:
+    durees = {}
+    with engine.connect() as conn:
+        for nom, (sql, params) in requetes.items():
+            meilleur = float("inf")
+            for _ in range(repeat):
+                debut = time.perf_counter()
+                conn.execute(text(sql).bindparams(**params)).fetchall()
+                meilleur = min(meilleur, time.perf_counter() - debut)
+            durees[nom] = meilleur * 1000
+    return durees
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    matcher = IntentMatcher()
+    requetes = {m.name: (m.sql, m.params) for m in map(matcher.match, QUESTIONS)}
+    requetes.update({nom: (sql, {}) for nom, sql in REQUETES_LLM.items()})
+
+    dossier = tempfile.mkdtemp(prefix="bench_indexes_")
+    try:
+        optimisee = os.path.join(dossier, "optimisee.db")
+        brute = os.path.join(dossier, "brute.db")
+        debut = time.perf_counter()
+        generer_base(optimisee, args.orders)
+        print(f"Base de {args.orders} commandes générée en {time.perf_counter() - debut:.1f} s")
+        shutil.copy(optimisee, brute)
+        supprimer_index_secondaires(brute)
+
+        engine_brut = create_engine(f"sqlite:///{brute}")
+        engine_optimise = create_engine(f"sqlite:///{optimisee}")
+        configurer_sqlite(engine_optimise)
+        with engine_optimise.begin() as conn:
+            conn.execute(text("ANALYZE"))
+
+        avant = mesurer(engine_brut, requetes, args.repeat)
+        apres = mesurer(engine_optimise, requetes, args.repeat)
+        engine_brut.dispose()
+        engine_optimise.dispose()
+
+        print(f"{'requête':<26} {'sans index (ms)':>16} {'profil perf (ms)':>17} {'gain':>7}")
+        for nom in requetes:
+            print(f"{nom:<26} {avant[nom]:>16.1f} {apres[nom]:>17.1f} {avant[nom] / apres[nom]:>6.1f}x")
+    finally:
+        shutil.rmtree(dossier, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""Charge de bout en bout sur /ask, sans réseau : l'API tourne contre le
+serveur LLM local `benchmarks.stub_llm` et une base peuplée à l'échelle
+demandée, dans un répertoire temporaire.
+
+Pour chaque configuration (variables d'environnement de l'API) et chaque
+niveau de concurrence : latence p50/p95/p99, débit, erreurs et mémoire
+(RSS maximale) du processus de l'API.
+
+Usage : python -m benchmarks.bench_load [--scale 1] [--concurrency 1 8 32]
+        [--requests 200] [--llm-latency-ms 300] [--unique] [--stream]
+        [--config sans_caches:SQL_CACHE_ENABLED=false,RESULT_CACHE_ENABLED=false]
+        [--json resultats.json] [--max-p95-ms 2000]
+
+Avec --max-p95-ms, le code de sortie vaut 1 si une mesure dépasse le seuil.
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+from benchmarks.stub_llm import QUESTIONS_SQL
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Configurations mesurées par défaut (nom -> variables d'environnement)
+CONFIGURATIONS = {
+    "defaut": {},
+    "sans_caches": {"SQL_CACHE_ENABLED": "false", "RESULT_CACHE_ENABLED": "false",
+                    "COALESCING_ENABLED": "false"},
+}
+
+
+@dataclass
+class Mesure:
+    configuration: str
+    concurrence: int
+    requetes: int
+    erreurs: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    debit_rps: float
+    rss_max_mib: float
+
+
+def port_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _attendre(port: int, chemin: str, processus: subprocess.Popen, delai: float = 60.0) -> None:
+    limite = time.monotonic() + delai
+    while time.monotonic() < limite:
+        if processus.poll() is not None:
+            raise RuntimeError(f"Le processus s'est arrêté (code {processus.returncode})")
+        try:
+            connexion = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            connexion.request("GET", chemin)
+            if connexion.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"http://127.0.0.1:{port}{chemin} ne répond pas")
+
+
+def _environnement(extra: dict) -> dict:
+    env = dict(os.environ, PYTHONPATH=RACINE + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    env.update(extra)
+    return env
+
+
+def rss_max_mib(pid: int) -> float:
+    """RSS maximale d'un processus (Linux : VmHWM), 0 si indisponible."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for ligne in f:
+                if ligne.startswith("VmHWM:"):
+                    return int(ligne.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def percentiles(durees_ms: list) -> tuple:
+    if not durees_ms:
+        return 0.0, 0.0, 0.0
+    p50, p95, p99 = np.percentile(durees_ms, [50, 95, 99])
+    return round(float(p50), 1), round(float(p95), 1), round(float(p99), 1)
+
+
+def questions_charge(n: int, uniques: bool) -> list:
+    """`n` questions tirées des questions connues du faux modèle ; `uniques`
+    les rend toutes différentes (aucun cache ni regroupement ne s'applique)."""
+    base = [question for question, _ in QUESTIONS_SQL]
+    return [f"{base[i % len(base)]} (requête {i})" if uniques else base[i % len(base)] for i in range(n)]
+
+
+def generer_charge(port: int, questions: list, concurrence: int, stream: bool = False) -> tuple:
+    """Envoie les questions avec `concurrence` clients HTTP keep-alive.
+    Retourne (durées en ms des réponses correctes, nombre d'erreurs, durée totale en s)."""
+    chemin = "/ask/stream" if stream else "/ask"
+    suivante = iter(range(len(questions)))
+    verrou = threading.Lock()
+    durees, erreurs = [], [0]
+
+    def client():
+        connexion = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+        while True:
+            with verrou:
+                i = next(suivante, None)
+            if i is None:
+                break
+            corps = json.dumps({"question": questions[i], "api_key": "bench"})
+            debut = time.perf_counter()
+            try:
+                connexion.request("POST", chemin, corps, {"Content-Type": "application/json"})
+                reponse = connexion.getresponse()
+                reponse.read()
+                ok = reponse.status == 200
+            except (OSError, http.client.HTTPException):
+                connexion.close()
+                connexion = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+                ok = False
+            duree = (time.perf_counter() - debut) * 1000
+            with verrou:
+                if ok:
+                    durees.append(duree)
+                else:
+                    erreurs[0] += 1
+        connexion.close()
+
+    debut = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrence) as pool:
+        for _ in range(concurrence):
+            pool.submit(client)
+    return durees, erreurs[0], time.perf_counter() - debut
+
+
+def preparer_base(dossier: str, scale: float, seed: int) -> None:
+    os.makedirs(os.path.join(dossier, "data"), exist_ok=True)
+    subprocess.run([sys.executable, "-m", "backend.bootstrap", "--scale", str(scale), "--seed", str(seed)],
+                   cwd=dossier, env=_environnement({}), check=True, stdout=subprocess.DEVNULL)
+
+
+def mesurer_configuration(nom: str, env_config: dict, base: str, port_llm: int, args) -> list:
+    """Démarre une API neuve (copie de la base, caches vides) et la mesure à
+    chaque niveau de concurrence."""
+    dossier = tempfile.mkdtemp(prefix=f"bench_{nom}_")
+    shutil.copytree(os.path.join(base, "data"), os.path.join(dossier, "data"),
+                    ignore=shutil.ignore_patterns("sql_cache.db*"))
+    port = port_libre()
+    env = _environnement({"LLM_BASE_URL": f"http://127.0.0.1:{port_llm}/v1", **env_config})
+    api = subprocess.Popen([sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port),
+                            "--log-level", "warning"], cwd=dossier, env=env)
+    mesures = []
+    try:
+        _attendre(port, "/ready", api)
+        generer_charge(port, questions_charge(len(QUESTIONS_SQL), uniques=False), 1, args.stream)
+        for concurrence in args.concurrency:
+            questions = questions_charge(args.requests, args.unique)
+            durees, erreurs, total = generer_charge(port, questions, concurrence, args.stream)
+            mesures.append(Mesure(nom, concurrence, len(questions), erreurs, *percentiles(durees),
+                                  round(len(durees) / total, 1) if total else 0.0, round(rss_max_mib(api.pid), 1)))
+            print(_ligne(mesures[-1]), flush=True)
+    finally:
+        api.terminate()
+        api.wait(timeout=10)
+        shutil.rmtree(dossier, ignore_errors=True)
+    return mesures
+
+
+def _ligne(m: Mesure) -> str:
+    return (f"{m.configuration:<14} {m.concurrence:>5} {m.requetes:>8} {m.erreurs:>7} {m.p50_ms:>9} "
+            f"{m.p95_ms:>9} {m.p99_ms:>9} {m.debit_rps:>9} {m.rss_max_mib:>9}")
+
+
+def _configurations(valeurs: list) -> dict:
+    if not valeurs:
+        return CONFIGURATIONS
+    configurations = {}
+    for valeur in valeurs:
+        nom, _, variables = valeur.partition(":")
+        configurations[nom] = dict(v.split("=", 1) for v in variables.split(",") if v)
+    return configurations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1.0, help="facteur d'échelle de la base")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="requêtes par niveau de concurrence")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--token-delay-ms", type=float, default=15.0)
+    parser.add_argument("--unique", action="store_true", help="questions toutes différentes (caches inopérants)")
+    parser.add_argument("--stream", action="store_true", help="mesure /ask/stream au lieu de /ask")
+    parser.add_argument("--config", action="append",
+                        help="nom:VAR=valeur,VAR=valeur (répétable ; défaut : defaut et sans_caches)")
+    parser.add_argument("--json", help="écrit les mesures dans ce fichier")
+    parser.add_argument("--max-p95-ms", type=float, help="échoue si un p95 dépasse ce seuil")
+    args = parser.parse_args()
+
+    base = tempfile.mkdtemp(prefix="bench_base_")
+    port_llm = port_libre()
+    stub = subprocess.Popen([sys.executable, "-m", "benchmarks.stub_llm", "--port", str(port_llm),
+                             "--latency-ms", str(args.llm_latency_ms),
+                             "--token-delay-ms", str(args.token_delay_ms)], env=_environnement({}))
+    mesures = []
+    try:
+        debut = time.perf_counter()
+        preparer_base(base, args.scale, args.seed)
+        print(f"base peuplée (échelle {args.scale:g}) en {time.perf_counter() - debut:.1f} s")
+        _attendre(port_llm, "/health", stub)
+
+        print(f"{'configuration':<14} {'conc.':>5} {'requêtes':>8} {'erreurs':>7} {'p50 ms':>9} "
+              f"{'p95 ms':>9} {'p99 ms':>9} {'req/s':>9} {'RSS MiB':>9}")
+        for nom, env_config in _configurations(args.config).items():
+            mesures += mesurer_configuration(nom, env_config, base, port_llm, args)
+    finally:
+        stub.terminate()
+        stub.wait(timeout=10)
+        shutil.rmtree(base, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([asdict(m) for m in mesures], f, indent=2)
+    if args.max_p95_ms is not None:
+        depassements = [m for m in mesures if m.p95_ms > args.max_p95_ms or m.erreurs]
+        if depassements:
+            print(f"{len(depassements)} mesure(s) au-delà de p95 {args.max_p95_ms:g} ms ou en erreur")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Mesure la réduction du prompt de réponse apportée par le résumé des résultats.
+
+Usage : python -m benchmarks.bench_prompt_summary [--budget 1500]
+"""
+import argparse
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from backend.summary import preparer_donnees
+
+VILLES = ["Paris", "Lyon", "Marseille", "Nantes", "Lille", "Bordeaux"]
+CATEGORIES = ["Électronique", "Vêtements", "Maison", "Sport", "Livres"]
+
+
+def generer_lignes(n: int) -> list:
+    return [
+        {
+            "order_id": i,
+            "city": VILLES[i % len(VILLES)],
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "order_date": (date(2025, 1, 1) + timedelta(days=i % 365)).isoformat(),
+            "quantity": 1 + i % 5,
+            "total_amount": Decimal(10 + i % 990) + Decimal("0.99"),
+        }
+        for i in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget", type=int, default=1500, help="budget de tokens du bloc de données")
+    args = parser.parse_args()
+
+    print(f"{'lignes':>8} {'tokens bruts':>13} {'tokens envoyés':>15} {'réduction':>10} {'durée (ms)':>11}")
+    for n in (1, 10, 100, 1_000, 10_000, 100_000):
+        data = generer_lignes(n)
+        debut = time.perf_counter()
+        prompt = preparer_donnees(data, token_budget=args.budget)
+        duree = (time.perf_counter() - debut) * 1000
+        print(f"{n:>8} {prompt.tokens_bruts:>13} {prompt.tokens_envoyes:>15} "
+              f"{prompt.reduction:>10.1%} {duree:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
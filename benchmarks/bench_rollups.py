@@ -0,0 +1,93 @@
+"""Compare les questions de chiffre d'affaires calculées sur orders et sur
+les tables d'agrégats, et mesure le coût du rafraîchissement incrémental.
+
+Usage : python -m benchmarks.bench_rollups [--orders 1000000] [--increment 10000] [--repeat 3]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+
+from backend.database import Base, configurer_sqlite
+from backend.rollups import rafraichir_agregats, reconstruire_agregats
+from backend.seeding import Volumes, generer
+from backend.utils import optimiser_base
+
+# (question, SQL sur orders, SQL sur les agrégats, lignes lues dans chaque cas)
+REQUETES = [
+    ("Chiffre d'affaires du mois dernier",
+     "SELECT SUM(total_amount) FROM orders WHERE order_date >= date('now', 'start of month', '-1 month') "
+     "AND order_date < date('now', 'start of month')",
+     "SELECT SUM(revenue) FROM sales_daily WHERE day >= date('now', 'start of month', '-1 month') "
+     "AND day < date('now', 'start of month')",
+     "SELECT COUNT(*) FROM orders WHERE order_date >= date('now', 'start of month', '-1 month') "
+     "AND order_date < date('now', 'start of month')",
+     "SELECT COUNT(*) FROM sales_daily WHERE day >= date('now', 'start of month', '-1 month') "
+     "AND day < date('now', 'start of month')"),
+    ("Chiffre d'affaires par mois",
+     "SELECT strftime('%Y-%m', order_date) AS mois, SUM(total_amount) FROM orders GROUP BY mois",
+     "SELECT month, SUM(revenue) FROM sales_monthly GROUP BY month",
+     "SELECT COUNT(*) FROM orders",
+     "SELECT COUNT(*) FROM sales_monthly"),
+    ("Chiffre d'affaires par catégorie et ville",
+     "SELECT p.category, c.city, SUM(o.total_amount) FROM orders o JOIN products p ON p.id = o.product_id "
+     "JOIN customers c ON c.id = o.customer_id GROUP BY p.category, c.city",
+     "SELECT category, city, SUM(revenue) FROM sales_monthly GROUP BY category, city",
+     "SELECT COUNT(*) FROM orders",
+     "SELECT COUNT(*) FROM sales_monthly"),
+]
+
+
+def _chrono(conn, sql: str, repeat: int) -> float:
+    meilleur = float("inf")
+    for _ in range(repeat):
+        debut = time.perf_counter()
+        conn.execute(text(sql)).fetchall()
+        meilleur = min(meilleur, time.perf_counter() - debut)
+    return meilleur * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--increment", type=int, default=10_000, help="commandes ajoutées avant le rafraîchissement")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier:
+        engine = create_engine(f"sqlite:///{os.path.join(dossier, 'bench.db')}")
+        configurer_sqlite(engine)
+        Base.metadata.create_all(engine)
+        volumes = Volumes.depuis_echelle(args.orders / 250)
+        debut = time.perf_counter()
+        with engine.begin() as conn:
+            generer(conn, volumes, seed=args.seed)
+        print(f"{volumes.orders} commandes générées en {time.perf_counter() - debut:.1f} s")
+
+        debut = time.perf_counter()
+        reconstruire_agregats(engine)
+        print(f"construction complète des agrégats : {time.perf_counter() - debut:.2f} s")
+
+        with engine.begin() as conn:
+            generer(conn, Volumes(customers=10, products=1, orders=args.increment), seed=args.seed + 1)
+        debut = time.perf_counter()
+        traitees = rafraichir_agregats(engine)
+        print(f"rafraîchissement incrémental ({traitees} commandes) : {time.perf_counter() - debut:.3f} s")
+        optimiser_base(engine)
+
+        print(f"\n{'question':<44} {'orders ms':>10} {'agrégats ms':>12} {'lignes':>18}")
+        with engine.connect() as conn:
+            for question, sql_orders, sql_agregats, lignes_orders, lignes_agregats in REQUETES:
+                brut = _chrono(conn, sql_orders, args.repeat)
+                agrege = _chrono(conn, sql_agregats, args.repeat)
+                avant = conn.execute(text(lignes_orders)).scalar()
+                apres = conn.execute(text(lignes_agregats)).scalar()
+                print(f"{question:<44} {brut:>10.1f} {agrege:>12.2f} {f'{avant} -> {apres}':>18}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
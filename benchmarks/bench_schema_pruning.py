@@ -0,0 +1,130 @@
+"""Mesure l'effet de la sélection des tables sur le prompt SQL, sur un schéma
+synthétique de 200 tables (40 domaines x 5 entités, clés étrangères internes
+à chaque domaine).
+
+Sans clé API : taille du bloc de schéma (tokens), rappel des tables
+nécessaires à chaque question et durée de la sélection.
+Avec --api-key : appelle aussi le modèle SQL avec et sans sélection et
+compte les requêtes qui lisent exactement les tables attendues.
+
+Usage : python -m benchmarks.bench_schema_pruning [--top-k 5] [--api-key ...]
+"""
+import argparse
+import random
+import time
+
+from backend.result_cache import canonicaliser_sql, tables_lues
+from backend.schema import ColonneSchema, SchemaPrompt, TableSchema, empreinte, formater_schema
+from backend.summary import estimer_tokens
+
+DOMAINES = [
+    "boutique", "entrepot", "atelier", "clinique", "ecole", "hotel", "agence", "banque",
+    "garage", "librairie", "pharmacie", "restaurant", "cinema", "musee", "stade", "ferme",
+    "laboratoire", "imprimerie", "aeroport", "port", "theatre", "piscine", "salon", "galerie",
+    "marche", "pressing", "fleuriste", "boulangerie", "brasserie", "camping", "chantier",
+    "cabinet", "centrale", "cooperative", "creche", "fonderie", "gare", "haras", "manege", "studio",
+]
+# (nom de table, description, colonnes propres)
+ENTITES = [
+    ("members", "adhérents inscrits", ["name", "email", "city", "joined_at"]),
+    ("suppliers", "fournisseurs", ["company", "country", "rating"]),
+    ("items", "articles référencés", ["label", "family", "unit_price"]),
+    ("purchases", "achats et paiements", ["quantity", "paid_at", "amount"]),
+    ("incidents", "réclamations et incidents", ["severity", "opened_at", "resolved"]),
+]
+
+
+def generer_schema(seed: int = 42) -> list:
+    rng = random.Random(seed)
+    tables = []
+    for domaine in DOMAINES:
+        for entite, description, colonnes in ENTITES:
+            nom = f"{domaine}_{entite}"
+            cols = [ColonneSchema("id", "INTEGER", cle_primaire=True)]
+            cols += [ColonneSchema(c, rng.choice(["VARCHAR", "INTEGER", "DATE", "NUMERIC"])) for c in colonnes]
+            fks = []
+            if entite == "items":
+                fks.append(("supplier_id", f"{domaine}_suppliers", "id"))
+            elif entite == "purchases":
+                fks += [("member_id", f"{domaine}_members", "id"), ("item_id", f"{domaine}_items", "id")]
+            elif entite == "incidents":
+                fks.append(("purchase_id", f"{domaine}_purchases", "id"))
+            cols += [ColonneSchema(colonne, "INTEGER") for colonne, _, _ in fks]
+            tables.append(TableSchema(nom, cols, sorted(fks), f"{description} du domaine {domaine}"))
+    return tables
+
+
+def generer_questions(n: int, seed: int = 42) -> list:
+    """(question, tables nécessaires)"""
+    rng = random.Random(seed)
+    gabarits = [
+        ("Combien d'adhérents inscrits compte le domaine {d} ?", ["members"]),
+        ("Liste les fournisseurs du domaine {d} par pays", ["suppliers"]),
+        ("Montant total des achats du domaine {d} par adhérent", ["purchases", "members"]),
+        ("Quels articles du domaine {d} ont le prix unitaire le plus élevé ?", ["items"]),
+        ("Nombre de réclamations non résolues par article pour le domaine {d}",
+         ["incidents", "purchases", "items"]),
+        ("Quels fournisseurs du domaine {d} vendent les articles les plus achetés ?",
+         ["suppliers", "items", "purchases"]),
+    ]
+    questions = []
+    for _ in range(n):
+        domaine = rng.choice(DOMAINES)
+        gabarit, entites = rng.choice(gabarits)
+        questions.append((gabarit.format(d=domaine), {f"{domaine}_{e}" for e in entites}))
+    return questions
+
+
+def exactitude_llm(api_key: str, schema: SchemaPrompt, questions: list, top_k: int, min_tables: int) -> float:
+    from backend.agent import AIAgent
+    from backend.config import settings
+
+    settings.schema_top_k_tables = top_k
+    settings.schema_pruning_min_tables = min_tables
+    agent = AIAgent(api_key=api_key, schema=schema)
+    justes = sum(set(tables_lues(canonicaliser_sql(agent.sqlGeneration(question)))) == attendues
+                 for question, attendues in questions)
+    return justes / len(questions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--api-key", help="mesure aussi l'exactitude du SQL généré (appels réels)")
+    parser.add_argument("--llm-questions", type=int, default=20)
+    args = parser.parse_args()
+
+    tables = generer_schema()
+    schema = SchemaPrompt(formater_schema(tables), empreinte(tables), tables)
+    questions = generer_questions(args.questions)
+    schema.texte_pour("", args.top_k)  # construction de l'index hors mesure
+
+    tokens_complet = estimer_tokens(schema.texte)
+    tokens, rappels, durees = [], [], []
+    for question, attendues in questions:
+        debut = time.perf_counter()
+        texte = schema.texte_pour(question, args.top_k)
+        durees.append((time.perf_counter() - debut) * 1000)
+        tokens.append(estimer_tokens(texte))
+        presentes = {t.nom for t in tables if f"\n{t.nom}(" in f"\n{texte}"}
+        rappels.append(len(attendues & presentes) / len(attendues))
+
+    complet = sum(r == 1 for r in rappels) / len(rappels)
+    print(f"{len(tables)} tables, {len(questions)} questions, top-k {args.top_k}")
+    print(f"tokens du schéma : complet {tokens_complet}, sélection {sum(tokens) / len(tokens):.0f} en moyenne "
+          f"(max {max(tokens)}) -> réduction {1 - sum(tokens) / len(tokens) / tokens_complet:.1%}")
+    print(f"rappel des tables nécessaires : {sum(rappels) / len(rappels):.1%} "
+          f"(toutes présentes pour {complet:.1%} des questions)")
+    print(f"sélection : {sum(durees) / len(durees):.2f} ms en moyenne")
+
+    if args.api_key:
+        echantillon = questions[:args.llm_questions]
+        print(f"exactitude SQL sans sélection : "
+              f"{exactitude_llm(args.api_key, schema, echantillon, args.top_k, len(tables) + 1):.1%}")
+        print(f"exactitude SQL avec sélection : "
+              f"{exactitude_llm(args.api_key, schema, echantillon, args.top_k, 1):.1%}")
+
+
+if __name__ == "__main__":
+    main()
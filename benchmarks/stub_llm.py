@@ -0,0 +1,123 @@
+"""Serveur local compatible OpenAI (POST /v1/chat/completions) pour les
+benchmarks hors ligne : latence configurable, réponse en streaming token par
+token, SQL prédéfini pour chaque question connue.
+
+Usage : python -m benchmarks.stub_llm [--port 8900] [--latency-ms 300] [--token-delay-ms 15]
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from backend.summary import estimer_tokens
+
+# Questions du benchmark et SQL renvoyé par le faux modèle SQL ; aucune ne
+# correspond à un gabarit d'intention, toutes passent donc par le modèle
+QUESTIONS_SQL = [
+    ("Chiffre d'affaires par ville",
+     "SELECT c.city, SUM(o.total_amount) AS ca FROM orders o JOIN customers c ON c.id = o.customer_id "
+     "GROUP BY c.city ORDER BY ca DESC"),
+    ("Nombre de produits par catégorie",
+     "SELECT category, COUNT(*) AS n FROM products GROUP BY category"),
+    ("Quantité vendue par catégorie de produit",
+     "SELECT p.category, SUM(o.quantity) AS qte FROM orders o JOIN products p ON p.id = o.product_id "
+     "GROUP BY p.category"),
+    ("Montant moyen d'une commande pour les clients de Paris",
+     "SELECT AVG(o.total_amount) FROM orders o JOIN customers c ON c.id = o.customer_id "
+     "WHERE c.city = 'Paris'"),
+    ("Liste des dix commandes les plus chères",
+     "SELECT id, customer_id, total_amount FROM orders ORDER BY total_amount DESC LIMIT 10"),
+    ("Nombre de clients inscrits par ville",
+     "SELECT city, COUNT(*) AS n FROM customers GROUP BY city ORDER BY n DESC"),
+    ("Prix moyen des produits de la catégorie Sport",
+     "SELECT AVG(price) FROM products WHERE category = 'Sport'"),
+    ("Commandes de plus de 5 articles",
+     "SELECT id, quantity, total_amount FROM orders WHERE quantity > 5 LIMIT 100"),
+]
+
+MARQUEUR_SQL = "Tu es un expert SQL"
+REPONSE_CHAT = ("Voici la synthèse des données demandées : les valeurs principales figurent "
+                "ci-dessus, classées de la plus élevée à la plus faible.")
+
+
+def repondre(prompt: str) -> str:
+    """Contenu renvoyé pour un prompt : SQL prédéfini (ou NON_LIE) pour le
+    modèle SQL, réponse fixe pour le modèle de chat."""
+    if MARQUEUR_SQL not in prompt:
+        return REPONSE_CHAT
+    for question, sql in QUESTIONS_SQL:
+        if question in prompt:
+            return sql
+    return "NON_LIE"
+
+
+def _usage(prompt: str, contenu: str) -> dict:
+    prompt_tokens, completion_tokens = estimer_tokens(prompt), estimer_tokens(contenu)
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+def creer_app(latency_ms: float = 300.0, token_delay_ms: float = 15.0) -> FastAPI:
+    app = FastAPI(title="Stub LLM")
+    app.state.appels = 0
+
+    @app.get("/health")
+    def health():
+        return {"calls": app.state.appels}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        corps = await request.json()
+        app.state.appels += 1
+        prompt = "\n".join(m.get("content", "") for m in corps.get("messages", []))
+        contenu = repondre(prompt)
+        ident, cree, modele = f"chatcmpl-{uuid.uuid4().hex[:12]}", int(time.time()), corps.get("model", "stub")
+        await asyncio.sleep(latency_ms / 1000)
+
+        if not corps.get("stream"):
+            return JSONResponse({
+                "id": ident, "object": "chat.completion", "created": cree, "model": modele,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": contenu}}],
+                "usage": _usage(prompt, contenu),
+            })
+
+        async def morceaux():
+            mots = contenu.split(" ")
+            for i, mot in enumerate(mots):
+                delta = {"content": mot if i == len(mots) - 1 else mot + " "}
+                yield "data: " + json.dumps({
+                    "id": ident, "object": "chat.completion.chunk", "created": cree, "model": modele,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": None}],
+                }) + "\n\n"
+                await asyncio.sleep(token_delay_ms / 1000)
+            yield "data: " + json.dumps({
+                "id": ident, "object": "chat.completion.chunk", "created": cree, "model": modele,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }) + "\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(morceaux(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="délai avant la réponse")
+    parser.add_argument("--token-delay-ms", type=float, default=15.0, help="délai entre deux tokens (streaming)")
+    args = parser.parse_args()
+    uvicorn.run(creer_app(args.latency_ms, args.token_delay_ms), host=args.host, port=args.port,
+                log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
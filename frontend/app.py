@@ -1,5 +1,6 @@
 import streamlit as st
 import requests
+import json
 import os
 from dotenv import load_dotenv
 
@@ -11,6 +12,22 @@ st.set_page_config(
 
 load_dotenv()
 
+
+def lire_evenements_sse(response):
+    """Découpe un flux text/event-stream en couples (événement, données)."""
+    event, data_lines = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if line == "":
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+
 # Style CSS personnalisé pour une allure plus moderne
 st.markdown("""
     <style>
@@ -89,30 +106,41 @@ if submit_button or (question and st.session_state.question != question):
         with st.chat_message("user"):
             st.write(question)
 
-        # Appel au backend
+        # Appel au backend : la réponse est affichée au fil de l'eau (SSE)
         with st.chat_message("assistant"):
-            with st.spinner("Analyse de la base de données en cours..."):
-                try:
+            try:
+                with st.spinner("Analyse de la base de données en cours..."):
                     response = requests.post(
-                        "http://localhost:8000/ask",
+                        "http://localhost:8000/ask/stream",
                         json={"question": question, "api_key": api_key},
-                        timeout=30
-                     )
-                    
-                    if response.status_code == 200:
-                        answer = response.json().get("response")
-                        st.markdown("### Résultat de l'analyse")
-                        st.markdown(f'<div class="response-container">{answer}</div>', unsafe_allow_html=True)
-                        
-                        # Optionnel : Ajout d'un bouton pour voir les données brutes si nécessaire
-                        # st.expander("Voir les détails techniques").code(answer)
-                        
-                    else:
-                        st.error(f"Erreur du serveur ({response.status_code})")
-                        st.info(response.text)
-                except Exception as e:
-                    st.error(f"Connexion au backend impossible. Vérifiez que le serveur FastAPI est lancé sur le port 8000.")
-                    st.exception(e)
+                        stream=True,
+                        timeout=(5, 120)
+                    )
+
+                if response.status_code == 200:
+                    st.markdown("### Résultat de l'analyse")
+                    details = st.empty()
+                    answer_placeholder = st.empty()
+                    answer = ""
+                    for event, payload in lire_evenements_sse(response):
+                        if event == "sql":
+                            details.expander("Voir la requête SQL").code(payload["sql"], language="sql")
+                        elif event == "data":
+                            suffixe = " (résultat tronqué)" if payload.get("truncated") else ""
+                            st.caption(f"{payload['row_count']} ligne(s) récupérée(s){suffixe}")
+                        elif event in ("token", "message"):
+                            answer += payload["text"]
+                            answer_placeholder.markdown(
+                                f'<div class="response-container">\n\n{answer}\n\n</div>', unsafe_allow_html=True
+                            )
+                        elif event == "error":
+                            st.error(payload["detail"])
+                else:
+                    st.error(f"Erreur du serveur ({response.status_code})")
+                    st.info(response.text)
+            except Exception as e:
+                st.error(f"Connexion au backend impossible. Vérifiez que le serveur FastAPI est lancé sur le port 8000.")
+                st.exception(e)
 
 # --- FOOTER ---
 st.divider()
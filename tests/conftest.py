@@ -0,0 +1,19 @@
+"""Bases temporaires pour la suite de tests.
+
+`backend.main` crée ses engines à l'import à partir des réglages : sans ces
+variables, les tests ouvriraient ./data/app.db (passée en WAL par
+`configurer_sqlite`) et ./data/sql_cache.db, fichiers suivis par git.
+Les variables sont posées avant tout import de `backend`.
+"""
+import os
+import shutil
+import tempfile
+
+_DOSSIER = tempfile.mkdtemp(prefix="ai-data-agent-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DOSSIER, 'app.db')}"
+os.environ["DATABASE_REPLICA_URL"] = ""
+os.environ["SQL_CACHE_PATH"] = os.path.join(_DOSSIER, "sql_cache.db")
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_DOSSIER, ignore_errors=True)
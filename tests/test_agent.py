@@ -1,14 +1,33 @@
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from types import SimpleNamespace
 
-from backend.agent import AIAgent
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.agent import AIAgent, AsyncAIAgent, MESSAGE_ECHEC, SCHEMA_FINGERPRINT
+from backend.config import settings
+from backend.database import Base
+from backend.utils import seed_db
+from backend.cache import SQLCache
+from backend.conversation import ConversationStore, Echange
+from backend.execution import QueryResult
+from backend.intents import IntentMatcher
+from backend.schema import SchemaPrompt, TableSchema
 
 
 class FakeRow:
     def __init__(self, mapping):
         self._mapping = mapping
 
+    def __iter__(self):
+        return iter(self._mapping.values())
+
+
+class FakeResult(list):
+    def keys(self):
+        return list(self[0]._mapping.keys()) if self else []
+
 
 class FakeSession:
     def __init__(self, results=None, raise_on_execute=False):
@@ -21,14 +40,21 @@ class FakeSession:
         self.queries.append(str(sql_text))
         if self._raise:
             raise Exception("DB Error")
-        return self._results
+        return FakeResult(self._results)
+
+    def rollback(self):
+        pass
+
+    def get_bind(self):
+        return SimpleNamespace(dialect=SimpleNamespace(name="fake"))
 
 
 class TestAIAgent(unittest.TestCase):
 
     def setUp(self):
         # Use a dummy API key. We'll mock network calls.
-        self.agent = AIAgent(api_key="test_key", base_url="http://example")
+        # These tests exercise the chat model path, so disable local answers.
+        self.agent = AIAgent(api_key="test_key", base_url="http://example", answer_policy="llm")
 
     def _mock_openai_response(self, content: str):
         return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
@@ -99,6 +125,26 @@ class TestAIAgent(unittest.TestCase):
             self.assertEqual(exec_q.call_count, 2)
             nat_resp.assert_called_once_with("Combien de commandes ?", [{"count": 10}])
 
+    def test_repair_loop_requests_actions_from_the_shell(self):
+        # Arrange
+        etapes = self.agent._reparation("SELECT bad", None, "llm")
+
+        # Act
+        actions = [next(etapes)]
+        actions.append(etapes.send(None))                      # validation réussie
+        self.agent.derniere_erreur = "no such column: x"
+        actions.append(etapes.send(None))                      # exécution en échec
+        actions.append(etapes.send("SELECT good"))             # SQL corrigé
+        actions.append(etapes.send(None))
+        with self.assertRaises(StopIteration) as fin:
+            etapes.send([{"n": 1}])
+
+        # Assert
+        self.assertEqual([a[0] for a in actions], ["valider", "executer", "reparer", "valider", "executer"])
+        self.assertEqual(actions[2], ("reparer", "SELECT bad", "no such column: x"))
+        self.assertEqual(fin.exception.value, ("SELECT good", None, "llm", [{"n": 1}]))
+        self.assertEqual([t.erreur for t in self.agent.tentatives], ["no such column: x", None])
+
     def test_question_returns_failure_message_after_two_failures(self):
         # Arrange
         db = FakeSession()
@@ -250,24 +296,37 @@ class TestAIAgent(unittest.TestCase):
         # Assert
         self.assertEqual(out, [])
 
-    def test_question_appends_retry_hint_on_second_sqlGeneration_call(self):
+    def test_question_feeds_failed_sql_and_error_back_to_sql_model(self):
         # Arrange
         db = FakeSession()
-        with patch.object(self.agent, "sqlGeneration", side_effect=["SQL1", "SQL2"]) as gen_sql, \
-             patch.object(self.agent, "ececution", side_effect=[None, None]) as exec_q:
+
+        def echec(db, sql, params=None):
+            self.agent.derniere_erreur = "no such column: nom"
+            return None
+
+        with patch.object(self.agent, "sqlGeneration", side_effect=["SELECT 1", "SELECT 2"]) as gen_sql, \
+             patch.object(self.agent, "ececution", side_effect=echec) as exec_q:
 
             # Act
-            out = self.agent.question(db, "Ma question")
+            reponse = self.agent.questionDetaillee(db, "Ma question")
 
             # Assert
-            self.assertIn("Je n’ai pas pu répondre correctement", out)
+            self.assertIn("Je n’ai pas pu répondre correctement", reponse.answer)
             self.assertEqual(gen_sql.call_count, 2)
             self.assertEqual(exec_q.call_count, 2)
-            # Verify arguments to sqlGeneration
-            first_call_arg = gen_sql.call_args_list[0].args[0]
-            second_call_arg = gen_sql.call_args_list[1].args[0]
-            self.assertEqual(first_call_arg, "Ma question")
-            self.assertIn("(attention : génère une requête SQL valide SQLite)", second_call_arg)
+            self.assertEqual(gen_sql.call_args_list[0].args, ("Ma question",))
+            self.assertEqual(gen_sql.call_args_list[1].args, ("Ma question", "SELECT 1", "no such column: nom"))
+            self.assertEqual([t.sql for t in reponse.attempts], ["SELECT 1", "SELECT 2"])
+            self.assertEqual(reponse.attempts[0].erreur, "no such column: nom")
+
+    def test_repair_prompt_contains_failed_sql_and_error(self):
+        # Act
+        prompt = self.agent._promptSql("Q ?", "SELECT nom FROM customers", "no such column: nom")
+
+        # Assert
+        self.assertIn("SELECT nom FROM customers", prompt)
+        self.assertIn("no such column: nom", prompt)
+        self.assertNotIn("a échoué", self.agent._promptSql("Q ?"))
 
     @patch("backend.agent.OpenAI")
     def test_genererReponseNaturelle_strips_whitespace(self, mock_openai_cls):
@@ -286,6 +345,412 @@ class TestAIAgent(unittest.TestCase):
         self.assertEqual(out, "Réponse avec espaces")
         mock_client.chat.completions.create.assert_called()
 
+    def test_question_uses_cached_sql_without_calling_sql_model(self):
+        # Arrange
+        cache = SQLCache(":memory:")
+        cache.set("Combien de clients avons-nous ?", SCHEMA_FINGERPRINT, "SELECT COUNT(*) FROM customers")
+        agent = AIAgent(api_key="k", base_url="http://example", sql_cache=cache, answer_policy="llm")
+        db = FakeSession()
+        with patch.object(agent, "sqlGeneration") as gen_sql, \
+             patch.object(agent, "ececution", return_value=[{"n": 60}]) as exec_q, \
+             patch.object(agent, "genererReponseNaturelle", return_value="60 clients"):
+
+            # Act
+            out = agent.question(db, "combien de clients avons nous")
+
+            # Assert
+            self.assertEqual(out, "60 clients")
+            gen_sql.assert_not_called()
+            exec_q.assert_called_once_with(db, "SELECT COUNT(*) FROM customers", None)
+
+    def test_question_stores_only_successful_sql_in_cache(self):
+        # Arrange
+        cache = SQLCache(":memory:")
+        agent = AIAgent(api_key="k", base_url="http://example", sql_cache=cache, answer_policy="llm")
+        db = FakeSession()
+        with patch.object(agent, "sqlGeneration", side_effect=["SELECT bad", "SELECT good"]), \
+             patch.object(agent, "ececution", side_effect=[None, [{"n": 1}]]), \
+             patch.object(agent, "genererReponseNaturelle", return_value="OK"):
+
+            # Act
+            agent.question(db, "Question ?")
+
+        # Assert
+        self.assertEqual(cache.get("question", SCHEMA_FINGERPRINT), "SELECT good")
+
+    def test_sql_prompt_and_cache_use_provided_schema(self):
+        # Arrange
+        schema = SchemaPrompt(texte="customers(id INTEGER PK)\n  -- 60 lignes", fingerprint="abc", tables=[])
+        cache = SQLCache(":memory:")
+        cache.set("Question ?", "abc", "SELECT 1")
+        agent = AIAgent(api_key="k", base_url="http://example", sql_cache=cache, schema=schema)
+
+        # Act
+        prompt = agent._promptSql("Question ?")
+        sql, _, source = agent._sqlLocal("Question ?")
+
+        # Assert
+        self.assertIn("customers(id INTEGER PK)", prompt)
+        self.assertIn("-- 60 lignes", prompt)
+        self.assertEqual((sql, source), ("SELECT 1", "cache"))
+        self.assertIsNone(cache.get("Question ?", SCHEMA_FINGERPRINT))
+
+    def test_execution_prefers_columnar_store_and_falls_back(self):
+        # Arrange
+        columnar = MagicMock()
+        columnar.executer.side_effect = [QueryResult(columns=["n"], rows=[(250,)]), None]
+        agent = AIAgent(api_key="k", base_url="http://example", columnar=columnar)
+        db = FakeSession(results=[FakeRow({"id": 1})])
+
+        # Act
+        agrege = agent.ececution(db, "SELECT COUNT(*) AS n FROM orders")
+        detail = agent.ececution(db, "SELECT id FROM orders")
+
+        # Assert
+        self.assertEqual(agrege, [{"n": 250}])
+        self.assertEqual(detail, [{"id": 1}])
+        self.assertEqual(len(db.queries), 1)
+
+    def test_rollup_rule_only_when_schema_has_rollup_tables(self):
+        # Arrange
+        sans = AIAgent(api_key="k", base_url="http://example",
+                       schema=SchemaPrompt(texte="orders(id INTEGER PK)", fingerprint="a",
+                                           tables=[TableSchema("orders", [])]))
+        avec = AIAgent(api_key="k", base_url="http://example",
+                       schema=SchemaPrompt(texte="sales_daily(day DATE PK)", fingerprint="b",
+                                           tables=[TableSchema("orders", []), TableSchema("sales_daily", [])]))
+
+        # Act / Assert
+        self.assertNotIn("tables d'agrégats", sans._promptSql("CA de janvier"))
+        self.assertIn("tables d'agrégats sales_*", avec._promptSql("CA de janvier"))
+
+    def test_no_rollup_rule_on_dialect_without_rollups(self):
+        # Arrange : tables créées par create_all mais jamais alimentées
+        agent = AIAgent(api_key="k", base_url="http://example",
+                        schema=SchemaPrompt(texte="sales_daily(day DATE PK)", fingerprint="b",
+                                            tables=[TableSchema("sales_daily", [])], dialecte="mysql"))
+
+        # Act / Assert
+        self.assertNotIn("tables d'agrégats", agent._promptSql("CA de janvier"))
+
+    def test_follow_up_question_sees_previous_sql_and_is_recorded(self):
+        # Arrange
+        store = ConversationStore()
+        premier = AIAgent(api_key="k", base_url="http://example", conversation=store.session("s1"))
+        premier.dernier_resultat = QueryResult(columns=["ca"], rows=[(1200.0,)], truncated=False, total_estimate=1)
+        premier._memoriserEchange("CA de mars ?", "SELECT SUM(total_amount) AS ca FROM orders "
+                                  "WHERE order_date >= '2025-03-01' AND order_date < '2025-04-01'", None, [{"ca": 1200.0}])
+        suivant = AIAgent(api_key="k", base_url="http://example", conversation=store.session("s1"))
+
+        # Act
+        prompt = suivant._promptSql("Et pour le mois d'après ?")
+        sans_contexte = AIAgent(api_key="k", base_url="http://example")._promptSql("Et pour le mois d'après ?")
+
+        # Assert
+        self.assertIn("Dernière question : \"CA de mars ?\"", prompt)
+        self.assertIn("order_date >= '2025-03-01'", prompt)
+        self.assertIn("Résultat : 1 lignes ; colonnes : ca ; 1re ligne : ca=1200.0", prompt)
+        self.assertIn("ne modifie que ce qui change", prompt)
+        self.assertNotIn("Dernière requête exécutée", sans_contexte)
+
+    def test_follow_up_sql_is_cached_per_previous_query(self):
+        # Arrange : même question posée deux fois, après deux requêtes différentes
+        cache = SQLCache(":memory:")
+        store = ConversationStore()
+        store.ajouter("a", Echange("CA de Paris ?", "SELECT 1", "1 lignes"))
+        store.ajouter("b", Echange("CA de Paris en 2024 ?", "SELECT 2", "1 lignes"))
+        db = FakeSession()
+        agents = [AIAgent(api_key="k", base_url="http://example", sql_cache=cache, answer_policy="llm",
+                          conversation=store.session(session)) for session in ("a", "b")]
+
+        # Act
+        for agent, sql in zip(agents, ("SELECT 3", "SELECT 4")):
+            with patch.object(agent, "sqlGeneration", return_value=sql) as gen_sql, \
+                 patch.object(agent, "ececution", return_value=[{"n": 1}]), \
+                 patch.object(agent, "genererReponseNaturelle", return_value="OK"):
+                agent.question(db, "Et pour Lyon ?")
+            gen_sql.assert_called_once()
+
+        # Assert
+        self.assertIsNone(cache.get("Et pour Lyon ?", SCHEMA_FINGERPRINT))
+        self.assertEqual([e.sql for e in store.echanges("b")], ["SELECT 2", "SELECT 4"])
+
+    def test_sql_generated_with_context_is_not_shared_with_other_sessions(self):
+        # Arrange : question que la détection des suites ne reconnaît pas
+        cache = SQLCache(":memory:")
+        store = ConversationStore()
+        store.ajouter("a", Echange("CA de Paris ?", "SELECT 1", "1 lignes"))
+        agent = AIAgent(api_key="k", base_url="http://example", sql_cache=cache, answer_policy="llm",
+                        conversation=store.session("a"))
+
+        # Act
+        with patch.object(agent, "sqlGeneration", return_value="SELECT 5"), \
+             patch.object(agent, "ececution", return_value=[{"n": 1}]), \
+             patch.object(agent, "genererReponseNaturelle", return_value="OK"):
+            agent.question(FakeSession(), "Combien de commandes ?")
+
+        # Assert
+        self.assertIsNone(cache.get("Combien de commandes ?", SCHEMA_FINGERPRINT))
+        self.assertEqual(cache.get("Combien de commandes ?", agent._empreinteCache()), "SELECT 5")
+
+    def test_intent_sql_is_remembered_with_inlined_parameters(self):
+        # Arrange
+        store = ConversationStore()
+        agent = AIAgent(api_key="k", base_url="http://example", conversation=store.session("a"))
+        agent.dernier_resultat = QueryResult(columns=["ca"], rows=[(10.0,)], truncated=False, total_estimate=1)
+
+        # Act
+        agent._memoriserEchange("CA du mois dernier ?", "SELECT SUM(total_amount) AS ca FROM orders "
+                                "WHERE order_date >= :debut AND order_date < :fin",
+                                {"debut": "2025-03-01", "fin": "2025-04-01"}, [{"ca": 10.0}])
+
+        # Assert
+        self.assertEqual(store.echanges("a")[0].sql,
+                         "SELECT SUM(total_amount) AS ca FROM orders "
+                         "WHERE order_date >= '2025-03-01' AND order_date < '2025-04-01'")
+
+    def test_standalone_question_in_conversation_uses_schema_cache_entry(self):
+        # Arrange : question autonome déjà mise en cache hors conversation
+        cache = SQLCache(":memory:")
+        cache.set("Combien de clients ?", SCHEMA_FINGERPRINT, "SELECT COUNT(*) FROM customers")
+        store = ConversationStore()
+        store.ajouter("a", Echange("CA de Paris ?", "SELECT 1", "1 lignes"))
+        agent = AIAgent(api_key="k", base_url="http://example", sql_cache=cache, answer_policy="llm",
+                        conversation=store.session("a"))
+
+        # Act
+        with patch.object(agent, "sqlGeneration") as gen_sql, \
+             patch.object(agent, "ececution", return_value=[{"n": 60}]), \
+             patch.object(agent, "genererReponseNaturelle", return_value="OK"):
+            reponse = agent.questionDetaillee(FakeSession(), "Combien de clients ?")
+
+        # Assert
+        gen_sql.assert_not_called()
+        self.assertEqual(reponse.source, "cache")
+        self.assertEqual(reponse.sql, "SELECT COUNT(*) FROM customers")
+
+    def test_sql_prompt_follows_database_dialect(self):
+        # Arrange
+        sqlite = AIAgent(api_key="k", base_url="http://example",
+                         schema=SchemaPrompt(texte="orders(id INTEGER PK)", fingerprint="a", tables=[]))
+        postgres = AIAgent(api_key="k", base_url="http://example",
+                           schema=SchemaPrompt(texte="orders(id INTEGER PK)", fingerprint="a", tables=[],
+                                               dialecte="postgresql"))
+
+        # Act
+        prompt_sqlite = sqlite._promptSql("CA des 30 derniers jours")
+        prompt_postgres = postgres._promptSql("CA des 30 derniers jours")
+
+        # Assert
+        self.assertIn("spécialisé en SQLite", prompt_sqlite)
+        self.assertIn("strftime", prompt_sqlite)
+        self.assertIn("spécialisé en PostgreSQL", prompt_postgres)
+        self.assertIn("date_trunc", prompt_postgres)
+        self.assertNotIn("SQLite", prompt_postgres)
+
+    def test_question_uses_intent_template_without_calling_sql_model(self):
+        # Arrange
+        agent = AIAgent(api_key="k", base_url="http://example", intents=IntentMatcher(),
+                        answer_policy="llm")
+        db = FakeSession()
+        with patch.object(agent, "sqlGeneration") as gen_sql, \
+             patch.object(agent, "ececution", return_value=[{"nombre": 30}]) as exec_q, \
+             patch.object(agent, "genererReponseNaturelle", return_value="30 produits"):
+
+            # Act
+            out = agent.question(db, "Combien de produits avons-nous ?")
+
+        # Assert
+        self.assertEqual(out, "30 produits")
+        gen_sql.assert_not_called()
+        exec_q.assert_called_once_with(db, "SELECT COUNT(*) AS nombre FROM products", {})
+
+    def test_question_renders_scalar_locally_with_auto_policy(self):
+        # Arrange
+        agent = AIAgent(api_key="k", base_url="http://example")
+        db = FakeSession()
+        with patch.object(agent, "sqlGeneration", return_value="SELECT COUNT(*) AS nombre FROM customers"), \
+             patch.object(agent, "ececution", return_value=[{"nombre": 1200}]), \
+             patch.object(agent, "genererReponseNaturelle") as nat_resp:
+
+            # Act
+            out = agent.question(db, "Combien de clients ?")
+
+        # Assert
+        self.assertEqual(out, "Nombre : **1\u202f200**")
+        nat_resp.assert_not_called()
+
+    def test_question_calls_chat_model_for_large_results_with_auto_policy(self):
+        agent = AIAgent(api_key="k", base_url="http://example")
+        rows = [{"id": i, "city": "Paris"} for i in range(50)]
+        with patch.object(agent, "sqlGeneration", return_value="SELECT id, city FROM customers"), \
+             patch.object(agent, "ececution", return_value=rows), \
+             patch.object(agent, "genererReponseNaturelle", return_value="Résumé") as nat_resp:
+
+            out = agent.question(FakeSession(), "Où habitent les clients ?")
+
+        self.assertEqual(out, "Résumé")
+        nat_resp.assert_called_once()
+
+    def test_answer_prompt_summarizes_large_results(self):
+        rows = [{"id": i, "city": "Paris" if i % 2 else "Lyon"} for i in range(1000)]
+
+        prompt = self.agent._promptReponse("Où habitent les clients ?", rows)
+
+        self.assertIn("en voici un résumé", prompt)
+        self.assertIn("- city (texte) : 2 valeurs distinctes", prompt)
+        self.assertLess(len(prompt), len(str(rows)) / 10)
+        self.assertTrue(self.agent.derniere_compaction.resume)
+
+    def test_invalid_answer_policy_is_rejected(self):
+        with self.assertRaises(ValueError):
+            AIAgent(api_key="k", base_url="http://example", answer_policy="jamais")
+
+
+class TestRepairLoop(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        seed_db(self.db)
+        self.agent = AIAgent(api_key="k", base_url="http://example", answer_policy="local")
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_local_validation_catches_error_before_execution(self):
+        # Arrange
+        with patch.object(self.agent, "sqlGeneration",
+                          side_effect=["SELECT nom FROM customers", "SELECT COUNT(*) AS n FROM customers"]) as gen_sql, \
+             patch.object(self.agent, "ececution", wraps=self.agent.ececution) as exec_q:
+
+            # Act
+            reponse = self.agent.questionDetaillee(self.db, "Combien de clients ?")
+
+        # Assert
+        self.assertEqual(reponse.sql, "SELECT COUNT(*) AS n FROM customers")
+        self.assertEqual(reponse.row_count, 1)
+        exec_q.assert_called_once_with(self.db, "SELECT COUNT(*) AS n FROM customers", None)
+        self.assertIn("no such column: nom", gen_sql.call_args_list[1].args[2])
+        premiere, seconde = reponse.attempts
+        self.assertEqual(premiere.execution_ms, 0.0)
+        self.assertGreater(premiere.validation_ms, 0.0)
+        self.assertIsNone(seconde.erreur)
+
+    def test_no_repair_once_latency_budget_is_spent(self):
+        # Arrange
+        with patch.object(settings, "sql_repair_budget_seconds", 0), \
+             patch.object(self.agent, "sqlGeneration", return_value="SELECT nom FROM customers") as gen_sql:
+
+            # Act
+            reponse = self.agent.questionDetaillee(self.db, "Liste des noms")
+
+        # Assert
+        self.assertEqual(reponse.answer, MESSAGE_ECHEC)
+        gen_sql.assert_called_once()
+        self.assertEqual(len(reponse.attempts), 1)
+
+
+class TestAsyncAIAgent(unittest.IsolatedAsyncioTestCase):
+
+    def _mock_openai_response(self, content: str):
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    @patch("backend.agent.AsyncOpenAI")
+    async def test_sqlGeneration_awaits_async_client(self, mock_openai_cls):
+        # Arrange
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(
+            return_value=self._mock_openai_response("```sql\nSELECT * FROM products;\n```")
+        )
+        mock_openai_cls.return_value = mock_client
+        agent = AsyncAIAgent(api_key="k", base_url="http://example")
+
+        # Act
+        sql = await agent.sqlGeneration("Tous les produits")
+
+        # Assert
+        self.assertEqual(sql, "SELECT * FROM products;")
+        mock_client.chat.completions.create.assert_awaited_once()
+
+    async def test_ececution_runs_in_thread_and_returns_rows(self):
+        agent = AsyncAIAgent(api_key="k", base_url="http://example")
+        db = FakeSession(results=[FakeRow({"id": 1})])
+
+        out = await agent.ececution(db, "SELECT id FROM customers")
+
+        self.assertEqual(out, [{"id": 1}])
+
+    async def test_question_retries_then_answers(self):
+        # Arrange
+        agent = AsyncAIAgent(api_key="k", base_url="http://example", answer_policy="llm")
+        db = FakeSession()
+        with patch.object(agent, "sqlGeneration", AsyncMock(side_effect=["SELECT bad", "SELECT good"])) as gen_sql, \
+             patch.object(agent, "ececution", AsyncMock(side_effect=[None, [{"count": 10}]])), \
+             patch.object(agent, "genererReponseNaturelle", AsyncMock(return_value="Réponse OK")) as nat_resp:
+
+            # Act
+            out = await agent.question(db, "Combien de commandes ?")
+
+        # Assert
+        self.assertEqual(out, "Réponse OK")
+        self.assertEqual(gen_sql.await_count, 2)
+        self.assertEqual(gen_sql.await_args_list[1].args[:2], ("Combien de commandes ?", "SELECT bad"))
+        nat_resp.assert_awaited_once_with("Combien de commandes ?", [{"count": 10}])
+
+    async def test_questionStream_emits_sql_then_data_then_tokens(self):
+        # Arrange
+        agent = AsyncAIAgent(api_key="k", base_url="http://example", answer_policy="llm")
+        db = FakeSession()
+
+        async def fake_tokens(question, data):
+            for token in ["Il y a ", "60 clients."]:
+                yield token
+
+        with patch.object(agent, "sqlGeneration", AsyncMock(return_value="SELECT COUNT(*) AS n FROM customers")), \
+             patch.object(agent, "ececution", AsyncMock(return_value=[{"n": 60}])), \
+             patch.object(agent, "genererReponseNaturelleStream", fake_tokens):
+
+            # Act
+            events = [event async for event in agent.questionStream(db, "Combien de clients ?")]
+
+        # Assert
+        self.assertEqual(events, [
+            ("sql", {"sql": "SELECT COUNT(*) AS n FROM customers"}),
+            ("data", {"row_count": 1, "truncated": False, "preview": [{"n": 60}]}),
+            ("token", {"text": "Il y a "}),
+            ("token", {"text": "60 clients."}),
+            ("done", {}),
+        ])
+
+    async def test_questionStream_emits_sql_before_execution(self):
+        # Arrange
+        agent = AsyncAIAgent(api_key="k", base_url="http://example", answer_policy="local")
+        events, vus_a_l_execution = [], []
+
+        async def fake_execution(db, sql, params=None):
+            vus_a_l_execution.append([nom for nom, _ in events])
+            return [{"n": 60}]
+
+        with patch.object(agent, "sqlGeneration", AsyncMock(return_value="SELECT COUNT(*) AS n FROM customers")), \
+             patch.object(agent, "ececution", fake_execution):
+
+            # Act
+            async for event in agent.questionStream(FakeSession(), "Combien de clients ?"):
+                events.append(event)
+
+        # Assert
+        self.assertEqual(vus_a_l_execution, [["sql"]])
+        self.assertEqual([nom for nom, _ in events], ["sql", "data", "token", "done"])
+
+    async def test_questionStream_emits_message_when_non_lie(self):
+        agent = AsyncAIAgent(api_key="k", base_url="http://example")
+        with patch.object(agent, "sqlGeneration", AsyncMock(return_value="NON_LIE")):
+            events = [event async for event in agent.questionStream(FakeSession(), "Météo ?")]
+
+        self.assertEqual(events[0][0], "message")
+        self.assertEqual(events[-1], ("done", {}))
+
 
 if __name__ == "__main__":
     unittest.main(verbosity=2)
@@ -1,7 +1,15 @@
+import asyncio
 import unittest
+from contextlib import contextmanager
 from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
-from backend.main import app
+from unittest.mock import patch, MagicMock, AsyncMock
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from backend.main import QuestionRequest, app, ask_question, query_registry
+from backend.agent import AgentResponse
+from backend.database import Base, get_read_db
+from backend.utils import seed_db
 
 class TestAPI(unittest.TestCase):
     def setUp(self):
@@ -12,11 +20,11 @@ class TestAPI(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), {"message": "AI Data Agent API is running"})
 
-    @patch("backend.main.AIAgent")
+    @patch("backend.main.AsyncAIAgent")
     def test_ask_question_success(self, mock_agent_class):
         # Mock de l'instance de l'agent
         mock_agent_instance = mock_agent_class.return_value
-        mock_agent_instance.question.return_value = "Réponse de test"
+        mock_agent_instance.questionDetaillee = AsyncMock(return_value=AgentResponse(answer="Réponse de test"))
         
         payload = {
             "question": "Quelle est la liste des clients ?",
@@ -27,13 +35,13 @@ class TestAPI(unittest.TestCase):
         
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), {"response": "Réponse de test"})
-        mock_agent_instance.question.assert_called_once()
+        mock_agent_instance.questionDetaillee.assert_awaited_once()
 
-    @patch("backend.main.AIAgent")
+    @patch("backend.main.AsyncAIAgent")
     def test_ask_question_error(self, mock_agent_class):
         # Simulation d'une erreur interne
         mock_agent_instance = mock_agent_class.return_value
-        mock_agent_instance.question.side_effect = Exception("Erreur interne")
+        mock_agent_instance.questionDetaillee = AsyncMock(side_effect=Exception("Erreur interne"))
         
         payload = {
             "question": "Question ?",
@@ -44,6 +52,167 @@ class TestAPI(unittest.TestCase):
         
         self.assertEqual(response.status_code, 500)
         self.assertIn("Erreur interne", response.json()["detail"])
+    @patch("backend.main.AsyncAIAgent")
+    def test_ask_stream_emits_server_sent_events(self, mock_agent_class):
+        async def fake_stream(db, question):
+            yield "sql", {"sql": "SELECT COUNT(*) FROM customers"}
+            yield "data", {"row_count": 1, "preview": [{"n": 60}]}
+            yield "token", {"text": "60 "}
+            yield "token", {"text": "clients"}
+            yield "done", {}
+
+        mock_agent_class.return_value.questionStream = fake_stream
+
+        response = self.client.post("/ask/stream", json={"question": "Combien ?", "api_key": "k"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/event-stream"))
+        events = [block.split("\n")[0] for block in response.text.strip().split("\n\n")]
+        self.assertEqual(events, ["event: sql", "event: data", "event: token", "event: token", "event: done"])
+        self.assertIn('data: {"text": "clients"}', response.text)
+
+    def test_results_are_paginated_with_cursor(self):
+        # Arrange : base en mémoire partagée entre les requêtes du client
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        seed_db(Session())
+
+        def override_get_read_db():
+            db = Session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_read_db] = override_get_read_db
+        self.addCleanup(app.dependency_overrides.clear)
+        query_id = query_registry.register("SELECT id FROM customers ORDER BY id")
+
+        # Act
+        first = self.client.get(f"/results/{query_id}", params={"page_size": 50}).json()
+        second = self.client.get(f"/results/{query_id}",
+                                 params={"page_size": 50, "cursor": first["next_cursor"]}).json()
+
+        # Assert
+        self.assertEqual(first["columns"], ["id"])
+        self.assertEqual(len(first["rows"]), 50)
+        self.assertEqual([row[0] for row in second["rows"]], list(range(51, 61)))
+        self.assertIsNone(second["next_cursor"])
+
+    @patch("backend.main.base_prete", return_value=False)
+    def test_ready_returns_503_until_database_is_bootstrapped(self, mock_base_prete):
+        app.state.pret = False
+        self.addCleanup(delattr, app.state, "pret")
+
+        self.assertEqual(self.client.get("/ready").status_code, 503)
+
+        mock_base_prete.return_value = True
+        response = self.client.get("/ready")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"ready": True})
+
+    @patch("backend.main.AsyncAIAgent")
+    def test_identical_concurrent_questions_share_one_pipeline(self, mock_agent_class):
+        # Arrange
+        async def lente(db, question):
+            await asyncio.sleep(0.05)
+            return AgentResponse(answer="60 clients")
+
+        mock_agent_class.return_value.questionDetaillee = AsyncMock(side_effect=lente)
+
+        async def rafale():
+            questions = ["Combien de clients ?", "combien de clients", "Combien  de CLIENTS ?!"]
+            return await asyncio.gather(*(
+                ask_question(QuestionRequest(question=q, api_key="k")) for q in questions))
+
+        # Act
+        responses = asyncio.run(rafale())
+
+        # Assert
+        self.assertEqual(responses, [{"response": "60 clients"}] * 3)
+        mock_agent_class.return_value.questionDetaillee.assert_awaited_once()
+
+    @patch("backend.main.session_lecture")
+    @patch("backend.main.AsyncAIAgent")
+    def test_ask_batch_returns_ordered_results_and_deduplicates(self, mock_agent_class, mock_session):
+        # Arrange
+        @contextmanager
+        def session(engine):
+            yield MagicMock()
+
+        mock_session.side_effect = session
+        reponses = {
+            "Combien de clients ?": AgentResponse(answer="", sql="SELECT COUNT(*) FROM customers",
+                                                  source="llm", row_count=1),
+            "Quelle météo demain ?": AgentResponse(answer="hors sujet"),
+        }
+        mock_agent_class.return_value.questionDetaillee = AsyncMock(
+            side_effect=lambda db, question: reponses[question])
+        payload = {"questions": ["Combien de clients ?", "Quelle météo demain ?", "combien de clients"],
+                   "api_key": "k"}
+
+        # Act
+        response = self.client.post("/ask/batch", json=payload)
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["unique_questions"], 2)
+        self.assertEqual([r["question"] for r in body["results"]], payload["questions"])
+        self.assertEqual([r["deduplicated"] for r in body["results"]], [False, False, True])
+        self.assertEqual(body["results"][0]["row_count"], 1)
+        self.assertEqual(body["results"][0]["query_id"], body["results"][2]["query_id"])
+        self.assertNotIn("query_id", body["results"][1])
+        self.assertEqual(mock_agent_class.return_value.questionDetaillee.await_count, 2)
+
+    def test_ask_batch_rejects_empty_list(self):
+        response = self.client.post("/ask/batch", json={"questions": [], "api_key": "k"})
+
+        self.assertEqual(response.status_code, 422)
+
+    @patch("backend.main.AsyncAIAgent")
+    def test_ask_debug_returns_stage_timings(self, mock_agent_class):
+        # Arrange
+        debug = {"timings_ms": {"sql_generation": 850.0, "execution": 2.5}, "tokens": {}, "attempts": 1}
+        mock_agent_class.return_value.questionDetaillee = AsyncMock(
+            return_value=AgentResponse(answer="60 clients", debug=debug))
+
+        # Act
+        response = self.client.post("/ask", json={"question": "Combien ?", "api_key": "k", "debug": True})
+
+        # Assert
+        self.assertEqual(response.json()["debug"], debug)
+        self.assertEqual(response.headers["Server-Timing"], "sql_generation;dur=850, execution;dur=2.5")
+        self.assertTrue(mock_agent_class.call_args.kwargs["debug"])
+
+    @patch("backend.main.AsyncAIAgent")
+    def test_ask_passes_session_conversation_to_agent(self, mock_agent_class):
+        # Arrange
+        mock_agent_class.return_value.questionDetaillee = AsyncMock(return_value=AgentResponse(answer="OK"))
+
+        # Act
+        self.client.post("/ask", json={"question": "Et pour Lyon ?", "api_key": "k", "session_id": "s1"})
+        avec = mock_agent_class.call_args.kwargs["conversation"]
+        self.client.post("/ask", json={"question": "Et pour Lyon ?", "api_key": "k"})
+        sans = mock_agent_class.call_args.kwargs["conversation"]
+
+        # Assert
+        self.assertEqual(avec.session_id, "s1")
+        self.assertIsNone(sans)
+
+    def test_metrics_endpoint_uses_prometheus_text_format(self):
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        self.assertIn("# TYPE ai_agent_stage_duration_seconds histogram", response.text)
+        self.assertIn("# TYPE ai_agent_conversation_bytes gauge", response.text)
+
+    def test_results_unknown_query_returns_404(self):
+        response = self.client.get("/results/inconnue")
+
+        self.assertEqual(response.status_code, 404)
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, text
+
+from backend.agent import MESSAGE_NON_LIE, AgentResponse
+from backend.batch import session_lecture, traiter_lot
+from backend.database import configurer_sqlite
+
+
+class FakeAgent:
+    """Agent minimal : réponses fixées par question, compte les appels concurrents."""
+
+    def __init__(self, reponses, compteur):
+        self.reponses = reponses
+        self.compteur = compteur
+
+    async def questionDetaillee(self, db, question):
+        self.compteur["appels"].append(question)
+        self.compteur["en_cours"] += 1
+        self.compteur["max"] = max(self.compteur["max"], self.compteur["en_cours"])
+        try:
+            await asyncio.sleep(0.01)
+            reponse = self.reponses[question]
+            if isinstance(reponse, Exception):
+                raise reponse
+            return reponse
+        finally:
+            self.compteur["en_cours"] -= 1
+
+
+class TestTraiterLot(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.compteur = {"appels": [], "en_cours": 0, "max": 0}
+        self.verrous = []
+
+    def _creer(self, reponses):
+        def creer_agent(verrou):
+            self.verrous.append(verrou)
+            return FakeAgent(reponses, self.compteur)
+        return creer_agent
+
+    async def test_duplicates_run_once_and_results_keep_input_order(self):
+        # Arrange
+        reponse = AgentResponse(answer="", sql="SELECT 1", row_count=1)
+        questions = ["Combien de clients ?", "Liste des produits", "combien de clients"]
+        reponses = {"Combien de clients ?": reponse, "Liste des produits": reponse}
+
+        # Act
+        elements = await traiter_lot(questions, self._creer(reponses), db=None)
+
+        # Assert
+        self.assertEqual([e.question for e in elements], questions)
+        self.assertEqual([e.doublon for e in elements], [False, False, True])
+        self.assertEqual(sorted(self.compteur["appels"]), ["Combien de clients ?", "Liste des produits"])
+        self.assertIs(elements[2].reponse, elements[0].reponse)
+        # Un seul verrou de session pour tous les agents du lot
+        self.assertEqual(len(set(map(id, self.verrous))), 1)
+
+    async def test_parallelism_is_bounded(self):
+        # Arrange
+        questions = [f"question {i}" for i in range(10)]
+        reponses = {q: AgentResponse(answer="", row_count=0) for q in questions}
+
+        # Act
+        await traiter_lot(questions, self._creer(reponses), db=None, parallelisme=3)
+
+        # Assert
+        self.assertEqual(len(self.compteur["appels"]), 10)
+        self.assertEqual(self.compteur["max"], 3)
+
+    async def test_each_item_gets_its_own_status(self):
+        # Arrange
+        reponses = {
+            "a": AgentResponse(answer="", sql="SELECT 1", row_count=1),
+            "b": AgentResponse(answer=MESSAGE_NON_LIE),
+            "c": AgentResponse(answer="Impossible de générer une requête SQL valide"),
+            "d": RuntimeError("LLM indisponible"),
+        }
+
+        # Act
+        elements = await traiter_lot(list(reponses), self._creer(reponses), db=None)
+
+        # Assert
+        self.assertEqual([e.statut for e in elements], ["ok", "out_of_scope", "failed", "error"])
+        self.assertEqual(elements[3].erreur, "LLM indisponible")
+        self.assertTrue(all(e.duree_ms > 0 for e in elements))
+
+
+class TestSessionLecture(unittest.TestCase):
+    def setUp(self):
+        self.dossier = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.dossier.name, 'lot.db')}")
+        # WAL, comme la base de l'application : lecture et écriture simultanées
+        configurer_sqlite(self.engine)
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql("CREATE TABLE t (x INTEGER)")
+            conn.exec_driver_sql("INSERT INTO t VALUES (1)")
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.dossier.cleanup()
+
+    def test_reads_see_one_snapshot_even_after_a_rollback(self):
+        # Arrange
+        requete = text("SELECT COUNT(*) FROM t")
+
+        # Act
+        with session_lecture(self.engine) as db:
+            avant = db.execute(requete).scalar()
+            with self.engine.begin() as conn:
+                conn.exec_driver_sql("INSERT INTO t VALUES (2)")
+            with self.assertRaises(Exception):
+                db.execute(text("SELECT inconnue FROM t"))
+            db.rollback()
+            apres = db.execute(requete).scalar()
+        with self.engine.connect() as conn:
+            final = conn.exec_driver_sql("SELECT COUNT(*) FROM t").scalar()
+
+        # Assert
+        self.assertEqual((avant, apres, final), (1, 1, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+from unittest.mock import patch
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from backend.bootstrap import base_prete, bootstrap
+from backend.database import Base
+from backend.utils import seed_db
+
+
+class TestBootstrap(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite:///:memory:")
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def _compter(self, table):
+        with self.engine.connect() as conn:
+            return conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+
+    def test_empty_database_is_not_ready(self):
+        self.assertFalse(base_prete(self.engine))
+
+    def test_bootstrap_creates_seeds_and_flags_database(self):
+        # Act
+        initialisee = bootstrap(self.engine, seed=1)
+
+        # Assert
+        self.assertTrue(initialisee)
+        self.assertTrue(base_prete(self.engine))
+        self.assertEqual(self._compter("customers"), 60)
+        self.assertEqual(self._compter("orders"), 250)
+
+    def test_bootstrap_is_idempotent(self):
+        # Arrange
+        bootstrap(self.engine, seed=1)
+
+        # Act
+        initialisee = bootstrap(self.engine, seed=1)
+
+        # Assert
+        self.assertFalse(initialisee)
+        self.assertEqual(self._compter("customers"), 60)
+
+    def test_bootstrap_keeps_data_of_previously_seeded_database(self):
+        # Arrange : base peuplée avant l'introduction du drapeau
+        Base.metadata.create_all(self.engine)
+        seed_db(sessionmaker(bind=self.engine)())
+        with self.engine.begin() as conn:
+            conn.execute(text("DROP TABLE app_metadata"))
+
+        # Act
+        initialisee = bootstrap(self.engine)
+
+        # Assert
+        self.assertTrue(initialisee)
+        self.assertTrue(base_prete(self.engine))
+        self.assertEqual(self._compter("customers"), 60)
+
+    def test_table_created_by_concurrent_bootstrap_is_not_an_error(self):
+        # Arrange : un autre processus crée les tables entre la vérification et la création
+        creer = Base.metadata.create_all
+        appels = []
+
+        def create_all(engine, **kwargs):
+            creer(engine, **kwargs)
+            appels.append(engine)
+            if len(appels) == 1:
+                raise OperationalError("CREATE TABLE customers", {}, Exception("table customers already exists"))
+
+        # Act
+        with patch.object(Base.metadata, "create_all", side_effect=create_all):
+            initialisee = bootstrap(self.engine, seed=1)
+
+        # Assert
+        self.assertTrue(initialisee)
+        self.assertTrue(base_prete(self.engine))
+
+    def test_ready_flag_is_written_after_every_step(self):
+        # Arrange : interruption pendant la création des index
+        with patch("backend.bootstrap.optimiser_base", side_effect=RuntimeError("interrompu")):
+            with self.assertRaises(RuntimeError):
+                bootstrap(self.engine, seed=1)
+        pret_apres_interruption = base_prete(self.engine)
+
+        # Act
+        initialisee = bootstrap(self.engine, seed=1)
+
+        # Assert
+        self.assertFalse(pret_apres_interruption)
+        self.assertTrue(initialisee)
+        self.assertTrue(base_prete(self.engine))
+        self.assertEqual(self._compter("customers"), 60)
+        self.assertGreater(self._compter("sales_daily"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
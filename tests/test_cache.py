@@ -0,0 +1,75 @@
+import unittest
+from unittest.mock import patch
+
+from backend.cache import SQLCache, normalize_question
+
+
+class TestNormalizeQuestion(unittest.TestCase):
+
+    def test_folds_case_accents_punctuation_and_whitespace(self):
+        self.assertEqual(
+            normalize_question("Combien de clients avons-nous ?"),
+            normalize_question("  combien de   clients avons nous"),
+        )
+        self.assertEqual(normalize_question("Quel est le chiffre d'AFFAIRES ?"),
+                         "quel est le chiffre d affaires")
+        self.assertEqual(normalize_question("Catégorie Électronique"), "categorie electronique")
+
+
+class TestSQLCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = SQLCache(":memory:", max_entries=2, ttl_seconds=60)
+
+    def test_get_returns_sql_for_reworded_question(self):
+        # Arrange
+        self.cache.set("Combien de clients avons-nous ?", "fp", "SELECT COUNT(*) FROM customers")
+
+        # Act
+        sql = self.cache.get("combien de clients avons nous", "fp")
+
+        # Assert
+        self.assertEqual(sql, "SELECT COUNT(*) FROM customers")
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_get_misses_when_schema_fingerprint_differs(self):
+        self.cache.set("Q", "fp1", "SELECT 1")
+
+        self.assertIsNone(self.cache.get("Q", "fp2"))
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_expired_entries_are_not_returned(self):
+        # Arrange
+        with patch("backend.cache.time.time", return_value=1000.0):
+            self.cache.set("Q", "fp", "SELECT 1")
+
+        # Act
+        with patch("backend.cache.time.time", return_value=1061.0):
+            sql = self.cache.get("Q", "fp")
+
+        # Assert
+        self.assertIsNone(sql)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        # Arrange
+        with patch("backend.cache.time.time", return_value=1000.0):
+            self.cache.set("A", "fp", "SELECT 'a'")
+        with patch("backend.cache.time.time", return_value=1001.0):
+            self.cache.set("B", "fp", "SELECT 'b'")
+        with patch("backend.cache.time.time", return_value=1002.0):
+            self.cache.get("A", "fp")
+
+        # Act
+        with patch("backend.cache.time.time", return_value=1003.0):
+            self.cache.set("C", "fp", "SELECT 'c'")
+
+        # Assert
+        with patch("backend.cache.time.time", return_value=1004.0):
+            self.assertEqual(self.cache.get("A", "fp"), "SELECT 'a'")
+            self.assertIsNone(self.cache.get("B", "fp"))
+            self.assertEqual(self.cache.get("C", "fp"), "SELECT 'c'")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from backend.bootstrap import bootstrap
+from backend.columnar import ColumnarStore, duckdb, parametres_duckdb
+from backend.database import configurer_sqlite
+from backend.execution import executer
+from backend.result_cache import installer
+from backend.seeding import Volumes, generer
+
+
+@unittest.skipIf(duckdb is None, "duckdb non installé")
+class TestColumnarStore(unittest.TestCase):
+    def setUp(self):
+        self.dossier = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.dossier.name, 'app.db')}")
+        configurer_sqlite(self.engine)
+        installer(self.engine)
+        bootstrap(self.engine, seed=1)
+        self.store = ColumnarStore(self.engine, intervalle_sync=0)
+        self.db = sessionmaker(bind=self.engine)()
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+        self.dossier.cleanup()
+
+    def test_aggregate_matches_sqlite(self):
+        # Arrange
+        sql = ("SELECT p.category, COUNT(*) AS n, SUM(o.quantity) AS qte FROM orders o "
+               "JOIN products p ON p.id = o.product_id WHERE o.order_date >= :debut "
+               "GROUP BY p.category ORDER BY p.category")
+        params = {"debut": "2000-01-01"}
+
+        # Act
+        colonnes = self.store.executer(sql, params)
+        sqlite = executer(self.db, sql, params)
+
+        # Assert
+        self.assertEqual(colonnes.columns, sqlite.columns)
+        self.assertEqual(colonnes.rows, sqlite.rows)
+        self.assertEqual(self.store.stats()["queries"], 1)
+
+    def test_new_orders_are_copied_incrementally(self):
+        # Arrange
+        self.store.synchroniser()
+        with self.engine.begin() as conn:
+            generer(conn, Volumes(customers=2, products=1, orders=30), seed=2)
+
+        # Act
+        copiees = self.store.synchroniser()
+        total = self.store.executer("SELECT COUNT(*) FROM orders").rows[0][0]
+
+        # Assert
+        # Commandes copiées par lot ; produits et clients modifiés, donc recopiés entièrement
+        self.assertEqual(copiees, 30 + 31 + 62)
+        self.assertEqual(total, 280)
+
+    def test_updated_dimension_is_copied_again(self):
+        # Arrange
+        self.store.synchroniser()
+        with self.engine.begin() as conn:
+            conn.execute(text("UPDATE products SET category = 'Soldes' WHERE id = 1"))
+
+        # Act
+        resultat = self.store.executer("SELECT COUNT(*) FROM products WHERE category = 'Soldes'")
+
+        # Assert
+        self.assertEqual(resultat.rows, [(1,)])
+
+    def test_unchanged_dimensions_are_not_copied_again(self):
+        # Arrange
+        self.store.synchroniser()
+
+        # Act
+        copiees = self.store.synchroniser()
+
+        # Assert
+        self.assertEqual(copiees, 0)
+
+    def test_integer_division_matches_sqlite(self):
+        # Arrange
+        sql = "SELECT SUM(quantity) / COUNT(*) AS moyenne FROM orders"
+
+        # Act
+        colonnes = self.store.executer(sql)
+        sqlite = executer(self.db, sql)
+
+        # Assert
+        self.assertEqual(colonnes.rows, sqlite.rows)
+        self.assertIsInstance(colonnes.rows[0][0], int)
+
+    def test_non_aggregate_and_unsupported_queries_fall_back(self):
+        # Act
+        detail = self.store.executer("SELECT * FROM orders WHERE id = 1")
+        rollup = self.store.executer("SELECT SUM(revenue) FROM sales_daily")
+        inconnue = self.store.executer("SELECT COUNT(*) FROM orders WHERE order_date > date('now', '-1 month')")
+
+        # Assert
+        self.assertIsNone(detail)
+        self.assertIsNone(rollup)
+        self.assertIsNone(inconnue)
+        self.assertEqual(self.store.stats()["queries"], 0)
+
+    def test_dates_are_returned_as_iso_strings(self):
+        # Act
+        resultat = self.store.executer("SELECT MAX(order_date) FROM orders")
+
+        # Assert
+        with self.engine.connect() as conn:
+            attendu = conn.execute(text("SELECT MAX(order_date) FROM orders")).scalar()
+        self.assertEqual(resultat.rows[0][0], attendu)
+
+    def test_same_results_as_sqlite(self):
+        # Arrange : requêtes exécutées par les deux chemins ; celles que DuckDB
+        # évalue différemment doivent repasser par SQLite
+        with self.engine.begin() as conn:
+            conn.execute(text("UPDATE products SET category = 'Electronique' WHERE id = 1"))
+            conn.execute(text("UPDATE customers SET city = NULL WHERE id = 1"))
+        requetes = [
+            "SELECT COUNT(*) FROM products WHERE category LIKE 'electro%'",
+            "SELECT COUNT(*) FROM products WHERE category GLOB 'Elec*'",
+            "SELECT COUNT(*), MAX(name || city) FROM customers",
+            "SELECT strftime('%Y-%m', order_date) AS mois, COUNT(*) FROM orders GROUP BY mois ORDER BY mois",
+            "SELECT COUNT(*) FROM orders WHERE order_date >= date('now', '-1 year')",
+            "SELECT LOWER(category), COUNT(*) FROM products GROUP BY 1 ORDER BY 1",
+            "SELECT SUM(quantity) / COUNT(*), SUM(quantity) % 7 FROM orders",
+            "SELECT city, COUNT(*) AS n FROM customers GROUP BY city ORDER BY city",
+            "SELECT city, COUNT(*) AS n FROM customers GROUP BY city ORDER BY city DESC",
+            "SELECT p.category, AVG(o.total_amount) FROM orders o JOIN products p ON p.id = o.product_id "
+            "WHERE o.product_id IN (SELECT id FROM products WHERE price > 10) GROUP BY p.category ORDER BY 1",
+            "SELECT COUNT(*) FROM products WHERE category = 'electronique'",
+        ]
+
+        for sql in requetes:
+            with self.subTest(sql=sql):
+                # Act
+                colonnes = self.store.executer(sql)
+                sqlite = executer(self.db, sql)
+
+                # Assert
+                if colonnes is not None:
+                    self.assertEqual(len(colonnes.rows), len(sqlite.rows))
+                    for obtenue, attendue in zip(colonnes.rows, sqlite.rows):
+                        for a, b in zip(obtenue, attendue):
+                            if isinstance(b, float):
+                                self.assertAlmostEqual(a, b, places=6)
+                            else:
+                                self.assertEqual(a, b)
+        # Les requêtes sûres ont bien été calculées par DuckDB
+        self.assertEqual(self.store.stats()["queries"], 5)
+
+    def test_queries_with_diverging_semantics_are_not_routed(self):
+        for sql in ("SELECT COUNT(*) FROM products WHERE category LIKE 'electro%'",
+                    "SELECT COUNT(*) FROM products WHERE category GLOB 'Elec*'",
+                    "SELECT MAX(name || city) FROM customers",
+                    "SELECT strftime('%Y', order_date), COUNT(*) FROM orders GROUP BY 1",
+                    "SELECT COUNT(*) FROM orders WHERE order_date >= date('now')"):
+            with self.subTest(sql=sql):
+                self.assertFalse(self.store.accepte(sql))
+        self.assertTrue(self.store.accepte("SELECT COUNT(*) FROM products WHERE name = 'a like b'"))
+
+    def test_named_parameters_outside_literals_are_converted(self):
+        self.assertEqual(parametres_duckdb("SELECT ':x' AS a WHERE id = :id AND d >= :debut"),
+                         "SELECT ':x' AS a WHERE id = $id AND d >= $debut")
+
+
+if __name__ == "__main__":
+    unittest.main()
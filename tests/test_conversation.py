@@ -0,0 +1,113 @@
+import unittest
+from unittest.mock import patch
+
+from backend.conversation import ConversationStore, Echange, est_suite, resumer_resultat
+from backend.execution import QueryResult
+
+
+def _echange(i: int) -> Echange:
+    return Echange(f"Question {i} ?", f"SELECT {i}", "1 lignes")
+
+
+class TestConversationStore(unittest.TestCase):
+    def test_keeps_only_last_turns_of_session(self):
+        # Arrange
+        store = ConversationStore(max_tours=3)
+
+        # Act
+        for i in range(5):
+            store.ajouter("s1", _echange(i))
+
+        # Assert
+        self.assertEqual([e.sql for e in store.echanges("s1")], ["SELECT 2", "SELECT 3", "SELECT 4"])
+        self.assertEqual(store.taille_session("s1"), sum(_echange(i).taille for i in (2, 3, 4)))
+        self.assertEqual(store.stats()["bytes"], store.taille_session("s1"))
+
+    def test_session_memory_is_capped_in_bytes(self):
+        # Arrange
+        store = ConversationStore(max_tours=10, max_bytes_session=2 * _echange(0).taille)
+
+        # Act
+        for i in range(4):
+            store.ajouter("s1", _echange(i))
+
+        # Assert
+        self.assertEqual([e.sql for e in store.echanges("s1")], ["SELECT 2", "SELECT 3"])
+        self.assertLessEqual(store.taille_session("s1"), store.max_bytes_session)
+
+    def test_least_recently_used_session_is_evicted(self):
+        # Arrange
+        store = ConversationStore(max_sessions=2)
+        store.ajouter("a", _echange(1))
+        store.ajouter("b", _echange(2))
+        store.echanges("a")
+
+        # Act
+        store.ajouter("c", _echange(3))
+
+        # Assert
+        self.assertEqual(store.echanges("b"), [])
+        self.assertEqual(len(store.echanges("a")), 1)
+        self.assertEqual(store.stats()["sessions"], 2)
+        self.assertEqual(store.stats()["evictions"], 1)
+
+    def test_idle_session_expires(self):
+        # Arrange
+        store = ConversationStore(ttl_seconds=60)
+        with patch("backend.conversation.time.monotonic", return_value=1000.0):
+            store.ajouter("s1", _echange(1))
+
+        # Act
+        with patch("backend.conversation.time.monotonic", return_value=1061.0):
+            echanges = store.echanges("s1")
+
+        # Assert
+        self.assertEqual(echanges, [])
+        self.assertEqual(store.stats()["bytes"], 0)
+
+    def test_forget_removes_session(self):
+        store = ConversationStore()
+        store.ajouter("s1", _echange(1))
+
+        store.oublier("s1")
+
+        self.assertEqual(store.stats()["sessions"], 0)
+        self.assertEqual(store.stats()["bytes"], 0)
+
+
+class TestResumerResultat(unittest.TestCase):
+    def test_summary_lists_columns_and_first_row(self):
+        # Arrange
+        resultat = QueryResult(columns=["city", "ca"], rows=[("Paris", 1200.5), ("Lyon", 800.0)],
+                               truncated=True, total_estimate=None)
+
+        # Act
+        resume = resumer_resultat(resultat, 2)
+
+        # Assert
+        self.assertEqual(resume, "2 lignes (tronqué) ; colonnes : city, ca ; 1re ligne : city=Paris, ca=1200.5")
+
+    def test_long_values_are_shortened(self):
+        resultat = QueryResult(columns=["texte"], rows=[("x" * 200,)], truncated=False, total_estimate=1)
+
+        self.assertLess(len(resumer_resultat(resultat, 1)), 100)
+
+
+class TestEstSuite(unittest.TestCase):
+    def test_follow_up_questions(self):
+        for question in ("Et pour Lyon ?", "Même chose en 2024", "Le mois d'après ?",
+                         "Trie-les par ville", "Et celui de Lyon ?", "Pour Lyon ?", "Le mois suivant ?",
+                         "Seulement à Paris", "En février ?"):
+            with self.subTest(question=question):
+                self.assertTrue(est_suite(question))
+
+    def test_standalone_questions(self):
+        for question in ("Combien de clients à Paris ?", "CA de mars ?", "Nombre de commandes par mois",
+                         "Quels clients ont commandé le même produit qu'Alice ?",
+                         "Les ventes en Île-de-France"):
+            with self.subTest(question=question):
+                self.assertFalse(est_suite(question))
+
+
+if __name__ == "__main__":
+    unittest.main()
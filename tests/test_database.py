@@ -1,8 +1,11 @@
+import os
+import tempfile
 import unittest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
-from backend.database import Base
+from backend.database import Base, configurer_sqlite, creer_engine
 from backend.models import Customer, Order
+from backend.utils import optimiser_base
 import datetime
 
 class TestDatabaseIntegration(unittest.TestCase):
@@ -45,5 +48,96 @@ class TestDatabaseIntegration(unittest.TestCase):
         self.assertEqual(len(customer_from_db.orders), 1)
         self.assertEqual(customer_from_db.orders[0].total_amount, 100.0)
 
+
+class TestPerformanceProfile(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.dir.name, 'perf.db')}")
+        configurer_sqlite(self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.dir.cleanup()
+
+    def test_connections_use_read_optimized_pragmas(self):
+        with self.engine.connect() as conn:
+            self.assertEqual(conn.execute(text("PRAGMA journal_mode")).scalar(), "wal")
+            self.assertEqual(conn.execute(text("PRAGMA synchronous")).scalar(), 1)  # NORMAL
+            self.assertLess(conn.execute(text("PRAGMA cache_size")).scalar(), 0)
+
+    def test_optimiser_base_adds_missing_indexes_to_existing_tables(self):
+        # Arrange : tables créées sans leurs index secondaires
+        Base.metadata.create_all(self.engine)
+        with self.engine.begin() as conn:
+            conn.execute(text("DROP INDEX ix_orders_date_amount"))
+            conn.execute(text("DROP INDEX ix_customers_city"))
+
+        # Act
+        optimiser_base(self.engine)
+
+        # Assert
+        inspector = inspect(self.engine)
+        self.assertIn("ix_orders_date_amount", {i["name"] for i in inspector.get_indexes("orders")})
+        self.assertIn("ix_customers_city", {i["name"] for i in inspector.get_indexes("customers")})
+
+    def test_date_window_query_uses_covering_index(self):
+        Base.metadata.create_all(self.engine)
+        with self.engine.connect() as conn:
+            plan = conn.execute(text(
+                "EXPLAIN QUERY PLAN SELECT SUM(total_amount) FROM orders "
+                "WHERE order_date >= '2025-01-01' AND order_date < '2025-02-01'"
+            )).fetchall()
+
+        self.assertIn("COVERING INDEX ix_orders_date_amount", " ".join(row[-1] for row in plan))
+
+
+class TestCreerEngine(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.chemin = os.path.join(self.dir.name, "app.db")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_file_engine_uses_configured_pool(self):
+        # Act
+        engine = creer_engine(f"sqlite:///{self.chemin}", pool_size=3, max_overflow=2, pool_recycle=60)
+        self.addCleanup(engine.dispose)
+
+        # Assert
+        self.assertEqual(engine.pool.size(), 3)
+        self.assertEqual(engine.pool._max_overflow, 2)
+        self.assertEqual(engine.pool._recycle, 60)
+
+    def test_memory_engine_keeps_default_pool(self):
+        # Act
+        engine = creer_engine("sqlite://", pool_size=3)
+
+        # Assert
+        with engine.connect() as conn:
+            self.assertEqual(conn.execute(text("SELECT 1")).scalar(), 1)
+
+    def test_read_only_replica_reads_primary_file_and_rejects_writes(self):
+        # Arrange : la réplique locale est le même fichier ouvert en lecture seule
+        primaire = creer_engine(f"sqlite:///{self.chemin}")
+        self.addCleanup(primaire.dispose)
+        Base.metadata.create_all(primaire)
+        with primaire.begin() as conn:
+            conn.execute(text("INSERT INTO customers (name, email, city, created_at) "
+                              "VALUES ('Ana', 'ana@example.com', 'Lyon', '2025-01-01')"))
+        replique = creer_engine(f"sqlite:///file:{self.chemin}?mode=ro&uri=true")
+        self.addCleanup(replique.dispose)
+
+        # Act
+        with replique.connect() as conn:
+            villes = conn.execute(text("SELECT city FROM customers")).scalars().all()
+            mode = conn.execute(text("PRAGMA journal_mode")).scalar()
+            with self.assertRaises(Exception):
+                conn.execute(text("DELETE FROM customers"))
+
+        # Assert
+        self.assertEqual(villes, ["Lyon"])
+        self.assertEqual(mode, "wal")
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend.execution import (
+    QueryRegistry, borner_sql, decoder_curseur, encoder_curseur, executer, valider_sql,
+)
+from backend.utils import seed_db
+
+
+class TestExecution(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        seed_db(self.db)
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_borner_sql_wraps_read_queries_only(self):
+        self.assertEqual(borner_sql("SELECT * FROM orders;", 11),
+                         "SELECT * FROM (\nSELECT * FROM orders\n) AS resultat LIMIT 11")
+        self.assertIn("OFFSET 20", borner_sql("WITH t AS (SELECT 1) SELECT * FROM t", 10, 20))
+        self.assertEqual(borner_sql("DELETE FROM orders", 10), "DELETE FROM orders")
+
+    def test_trailing_comments_do_not_break_wrapping(self):
+        for sql in ("SELECT name FROM customers -- derniers clients",
+                    "SELECT name FROM customers;\n-- fin",
+                    "SELECT name FROM customers; /* fin */",
+                    "SELECT name FROM customers /* noms */ WHERE name <> '--x'"):
+            with self.subTest(sql=sql):
+                # Act
+                result = executer(self.db, sql, max_rows=10, count_cap=1000)
+
+                # Assert
+                self.assertEqual(len(result.rows), 10)
+                self.assertEqual(result.total_estimate, 60)
+
+    def test_comment_markers_inside_literals_are_kept(self):
+        result = executer(self.db, "SELECT '-- pas un commentaire' AS t", max_rows=10)
+
+        self.assertEqual(result.rows, [("-- pas un commentaire",)])
+
+    def test_result_is_capped_and_flagged_as_truncated(self):
+        # Act
+        result = executer(self.db, "SELECT id, total_amount FROM orders ORDER BY id", max_rows=100,
+                          count_cap=1000)
+
+        # Assert
+        self.assertEqual(result.columns, ["id", "total_amount"])
+        self.assertEqual(len(result.rows), 100)
+        self.assertIsInstance(result.rows[0], tuple)
+        self.assertTrue(result.truncated)
+        self.assertEqual(result.total_estimate, 250)
+
+    def test_small_result_is_not_truncated(self):
+        result = executer(self.db, "SELECT COUNT(*) AS n FROM customers", max_rows=100)
+
+        self.assertFalse(result.truncated)
+        self.assertEqual(result.to_dicts(), [{"n": 60}])
+        self.assertEqual(result.total_estimate, 1)
+
+    def test_inner_limit_written_by_model_is_respected(self):
+        result = executer(self.db, "SELECT id FROM customers LIMIT 5", max_rows=100)
+
+        self.assertEqual(len(result.rows), 5)
+
+    def test_offset_pages_cover_the_whole_result(self):
+        # Arrange
+        sql = "SELECT id FROM orders ORDER BY id"
+        ids, offset = [], 0
+
+        # Act
+        while True:
+            page = executer(self.db, sql, max_rows=60, offset=offset)
+            ids += [row[0] for row in page.rows]
+            if not page.truncated:
+                break
+            offset += len(page.rows)
+
+        # Assert
+        self.assertEqual(ids, list(range(1, 251)))
+
+    def test_valider_sql_reports_error_without_executing(self):
+        # Act
+        valide = valider_sql(self.db, "SELECT COUNT(*) FROM orders WHERE order_date >= :debut",
+                             {"debut": "2025-01-01"})
+        inconnue = valider_sql(self.db, "SELECT nom FROM customers")
+        ecriture = valider_sql(self.db, "DELETE FROM orders")
+
+        # Assert
+        self.assertIsNone(valide)
+        self.assertEqual(inconnue, "no such column: nom")
+        self.assertIsNone(ecriture)
+        self.assertEqual(self.db.execute(text("SELECT COUNT(*) FROM orders")).scalar(), 250)
+
+    def test_cursor_round_trip(self):
+        self.assertEqual(decoder_curseur(encoder_curseur(120)), 120)
+        self.assertEqual(decoder_curseur(None), 0)
+        with self.assertRaises(ValueError):
+            decoder_curseur("pas-un-curseur")
+
+
+class TestQueryRegistry(unittest.TestCase):
+
+    def test_registry_is_bounded(self):
+        registry = QueryRegistry(max_entries=2)
+        first = registry.register("SELECT 1")
+        registry.register("SELECT 2")
+        registry.register("SELECT 3")
+
+        self.assertIsNone(registry.get(first))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+from datetime import date
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend.intents import IntentMatcher
+from backend.utils import seed_db
+
+
+class TestIntentMatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.matcher = IntentMatcher(today=lambda: date(2026, 3, 15))
+
+    def test_matches_frontend_suggestions(self):
+        suggestions = {
+            "Combien de clients avons-nous ?": "compter",
+            "Quels sont les 5 produits les plus vendus ?": "top_produits",
+            "Quel est le chiffre d'affaires du mois dernier ?": "chiffre_affaires",
+            "Quels clients n'ont pas commandé depuis 3 mois ?": "clients_inactifs",
+            "Compare les ventes de janvier et février": "comparer_mois",
+        }
+        for question, name in suggestions.items():
+            with self.subTest(question=question):
+                match = self.matcher.match(question)
+                self.assertIsNotNone(match)
+                self.assertEqual(match.name, name)
+
+    def test_computes_parameters_from_question_and_today(self):
+        self.assertEqual(self.matcher.match("Quels sont les 10 produits les plus vendus ?").params, {"limit": 10})
+        self.assertEqual(self.matcher.match("Quel est le chiffre d'affaires du mois dernier ?").params,
+                         {"debut": "2026-02-01", "fin": "2026-03-01"})
+        self.assertEqual(self.matcher.match("Quels clients n'ont pas commandé depuis trois mois ?").params,
+                         {"depuis": "2025-12-15"})
+        # Avril n'est pas encore passé en mars 2026 : on compare avril 2025
+        params = self.matcher.match("Compare les ventes de janvier et avril").params
+        self.assertEqual((params["debut1"], params["debut2"]), ("2026-01-01", "2025-04-01"))
+
+    def test_richer_questions_fall_back_to_llm(self):
+        self.assertIsNone(self.matcher.match("Combien de clients habitent à Paris ?"))
+        self.assertIsNone(self.matcher.match("Quel temps fait-il ?"))
+
+    def test_stats_report_hit_rate_per_template(self):
+        self.matcher.match("Combien de produits ?")
+        self.matcher.match("Combien de commandes au total ?")
+        self.matcher.match("Quelle est la ville la plus active ?")
+
+        stats = self.matcher.stats()
+
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["by_template"], {"compter": 2})
+        self.assertAlmostEqual(stats["hit_rate"], 0.6667)
+
+    def test_every_template_runs_against_the_models(self):
+        # Arrange
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+        seed_db(db)
+        matcher = IntentMatcher()
+        questions = [
+            "Combien de clients avons-nous ?",
+            "Le produit le plus vendu",
+            "Quels sont les 5 produits les plus vendus ?",
+            "Chiffre d'affaires des 30 derniers jours",
+            "Quels clients n'ont pas commandé depuis 3 mois ?",
+            "Compare les ventes de janvier et février",
+        ]
+
+        for question in questions:
+            with self.subTest(question=question):
+                match = matcher.match(question)
+                # Act
+                rows = db.execute(text(match.sql).bindparams(**match.params)).fetchall()
+                # Assert
+                self.assertIsInstance(rows, list)
+
+        self.assertEqual(db.execute(text(matcher.match("Combien de clients ?").sql)).scalar(), 60)
+        db.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from openai import AsyncOpenAI, OpenAI
+
+from backend.llm_clients import ClientRegistry
+
+
+class TestClientRegistry(unittest.TestCase):
+
+    def test_same_key_and_url_reuse_the_same_client(self):
+        # Arrange
+        registry = ClientRegistry()
+
+        # Act
+        first = registry.get("k", "http://example")
+        second = registry.get("k", "http://example")
+
+        # Assert
+        self.assertIs(first, second)
+        self.assertIsInstance(first, AsyncOpenAI)
+        self.assertEqual(registry.stats()["hits"], 1)
+        self.assertEqual(registry.stats()["misses"], 1)
+        self.assertEqual(registry.stats()["reuse_ratio"], 0.5)
+
+    def test_sync_and_async_clients_are_separate(self):
+        registry = ClientRegistry()
+
+        self.assertIsInstance(registry.get("k", "http://example", asynchronous=False), OpenAI)
+        self.assertIsInstance(registry.get("k", "http://example"), AsyncOpenAI)
+        self.assertEqual(registry.stats()["clients"], 2)
+
+    def test_least_recently_used_client_is_evicted_when_full(self):
+        # Arrange
+        registry = ClientRegistry(max_clients=2)
+        a = registry.get("a", "http://example")
+        registry.get("b", "http://example")
+        registry.get("a", "http://example")
+
+        # Act
+        registry.get("c", "http://example")
+
+        # Assert
+        self.assertEqual(registry.stats()["evictions"], 1)
+        self.assertIs(registry.get("a", "http://example"), a)
+        registry.get("b", "http://example")
+        self.assertEqual(registry.stats()["misses"], 4)
+
+    def test_idle_clients_are_evicted(self):
+        registry = ClientRegistry(idle_ttl_seconds=10)
+        with patch("backend.llm_clients.time.monotonic", return_value=100.0):
+            first = registry.get("k", "http://example")
+        with patch("backend.llm_clients.time.monotonic", return_value=111.0):
+            second = registry.get("k", "http://example")
+
+        self.assertIsNot(first, second)
+        self.assertEqual(registry.stats()["evictions"], 1)
+
+    def test_evicted_client_is_closed_once_no_request_can_hold_it(self):
+        # Arrange
+        registry = ClientRegistry(max_clients=1, timeout=30)
+        with patch("backend.llm_clients.time.monotonic", return_value=100.0):
+            first = registry.get("a", "http://example", asynchronous=False)
+        with patch.object(first, "close") as close:
+
+            # Act
+            with patch("backend.llm_clients.time.monotonic", return_value=101.0):
+                registry.get("b", "http://example", asynchronous=False)
+            ferme_au_retrait = close.called
+            with patch("backend.llm_clients.time.monotonic", return_value=131.0):
+                registry.get("b", "http://example", asynchronous=False)
+
+        # Assert
+        self.assertFalse(ferme_au_retrait)
+        close.assert_called_once_with()
+        self.assertEqual(registry.stats()["closed"], 1)
+
+
+class TestClientRegistryAsync(unittest.IsolatedAsyncioTestCase):
+
+    async def test_evicted_async_client_is_awaited_closed(self):
+        # Arrange
+        registry = ClientRegistry(idle_ttl_seconds=10, timeout=30)
+        with patch("backend.llm_clients.time.monotonic", return_value=100.0):
+            first = registry.get("k", "http://example")
+        first.close = AsyncMock()
+
+        # Act
+        with patch("backend.llm_clients.time.monotonic", return_value=111.0):
+            registry.get("k", "http://example")
+        with patch("backend.llm_clients.time.monotonic", return_value=141.0):
+            registry.get("k", "http://example")
+        await registry.fermer()
+
+        # Assert
+        first.close.assert_awaited_once_with()
+
+    async def test_shutdown_closes_every_client(self):
+        # Arrange
+        registry = ClientRegistry()
+        clients = [registry.get("k", "http://example"), registry.get("k", "http://example", asynchronous=False)]
+
+        # Act
+        await registry.fermer()
+
+        # Assert
+        self.assertTrue(all(client.is_closed() for client in clients))
+        self.assertEqual(registry.stats()["clients"], 0)
+        self.assertEqual(registry.stats()["closed"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,202 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from backend.agent import AIAgent, AsyncAIAgent
+from backend.config import settings
+from backend.metrics import Metriques, server_timing
+
+
+def _reponse_llm(content, prompt_tokens=100, completion_tokens=20):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+                           usage=SimpleNamespace(prompt_tokens=prompt_tokens,
+                                                 completion_tokens=completion_tokens))
+
+
+class TestMetriques(unittest.TestCase):
+    def test_histogram_buckets_are_cumulative_in_exposition(self):
+        # Arrange
+        metriques = Metriques()
+
+        # Act
+        for ms in (3, 40, 40, 2000):
+            metriques.duree("execution", ms)
+        texte = metriques.exposer()
+
+        # Assert
+        self.assertIn('ai_agent_stage_duration_seconds_bucket{stage="execution",le="0.005"} 1', texte)
+        self.assertIn('ai_agent_stage_duration_seconds_bucket{stage="execution",le="0.05"} 3', texte)
+        self.assertIn('ai_agent_stage_duration_seconds_bucket{stage="execution",le="+Inf"} 4', texte)
+        self.assertIn('ai_agent_stage_duration_seconds_count{stage="execution"} 4', texte)
+
+    def test_disabled_metrics_record_nothing(self):
+        # Arrange
+        metriques = Metriques(enabled=False)
+
+        # Act
+        metriques.duree("execution", 12)
+        metriques.sql("llm", 3)
+        metriques.issue("failed")
+
+        # Assert
+        self.assertEqual(metriques.durees.series, {})
+        self.assertEqual(metriques.sources.valeurs, {})
+        self.assertEqual(metriques.questions.valeurs, {})
+
+    def test_external_counters_are_appended(self):
+        # Act
+        texte = Metriques().exposer({"ai_agent_result_cache_hits_total": ("Succès", 7)})
+
+        # Assert
+        self.assertIn("# TYPE ai_agent_result_cache_hits_total counter\nai_agent_result_cache_hits_total 7",
+                      texte)
+
+    def test_server_timing_header(self):
+        self.assertEqual(server_timing({"sql_generation": 812.5, "execution": 3.0}),
+                         "sql_generation;dur=812.5, execution;dur=3")
+
+
+class TestAgentInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.metriques = Metriques()
+        self.client = MagicMock()
+        self.db = MagicMock()
+
+    def _agent(self, debug):
+        agent = AIAgent(api_key="k", client=self.client, answer_policy="llm",
+                        metrics=self.metriques, debug=debug)
+        agent.validationLocale = MagicMock(return_value=None)
+        agent.ececution = MagicMock(return_value=[{"n": 60}])
+        return agent
+
+    def test_stages_tokens_and_outcome_are_recorded(self):
+        # Arrange
+        self.client.chat.completions.create.side_effect = [
+            _reponse_llm("SELECT COUNT(*) FROM customers", 300, 12),
+            _reponse_llm("Il y a 60 clients.", 80, 9),
+        ]
+
+        # Act
+        reponse = self._agent(debug=True).questionDetaillee(self.db, "Combien de clients ?")
+
+        # Assert
+        self.assertEqual(set(reponse.debug["timings_ms"]),
+                         {"sql_generation", "validation", "execution", "answer_generation"})
+        self.assertEqual(reponse.debug["tokens"], {"prompt_tokens": 380, "completion_tokens": 21})
+        self.assertEqual(reponse.debug["attempts"], 1)
+        self.assertEqual(self.metriques.sources.valeurs, {("llm",): 1})
+        self.assertEqual(self.metriques.questions.valeurs, {("ok",): 1})
+        self.assertEqual(self.metriques.lignes_lues.series[()][2], 1)
+        self.assertEqual(set(reponse.debug["prompts"]), {"sql", "answer"})
+        # Prompt dans le budget : rien de retiré
+        self.assertEqual(reponse.debug["prompts"]["sql"]["tokens_saved"], 0)
+
+    def test_answer_prompt_over_model_budget_summarizes_data(self):
+        # Arrange
+        agent = self._agent(debug=True)
+        rows = [{"id": i, "city": "Paris" if i % 2 else "Lyon"} for i in range(100)]
+
+        # Act
+        with patch.dict(settings.prompt_token_budgets, {agent.model_chat: 300}):
+            prompt = agent._promptReponse("Où habitent les clients ?", rows)
+
+        # Assert
+        self.assertIn("en voici un résumé", prompt)
+        self.assertEqual(agent.mesures["prompts"]["answer"]["reduced"], ["donnees"])
+        self.assertEqual(self.metriques.reductions.valeurs, {("answer",): 1})
+        self.assertGreater(self.metriques.tokens_economises.valeurs[("answer",)], 0)
+
+    def test_repair_is_counted_and_debug_is_off_by_default(self):
+        # Arrange
+        self.client.chat.completions.create.side_effect = [
+            _reponse_llm("SELECT nom FROM customers"),
+            _reponse_llm("SELECT name FROM customers"),
+            _reponse_llm("Alice"),
+        ]
+        agent = self._agent(debug=False)
+        agent.validationLocale = MagicMock(side_effect=["no such column: nom", None])
+
+        # Act
+        reponse = agent.questionDetaillee(self.db, "Noms des clients")
+
+        # Assert
+        self.assertIsNone(reponse.debug)
+        self.assertEqual(self.metriques.reparations.valeurs, {(): 1})
+        self.assertIn(("sql_repair",), self.metriques.durees.series)
+
+    def test_failed_answer_is_not_counted_as_ok(self):
+        # Arrange
+        self.client.chat.completions.create.side_effect = [
+            _reponse_llm("SELECT COUNT(*) FROM customers"),
+            RuntimeError("modèle indisponible"),
+        ]
+
+        # Act
+        with self.assertRaises(RuntimeError):
+            self._agent(debug=False).questionDetaillee(self.db, "Combien de clients ?")
+
+        # Assert
+        self.assertEqual(self.metriques.questions.valeurs, {("answer_failed",): 1})
+
+
+def _morceau(texte=None, usage=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=texte))] if texte is not None else []
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+class _Flux:
+    def __init__(self, morceaux):
+        self.morceaux = morceaux
+
+    def __aiter__(self):
+        return self._lire()
+
+    async def _lire(self):
+        for morceau in self.morceaux:
+            yield morceau
+
+
+class TestStreamInstrumentation(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.metriques = Metriques()
+        self.client = MagicMock()
+        self.agent = AsyncAIAgent(api_key="k", client=self.client, answer_policy="llm",
+                                  metrics=self.metriques)
+        self.agent.sqlGeneration = AsyncMock(return_value="SELECT COUNT(*) AS n FROM customers")
+        self.agent.validationLocale = AsyncMock(return_value=None)
+        self.agent.ececution = AsyncMock(return_value=[{"n": 60}])
+
+    async def test_streamed_answer_records_usage_and_outcome(self):
+        # Arrange
+        usage = SimpleNamespace(prompt_tokens=80, completion_tokens=9)
+        self.client.chat.completions.create = AsyncMock(return_value=_Flux(
+            [_morceau("Il y a "), _morceau("60 clients."), _morceau(usage=usage)]))
+
+        # Act
+        events = [event async for event in self.agent.questionStream(MagicMock(), "Combien de clients ?")]
+
+        # Assert
+        self.assertEqual(events[-1], ("done", {}))
+        self.assertEqual(self.client.chat.completions.create.call_args.kwargs["stream_options"],
+                         {"include_usage": True})
+        self.assertEqual(self.metriques.tokens.series[(self.agent.model_chat, "completion")][1], 9)
+        self.assertEqual(self.metriques.questions.valeurs, {("ok",): 1})
+
+    async def test_closed_stream_is_not_counted_as_ok(self):
+        # Arrange
+        self.client.chat.completions.create = AsyncMock(return_value=_Flux(
+            [_morceau("Il y a "), _morceau("60 clients.")]))
+        flux = self.agent.questionStream(MagicMock(), "Combien de clients ?")
+
+        # Act : le client se déconnecte au premier token
+        async for nom, _ in flux:
+            if nom == "token":
+                break
+        await flux.aclose()
+
+        # Assert
+        self.assertEqual(self.metriques.questions.valeurs, {("answer_failed",): 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+from unittest.mock import patch
+
+from backend.conversation import Echange
+from backend.prompts import (Partie, compacter, compter_tokens, consignes_sql, construire, parties_reponse,
+                             parties_sql)
+
+
+class TestCompaction(unittest.TestCase):
+    def test_indentation_and_blank_lines_are_removed(self):
+        self.assertEqual(compacter("\n        Ligne 1  \n\n        - règle\n    "), "Ligne 1\n- règle")
+
+    def test_static_instructions_are_rendered_once_per_dialect(self):
+        # Act
+        premier = consignes_sql("sqlite", False)
+        second = consignes_sql("sqlite", False)
+
+        # Assert
+        self.assertIs(premier, second)
+        self.assertEqual(premier.texte, compacter(premier.texte))
+
+
+class TestConstruire(unittest.TestCase):
+    def test_prompt_fitting_budget_is_not_reduced(self):
+        # Act
+        prompt = construire([Partie("a", "   Bonjour"), Partie("b", "le monde")], budget=100)
+
+        # Assert
+        self.assertEqual(prompt.texte, "Bonjour\nle monde")
+        self.assertEqual(prompt.reduites, [])
+        self.assertEqual(prompt.tokens, compter_tokens("Bonjour") + compter_tokens("le monde"))
+        # Le compactage seul ne compte pas comme une économie
+        self.assertEqual(prompt.economises, 0)
+
+    def test_data_is_reduced_before_history(self):
+        # Arrange
+        parties = [
+            Partie("consignes", "x" * 40),
+            Partie("historique", "h" * 400, 2, lambda budget: "h" * (budget * 4)),
+            Partie("donnees", "d" * 400, 1, lambda budget: "d" * (budget * 4)),
+        ]
+
+        # Act
+        prompt = construire(parties, budget=120)
+
+        # Assert
+        self.assertEqual(prompt.reduites, ["donnees"])
+        self.assertLessEqual(prompt.tokens, 120)
+        self.assertIn("h" * 400, prompt.texte)
+        self.assertEqual(prompt.tokens_avant_reduction, sum(compter_tokens(p.texte) for p in parties))
+        self.assertEqual(prompt.economises, prompt.tokens_avant_reduction - prompt.tokens)
+
+    def test_fixed_parts_are_never_cut(self):
+        # Act
+        prompt = construire([Partie("question", "q" * 400), Partie("donnees", "d" * 40, 1, lambda b: "")],
+                            budget=50)
+
+        # Assert
+        self.assertIn("q" * 400, prompt.texte)
+        self.assertNotIn("d", prompt.texte)
+        self.assertTrue(prompt.depasse)
+
+
+class TestPromptSql(unittest.TestCase):
+    def test_questions_share_the_same_prefix_up_to_the_schema(self):
+        # Act
+        premier = construire(parties_sql("customers(id INTEGER PK)", "Combien de clients ?"), 8000).texte
+        second = construire(parties_sql("customers(id INTEGER PK)", "Liste des villes"), 8000).texte
+
+        # Assert
+        prefixe = premier[:premier.index("Question :")]
+        self.assertTrue(second.startswith(prefixe))
+        self.assertTrue(prefixe.rstrip().endswith("customers(id INTEGER PK)"))
+
+    def test_oldest_questions_are_dropped_first_when_history_exceeds_budget(self):
+        # Arrange
+        echanges = [Echange(f"Question {i} " + "x" * 200, f"SELECT {i}", "1 lignes") for i in range(4)]
+        parties = parties_sql("t(id INTEGER)", "Et pour Lyon ?", echanges=echanges)
+        budget = sum(compter_tokens(compacter(p.texte)) for p in parties) - 100
+
+        # Act
+        prompt = construire(parties, budget)
+
+        # Assert
+        self.assertEqual(prompt.reduites, ["conversation"])
+        self.assertNotIn("Question 0", prompt.texte)
+        self.assertIn("SELECT 3", prompt.texte)
+
+
+class TestPromptReponse(unittest.TestCase):
+    def test_data_block_comes_last_after_static_instructions(self):
+        # Act
+        prompt = construire(parties_reponse("Combien ?", "[{'n': 3}]", lambda b: ""), 8000).texte
+
+        # Assert
+        self.assertTrue(prompt.startswith("Tu es un assistant intelligent."))
+        self.assertTrue(prompt.endswith("[{'n': 3}]"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from datetime import date
+from decimal import Decimal
+
+from backend.renderer import MESSAGE_VIDE, formater_valeur, rendre_reponse
+
+
+class TestRenderer(unittest.TestCase):
+
+    def test_empty_result(self):
+        self.assertEqual(rendre_reponse([]), MESSAGE_VIDE)
+
+    def test_scalar_uses_french_number_and_currency_format(self):
+        self.assertEqual(rendre_reponse([{"nombre": 60}]), "Nombre : **60**")
+        self.assertEqual(rendre_reponse([{"chiffre_affaires": Decimal("12345.5")}]),
+                         "Chiffre affaires : **12\u202f345,50 €**")
+
+    def test_single_row_is_rendered_as_list(self):
+        out = rendre_reponse([{"name": "Alice", "created_at": date(2025, 1, 3)}])
+
+        self.assertEqual(out, "- Name : Alice\n- Created at : 03/01/2025")
+
+    def test_small_table_is_rendered_as_markdown(self):
+        out = rendre_reponse([{"produit": "A", "quantite": 3}, {"produit": "B", "quantite": 1}])
+
+        self.assertIn("| Produit | Quantite |", out)
+        self.assertIn("| A | 3 |", out)
+
+    def test_large_result_needs_chat_model_unless_forced(self):
+        rows = [{"id": i} for i in range(20)]
+
+        self.assertIsNone(rendre_reponse(rows))
+        self.assertIn("voici les 10 premiers", rendre_reponse(rows, force=True))
+
+    def test_formats_iso_dates_and_plain_floats(self):
+        self.assertEqual(formater_valeur("order_date", "2026-02-28"), "28/02/2026")
+        self.assertEqual(formater_valeur("moyenne", 2.5), "2,5")
+
+    def test_count_aliases_are_not_amounts(self):
+        self.assertEqual(rendre_reponse([{"total": 60}]), "Total : **60**")
+        self.assertEqual(rendre_reponse([{"ventes": 1200}]), "Ventes : **1\u202f200**")
+
+    def test_ids_and_years_are_not_grouped(self):
+        self.assertEqual(formater_valeur("customer_id", 12345), "12345")
+        self.assertEqual(formater_valeur("annee", 2025), "2025")
+        self.assertEqual(formater_valeur("year", 2025), "2025")
+        self.assertEqual(formater_valeur("quantite", 2025), "2\u202f025")
+
+
+if __name__ == "__main__":
+    unittest.main()
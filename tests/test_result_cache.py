@@ -0,0 +1,218 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base, configurer_sqlite
+from backend.models import Customer
+from backend.result_cache import (TOUTES_TABLES, ResultCache, TableVersions, canonicaliser_sql, installer,
+                                  table_ecrite, tables_lues)
+from backend.utils import seed_db
+
+
+class TestCanonicalisation(unittest.TestCase):
+
+    def test_whitespace_and_case_are_normalized_but_literals_preserved(self):
+        a = canonicaliser_sql("SELECT  name\n FROM customers WHERE city = 'Paris' ;")
+        b = canonicaliser_sql("select name from CUSTOMERS where city = 'Paris'")
+        c = canonicaliser_sql("select name from customers where city = 'PARIS'")
+
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
+
+    def test_tables_lues(self):
+        sql = canonicaliser_sql("SELECT * FROM orders o JOIN products p ON p.id = o.product_id "
+                                "WHERE p.name = 'from customers'")
+
+        self.assertEqual(tables_lues(sql), ("orders", "products"))
+
+
+    def test_tables_lues_includes_every_table_of_a_comma_join(self):
+        sql = canonicaliser_sql("SELECT COUNT(*) FROM customers c, orders o WHERE o.customer_id = c.id")
+
+        self.assertEqual(tables_lues(sql), ("customers", "orders"))
+
+    def test_tables_lues_after_subquery(self):
+        sql = canonicaliser_sql("SELECT * FROM (SELECT id FROM orders) t, products p")
+
+        self.assertEqual(tables_lues(sql), ("orders", "products"))
+
+    def test_table_ecrite_handles_qualified_and_quoted_names(self):
+        for statement, table in [
+            ("UPDATE public.orders SET quantity = 2", "orders"),
+            ('INSERT INTO "public"."orders" (id) VALUES (1)', "orders"),
+            ("DELETE FROM main.orders WHERE id = 1", "orders"),
+            ("insert or replace into app_metadata(key) values ('x')", "app_metadata"),
+            ('UPDATE "ma table" SET a = 1', TOUTES_TABLES),
+            ("CREATE INDEX ix ON orders (id)", TOUTES_TABLES),
+            ("SELECT * FROM orders", None),
+        ]:
+            with self.subTest(statement=statement):
+                self.assertEqual(table_ecrite(statement), table)
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite:///:memory:")
+        installer(self.engine)
+        Base.metadata.create_all(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        seed_db(self.db)
+        self.cache = ResultCache(max_bytes=1024 * 1024, versions=TableVersions())
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_repeated_equivalent_query_does_not_hit_the_database(self):
+        # Arrange
+        first = self.cache.executer(self.db, "SELECT COUNT(*) AS n FROM customers")
+
+        # Act
+        with patch("backend.result_cache.executer") as execute:
+            second = self.cache.executer(self.db, "select count(*) as n\n from   customers;")
+
+        # Assert
+        execute.assert_not_called()
+        self.assertIs(first, second)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_commit_on_read_table_invalidates_entry(self):
+        # Arrange
+        with patch("backend.result_cache.table_versions", self.cache.versions):
+            self.cache.executer(self.db, "SELECT COUNT(*) AS n FROM customers")
+            self.cache.executer(self.db, "SELECT COUNT(*) AS n FROM products")
+
+            # Act : une écriture Core validée sur customers
+            self.db.execute(insert(Customer).values(name="Nouveau", city="Paris"))
+            self.db.commit()
+
+            # Assert
+            customers = self.cache.executer(self.db, "SELECT COUNT(*) AS n FROM customers")
+            self.cache.executer(self.db, "SELECT COUNT(*) AS n FROM products")
+        self.assertEqual(customers.to_dicts(), [{"n": 61}])
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_commit_on_second_table_of_comma_join_invalidates_entry(self):
+        # Arrange
+        sql = "SELECT COUNT(*) AS n FROM customers c, products p WHERE p.id = c.id"
+        with patch("backend.result_cache.table_versions", self.cache.versions):
+            avant = self.cache.executer(self.db, sql).to_dicts()
+
+            # Act
+            self.db.execute(Base.metadata.tables["products"].delete().where(
+                Base.metadata.tables["products"].c.id == 1))
+            self.db.commit()
+            apres = self.cache.executer(self.db, sql).to_dicts()
+
+        # Assert
+        self.assertEqual(apres[0]["n"], avant[0]["n"] - 1)
+        self.assertEqual(self.cache.stats()["hits"], 0)
+
+    def test_orm_write_is_detected_and_rollback_is_ignored(self):
+        with patch("backend.result_cache.table_versions", self.cache.versions):
+            before = self.cache.versions.versions(("customers",))
+
+            self.db.add(Customer(name="Annulé"))
+            self.db.flush()
+            self.db.rollback()
+            self.assertEqual(self.cache.versions.versions(("customers",)), before)
+
+            self.db.add(Customer(name="Validé"))
+            self.db.commit()
+            self.assertNotEqual(self.cache.versions.versions(("customers",)), before)
+
+    def test_writes_on_an_engine_without_installer_are_not_tracked(self):
+        # Arrange
+        autre = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(autre)
+        with patch("backend.result_cache.table_versions", self.cache.versions):
+            before = self.cache.versions.versions(("customers",))
+
+            # Act
+            with autre.begin() as conn:
+                conn.execute(insert(Customer).values(name="Ailleurs"))
+
+            # Assert
+            self.assertEqual(self.cache.versions.versions(("customers",)), before)
+        autre.dispose()
+
+    def test_memory_bound_evicts_least_recently_used(self):
+        cache = ResultCache(max_bytes=20_000, versions=TableVersions())
+        for i in range(20):
+            cache.executer(self.db, f"SELECT id, name FROM customers WHERE id <= {i + 5}")
+
+        stats = cache.stats()
+        self.assertLessEqual(stats["bytes"], 20_000)
+        self.assertGreater(stats["evictions"], 0)
+
+
+    def test_entry_expires_after_ttl(self):
+        # Arrange
+        cache = ResultCache(versions=TableVersions(), ttl_seconds=60)
+        with patch("backend.result_cache.time.monotonic", return_value=1000.0):
+            cache.executer(self.db, "SELECT COUNT(*) AS n FROM customers")
+
+        # Act
+        with patch("backend.result_cache.time.monotonic", return_value=1061.0):
+            cache.executer(self.db, "SELECT COUNT(*) AS n FROM customers")
+
+        # Assert
+        self.assertEqual(cache.stats()["hits"], 0)
+        self.assertEqual(cache.stats()["entries"], 1)
+
+
+class TestVersionsPartagees(unittest.TestCase):
+    """Écrivain et lecteur sur deux engines distincts, comme deux processus :
+    le lecteur ne voit pas les compteurs locaux de l'écrivain."""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        chemin = os.path.join(self.dir.name, "app.db")
+        self.ecrivain = create_engine(f"sqlite:///{chemin}")
+        self.lecteur = create_engine(f"sqlite:///{chemin}")
+        for engine in (self.ecrivain, self.lecteur):
+            configurer_sqlite(engine)
+            installer(engine)
+        Base.metadata.create_all(self.ecrivain)
+        with sessionmaker(bind=self.ecrivain)() as db:
+            seed_db(db)
+        self.versions = TableVersions()
+        self.versions.lier(self.lecteur, intervalle=0)
+        self.db = sessionmaker(bind=self.lecteur)()
+
+    def tearDown(self):
+        self.db.close()
+        self.ecrivain.dispose()
+        self.lecteur.dispose()
+        self.dir.cleanup()
+
+    def test_write_from_another_process_invalidates_entry(self):
+        # Arrange
+        cache = ResultCache(versions=self.versions)
+        avant = cache.executer(self.db, "SELECT COUNT(*) AS n FROM customers").to_dicts()
+        self.db.rollback()
+
+        # Act
+        with self.ecrivain.begin() as conn:
+            conn.execute(insert(Customer).values(name="Nouveau", city="Paris"))
+        apres = cache.executer(self.db, "SELECT COUNT(*) AS n FROM customers").to_dicts()
+
+        # Assert
+        self.assertEqual(apres[0]["n"], avant[0]["n"] + 1)
+        self.assertEqual(cache.stats()["hits"], 0)
+
+    def test_database_without_app_metadata_keeps_local_versions(self):
+        # Arrange
+        with self.ecrivain.begin() as conn:
+            conn.exec_driver_sql("DROP TABLE app_metadata")
+
+        # Act / Assert
+        self.assertEqual(self.versions.versions(("customers",)), ((0, 0), (0, 0)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+from backend.database import Base
+from backend.retriever import TableRetriever, tokeniser
+from backend.schema import ColonneSchema, SchemaPrompt, TableSchema, formater_schema, tables_depuis_metadata
+from backend import models  # noqa: F401
+
+
+def _table(nom, colonnes, fks=(), description=""):
+    cols = [ColonneSchema("id", "INTEGER", cle_primaire=True)] + [ColonneSchema(c, "VARCHAR") for c in colonnes]
+    return TableSchema(nom, cols, list(fks), description)
+
+
+class TestTableRetriever(unittest.TestCase):
+    def setUp(self):
+        self.tables = [
+            _table("hr_employees", ["first_name", "salary"], description="salariés de l'entreprise"),
+            _table("hr_departments", ["label"], description="services"),
+            _table("sales_invoices", ["amount", "customer_id"], [("customer_id", "sales_customers", "id")],
+                   description="factures émises"),
+            _table("sales_customers", ["company", "country"], description="clients"),
+            _table("stock_warehouses", ["city"], description="entrepôts"),
+            _table("employee_departments", ["employee_id", "department_id"],
+                   [("department_id", "hr_departments", "id"), ("employee_id", "hr_employees", "id")]),
+        ]
+
+    def test_tokeniser_removes_accents_plurals_and_stop_words(self):
+        self.assertEqual(tokeniser("Les entrepôts des clients"), ["entrepot", "client"])
+        self.assertEqual(tokeniser("total_amount"), ["total", "amount"])
+
+    def test_selection_uses_descriptions_and_referenced_tables(self):
+        # Act
+        noms = TableRetriever(self.tables).selection("Montant total des factures", top_k=1)
+
+        # Assert
+        self.assertEqual(noms, ["sales_invoices", "sales_customers"])
+
+    def test_selection_adds_link_tables_between_selected_tables(self):
+        # Act
+        noms = TableRetriever(self.tables).selection("salaire des salariés par service", top_k=2)
+
+        # Assert
+        self.assertEqual(noms, ["hr_employees", "hr_departments", "employee_departments"])
+
+    def test_models_descriptions_match_french_questions(self):
+        # Arrange
+        retriever = TableRetriever(tables_depuis_metadata(Base.metadata))
+
+        # Act / Assert
+        self.assertEqual(retriever.selection("Quelles villes ont le plus de clients ?", top_k=1), ["customers"])
+        self.assertEqual(retriever.selection("chiffre d'affaires des commandes", top_k=1),
+                         ["customers", "orders", "products"])
+
+    def test_small_schema_is_sent_in_full(self):
+        # Arrange
+        schema = SchemaPrompt(formater_schema(self.tables), "x", self.tables)
+
+        # Act / Assert
+        self.assertEqual(schema.texte_pour("factures", top_k=1, min_tables=20), schema.texte)
+        self.assertNotIn("hr_employees", schema.texte_pour("factures", top_k=1, min_tables=2))
+
+
+if __name__ == "__main__":
+    unittest.main()
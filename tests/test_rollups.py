@@ -0,0 +1,116 @@
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from backend.bootstrap import bootstrap
+from backend.database import Base
+from backend.rollups import (etat_agregats, notes_agregats, rafraichir_agregats, rafraichir_periodiquement,
+                             reconstruire_agregats)
+from backend.schema import SchemaCatalog
+from backend.seeding import Volumes, generer
+
+
+class TestRollups(unittest.TestCase):
+    def setUp(self):
+        # Connexion partagée : le catalogue collecte ses statistiques dans un autre thread
+        self.engine = create_engine("sqlite://", poolclass=StaticPool,
+                                    connect_args={"check_same_thread": False})
+        bootstrap(self.engine, seed=1)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def _lire(self, sql):
+        with self.engine.connect() as conn:
+            return conn.execute(text(sql)).all()
+
+    def _ajouter_commandes(self, n):
+        with self.engine.begin() as conn:
+            generer(conn, Volumes(customers=5, products=2, orders=n), seed=2)
+
+    def _agregats(self):
+        return {table: self._lire(f"SELECT * FROM {table} ORDER BY 1, 2, 3")
+                for table in ("sales_daily", "sales_monthly", "sales_monthly_products")}
+
+    def test_bootstrap_builds_rollups_matching_orders(self):
+        # Act
+        (ca_agregat, commandes), = self._lire("SELECT SUM(revenue), SUM(orders_count) FROM sales_monthly")
+        (ca, total), = self._lire("SELECT SUM(total_amount), COUNT(*) FROM orders")
+
+        # Assert
+        self.assertEqual(commandes, total)
+        self.assertAlmostEqual(ca_agregat, ca, places=2)
+
+    def test_incremental_refresh_only_adds_new_orders(self):
+        # Arrange
+        self._ajouter_commandes(40)
+        with self.engine.connect() as conn:
+            self.assertEqual(etat_agregats(conn).en_retard, 40)
+
+        # Act
+        traitees = rafraichir_agregats(self.engine)
+        incremental = self._agregats()
+        reconstruire_agregats(self.engine)
+
+        # Assert
+        self.assertEqual(traitees, 40)
+        self.assertEqual(rafraichir_agregats(self.engine), 0)
+        for table, lignes in self._agregats().items():
+            for attendue, obtenue in zip(lignes, incremental[table]):
+                self.assertEqual(attendue[:-1], obtenue[:-1])
+                self.assertAlmostEqual(attendue[-1], obtenue[-1], places=2)
+
+    def test_stale_rollups_are_flagged_in_prompt_schema(self):
+        # Arrange
+        self._ajouter_commandes(10)
+        catalogue = SchemaCatalog(self.engine, Base.metadata, notes=notes_agregats)
+
+        # Act
+        catalogue.get()
+        catalogue.attendre()
+        texte = catalogue.get().texte
+
+        # Assert
+        self.assertIn("agrégats en retard : jusqu'à 10 commandes", texte)
+        self.assertIn("sales_monthly(month VARCHAR PK", texte)
+
+    def test_notes_are_empty_without_metadata_table(self):
+        self.assertEqual(notes_agregats(create_engine("sqlite:///:memory:")), {})
+
+    def test_unsupported_dialect_skips_rollups(self):
+        # Arrange : aucune connexion ne doit être ouverte
+        engine = SimpleNamespace(dialect=SimpleNamespace(name="mssql"))
+
+        # Act / Assert
+        self.assertEqual(rafraichir_agregats(engine), 0)
+        self.assertEqual(reconstruire_agregats(engine), 0)
+        self.assertEqual(notes_agregats(engine), {})
+
+    def test_periodic_refresh_catches_up_new_orders(self):
+        # Arrange
+        self._ajouter_commandes(10)
+        arret = threading.Event()
+        boucle = threading.Thread(target=rafraichir_periodiquement, args=(self.engine, 0.01, arret))
+
+        # Act
+        boucle.start()
+        limite = time.monotonic() + 5
+        while time.monotonic() < limite:
+            with self.engine.connect() as conn:
+                if not etat_agregats(conn).en_retard:
+                    break
+            time.sleep(0.01)
+        arret.set()
+        boucle.join()
+
+        # Assert
+        with self.engine.connect() as conn:
+            self.assertEqual(etat_agregats(conn).en_retard, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+from unittest.mock import patch
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from backend.database import Base
+from backend.result_cache import TableVersions
+from backend.schema import SchemaCatalog, schema_depuis_metadata, tables_depuis_base, empreinte
+from backend.utils import seed_db
+from backend import models  # noqa: F401
+
+
+class TestSchema(unittest.TestCase):
+    def setUp(self):
+        # Connexion partagée : les statistiques sont collectées dans un autre thread
+        self.engine = create_engine("sqlite://", poolclass=StaticPool,
+                                    connect_args={"check_same_thread": False})
+        Base.metadata.create_all(self.engine)
+        seed_db(sessionmaker(bind=self.engine)())
+        self.versions = TableVersions()
+        self.catalogues = []
+
+    def tearDown(self):
+        for catalog in self.catalogues:
+            catalog.attendre()
+        self.engine.dispose()
+
+    def test_metadata_schema_matches_models(self):
+        # Act
+        schema = schema_depuis_metadata(Base.metadata)
+
+        # Assert
+        self.assertIn("customers(id INTEGER PK, name VARCHAR, email VARCHAR, city VARCHAR, created_at DATE)",
+                      schema.texte)
+        self.assertIn("orders.customer_id -> customers.id", schema.texte)
+        self.assertNotIn("app_metadata", schema.texte)
+
+    def test_introspected_structure_has_same_fingerprint_as_models(self):
+        self.assertEqual(empreinte(tables_depuis_base(self.engine)),
+                         schema_depuis_metadata(Base.metadata).fingerprint)
+
+    def _catalogue(self, **kwargs) -> SchemaCatalog:
+        catalog = SchemaCatalog(self.engine, Base.metadata, versions=self.versions, **kwargs)
+        self.catalogues.append(catalog)
+        catalog.get()
+        catalog.attendre()
+        return catalog
+
+    def test_catalog_adds_stats_without_changing_fingerprint(self):
+        # Act
+        schema = self._catalogue().get()
+
+        # Assert
+        self.assertIn("-- 60 lignes", schema.texte)
+        self.assertIn("-- category ∈ {", schema.texte)
+        self.assertIn("Électronique", schema.texte)
+        self.assertRegex(schema.texte, r"-- order_date du \d{4}-\d{2}-\d{2} au \d{4}-\d{2}-\d{2}")
+        self.assertEqual(schema.fingerprint, schema_depuis_metadata(Base.metadata).fingerprint)
+
+    def test_catalog_is_cached_until_schema_changes(self):
+        # Arrange
+        catalog = self._catalogue()
+        premier = catalog.get()
+
+        # Act
+        deuxieme = catalog.get()
+        with self.engine.begin() as conn:
+            conn.execute(text("ALTER TABLE customers ADD COLUMN segment VARCHAR"))
+        self.versions.incrementer(["*"])
+        troisieme = catalog.get()
+
+        # Assert
+        self.assertIs(premier, deuxieme)
+        self.assertEqual(catalog.rafraichissements, 2)
+        self.assertIn("segment VARCHAR", troisieme.texte)
+        self.assertNotEqual(premier.fingerprint, troisieme.fingerprint)
+        # Nouvelle structure servie avec les statistiques précédentes
+        self.assertIn("-- 60 lignes", troisieme.texte)
+
+    def test_get_serves_snapshot_without_waiting_for_stats(self):
+        # Arrange
+        catalog = SchemaCatalog(self.engine, Base.metadata, versions=self.versions)
+
+        # Act
+        with patch("backend.schema.threading.Thread") as thread:
+            schema = catalog.get()
+
+        # Assert
+        thread.return_value.start.assert_called_once()
+        self.assertIn("customers(id INTEGER PK", schema.texte)
+        self.assertNotIn("-- 60 lignes", schema.texte)
+
+    def test_stats_are_refreshed_in_background_after_ttl(self):
+        # Arrange
+        catalog = self._catalogue(stats_ttl_seconds=0)
+        with self.engine.begin() as conn:
+            conn.execute(text("DELETE FROM orders WHERE id > 200"))
+
+        # Act
+        avant = catalog.get()
+        catalog.attendre()
+        apres = catalog.get()
+
+        # Assert
+        self.assertIn("-- 250 lignes", avant.texte)
+        self.assertIn("-- 200 lignes", apres.texte)
+        self.assertEqual(catalog.rafraichissements, 1)
+
+    def test_catalog_falls_back_to_models_on_empty_database(self):
+        # Arrange
+        vide = create_engine("sqlite:///:memory:")
+
+        # Act
+        schema = SchemaCatalog(vide, Base.metadata, versions=self.versions).get()
+
+        # Assert
+        self.assertEqual(schema.fingerprint, schema_depuis_metadata(Base.metadata).fingerprint)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+from sqlalchemy import create_engine, text
+from backend.database import Base
+from backend.seeding import Volumes, generer, seed_bulk
+
+
+class TestSeeding(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def _compter(self, table):
+        with self.engine.connect() as conn:
+            return conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+
+    def test_depuis_echelle(self):
+        # Act
+        demo = Volumes.depuis_echelle(1)
+        charge = Volumes.depuis_echelle(4000)
+
+        # Assert
+        self.assertEqual(demo, Volumes(customers=60, products=30, orders=250))
+        self.assertEqual(charge.orders, 1_000_000)
+        self.assertEqual(charge.customers, 240_000)
+
+    def test_seed_bulk_inserts_requested_volumes(self):
+        # Act
+        seed_bulk(self.engine, scale=2, seed=1, batch_size=100)
+
+        # Assert
+        self.assertEqual(self._compter("customers"), 120)
+        self.assertEqual(self._compter("products"), 42)
+        self.assertEqual(self._compter("orders"), 500)
+
+    def test_orders_reference_existing_rows_and_match_prices(self):
+        # Act
+        seed_bulk(self.engine, scale=1, seed=1)
+
+        # Assert
+        with self.engine.connect() as conn:
+            orphelines = conn.execute(text(
+                "SELECT COUNT(*) FROM orders o "
+                "LEFT JOIN customers c ON c.id = o.customer_id "
+                "LEFT JOIN products p ON p.id = o.product_id "
+                "WHERE c.id IS NULL OR p.id IS NULL"
+            )).scalar()
+            ecarts = conn.execute(text(
+                "SELECT COUNT(*) FROM orders o JOIN products p ON p.id = o.product_id "
+                "WHERE ABS(o.total_amount - p.price * o.quantity) > 0.01"
+            )).scalar()
+            bornes = conn.execute(text("SELECT MIN(quantity), MAX(quantity) FROM orders")).one()
+        self.assertEqual(orphelines, 0)
+        self.assertEqual(ecarts, 0)
+        self.assertGreaterEqual(bornes[0], 1)
+        self.assertLessEqual(bornes[1], 5)
+
+    def test_same_seed_gives_same_data(self):
+        # Arrange
+        autre = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(autre)
+
+        # Act
+        seed_bulk(self.engine, scale=1, seed=7)
+        seed_bulk(autre, scale=1, seed=7)
+
+        # Assert
+        requete = text("SELECT o.*, c.name, c.email FROM orders o JOIN customers c ON c.id = o.customer_id "
+                       "ORDER BY o.id")
+        with self.engine.connect() as a, autre.connect() as b:
+            self.assertEqual(a.execute(requete).fetchall(), b.execute(requete).fetchall())
+        autre.dispose()
+
+    def test_generer_appends_after_existing_ids(self):
+        # Arrange
+        seed_bulk(self.engine, scale=1, seed=1)
+
+        # Act
+        with self.engine.begin() as conn:
+            generer(conn, Volumes(customers=5, products=2, orders=10), seed=2)
+
+        # Assert
+        self.assertEqual(self._compter("customers"), 65)
+        self.assertEqual(self._compter("orders"), 260)
+        with self.engine.connect() as conn:
+            nouvelles = conn.execute(text(
+                "SELECT customer_id, product_id FROM orders WHERE id > 250"
+            )).fetchall()
+        self.assertTrue(all(client > 60 and produit > 30 for client, produit in nouvelles))
+
+
+if __name__ == "__main__":
+    unittest.main()
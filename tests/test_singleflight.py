@@ -0,0 +1,68 @@
+import asyncio
+import unittest
+
+from backend.singleflight import SingleFlight
+
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.appels = 0
+
+    async def _calcul(self, valeur="ok", delai=0.05):
+        self.appels += 1
+        await asyncio.sleep(delai)
+        return valeur
+
+    async def test_concurrent_calls_with_same_key_share_one_execution(self):
+        # Act
+        resultats = await asyncio.gather(*(self.flight.run("q", self._calcul) for _ in range(10)))
+
+        # Assert
+        self.assertEqual(resultats, ["ok"] * 10)
+        self.assertEqual(self.appels, 1)
+        self.assertEqual(self.flight.stats()["coalesced"], 9)
+        self.assertEqual(self.flight.stats()["in_flight"], 0)
+
+    async def test_different_keys_and_later_calls_run_separately(self):
+        # Act
+        await asyncio.gather(self.flight.run("a", self._calcul), self.flight.run("b", self._calcul))
+        await self.flight.run("a", self._calcul)
+
+        # Assert
+        self.assertEqual(self.appels, 3)
+        self.assertEqual(self.flight.stats()["leaders"], 3)
+
+    async def test_exception_is_shared_by_all_waiters(self):
+        # Arrange
+        async def echec():
+            self.appels += 1
+            await asyncio.sleep(0.01)
+            raise RuntimeError("LLM indisponible")
+
+        # Act
+        resultats = await asyncio.gather(*(self.flight.run("q", echec) for _ in range(3)),
+                                         return_exceptions=True)
+
+        # Assert
+        self.assertEqual(self.appels, 1)
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in resultats))
+
+    async def test_cancelling_the_first_caller_does_not_cancel_the_others(self):
+        # Arrange
+        premier = asyncio.create_task(self.flight.run("q", self._calcul))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(self.flight.run("q", self._calcul))
+        await asyncio.sleep(0)
+
+        # Act
+        premier.cancel()
+
+        # Assert
+        self.assertEqual(await second, "ok")
+        self.assertTrue(premier.cancelled())
+        self.assertEqual(self.appels, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import unittest
+from unittest.mock import MagicMock
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from backend.database import Base
+from backend.schema import tables_depuis_metadata
+from backend.sql_guard import DelaiDepasse, SqlGuard, delai_max
+from backend.utils import seed_db
+
+
+class TestSqlGuardStatique(unittest.TestCase):
+    def setUp(self):
+        self.garde = SqlGuard(tables_depuis_metadata(Base.metadata))
+
+    def test_accepts_read_queries(self):
+        for sql in [
+            "SELECT COUNT(*) FROM orders;",
+            "SELECT REPLACE(name, 'a', 'b') FROM customers -- pas de delete ici",
+            "SELECT c.city FROM customers c WHERE c.name = 'drop table'",
+            "WITH t AS (SELECT customer_id FROM orders) SELECT * FROM t JOIN customers c ON c.id = t.customer_id",
+            "SELECT o.id FROM orders o, products p WHERE p.id = o.product_id",
+        ]:
+            with self.subTest(sql=sql):
+                self.assertIsNone(self.garde.verifier_statique(sql))
+
+    def test_rejects_writes_and_unknown_objects(self):
+        cas = {
+            "DELETE FROM orders": "Seules les requêtes de lecture",
+            "SELECT 1; DROP TABLE orders": "Une seule requête",
+            "WITH t AS (SELECT 1) DELETE FROM orders": "Instruction interdite : DELETE",
+            "PRAGMA table_info(orders)": "Seules les requêtes de lecture",
+            "SELECT * FROM sqlite_master": "Table inconnue : sqlite_master",
+            "SELECT * FROM app_metadata": "Table inconnue : app_metadata",
+            "SELECT c.nom FROM customers c": "Colonne inconnue : customers.nom",
+        }
+        for sql, motif in cas.items():
+            with self.subTest(sql=sql):
+                self.assertIn(motif, self.garde.verifier_statique(sql) or "")
+
+
+class TestSqlGuardPlan(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        seed_db(self.db)
+        tables = tables_depuis_metadata(Base.metadata)
+        for t in tables:
+            t.lignes = 1000
+        # Toutes les tables comptent comme « grosses »
+        self.garde = SqlGuard(tables, large_table_rows=10, max_full_scans=1)
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_join_on_key_is_accepted(self):
+        sql = ("SELECT p.category, SUM(o.total_amount) FROM orders o "
+               "JOIN products p ON p.id = o.product_id GROUP BY p.category")
+        self.assertIsNone(self.garde.verifier(self.db, sql))
+
+    def test_cartesian_join_is_rejected(self):
+        erreur = self.garde.verifier(self.db, "SELECT COUNT(*) FROM orders o, customers c")
+        self.assertIn("répété pour chaque ligne", erreur)
+
+    def test_correlated_subquery_scanning_large_table_is_rejected(self):
+        sql = ("SELECT c.name, (SELECT SUM(o.total_amount) FROM orders o WHERE o.quantity > c.id) "
+               "FROM customers c")
+        self.assertIn("répété pour chaque ligne", self.garde.verifier(self.db, sql))
+
+    def test_too_many_full_scans_are_rejected(self):
+        sql = "SELECT (SELECT SUM(price) FROM products) + (SELECT SUM(quantity) FROM orders)"
+        self.assertIn("Trop de parcours complets", self.garde.verifier(self.db, sql))
+
+    def test_compilation_errors_are_reported(self):
+        self.assertEqual(self.garde.verifier(self.db, "SELECT nom FROM customers"), "no such column: nom")
+
+    def test_timeout_interrupts_long_query(self):
+        sql = ("WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) "
+               "SELECT COUNT(*) FROM (SELECT i FROM n LIMIT 100000000)")
+        with self.assertRaises(DelaiDepasse):
+            with delai_max(self.db, 0.05):
+                self.db.execute(text(sql)).scalar()
+        # Le handler est retiré : les requêtes suivantes ne sont plus interrompues
+        self.assertEqual(self.db.execute(text("SELECT COUNT(*) FROM orders")).scalar(), 250)
+
+
+class TestDelaiServeur(unittest.TestCase):
+    def _session(self, dialecte):
+        db = MagicMock()
+        db.get_bind.return_value.dialect.name = dialecte
+        return db
+
+    def _instructions(self, db):
+        return [str(appel.args[0]) for appel in db.execute.call_args_list]
+
+    def test_postgresql_sets_local_statement_timeout(self):
+        # Arrange
+        db = self._session("postgresql")
+
+        # Act
+        with delai_max(db, 2.5):
+            pass
+
+        # Assert
+        self.assertEqual(self._instructions(db), ["SET LOCAL statement_timeout = 2500",
+                                                  "SET LOCAL statement_timeout TO DEFAULT"])
+
+    def test_postgresql_cancellation_raises_timeout(self):
+        # Arrange
+        db = self._session("postgresql")
+        annulee = OperationalError("SELECT ...", {}, Exception("canceling statement due to statement timeout"))
+
+        # Act
+        with self.assertRaises(DelaiDepasse):
+            with delai_max(db, 1):
+                raise annulee
+
+        # Assert : transaction avortée, aucune instruction après l'erreur
+        self.assertEqual(self._instructions(db), ["SET LOCAL statement_timeout = 1000"])
+
+    def test_mysql_restores_session_timeout_after_error(self):
+        # Arrange
+        db = self._session("mysql")
+
+        # Act
+        with self.assertRaises(OperationalError):
+            with delai_max(db, 1):
+                raise OperationalError("SELECT ...", {}, Exception("Unknown column 'nom'"))
+
+        # Assert
+        self.assertEqual(self._instructions(db), ["SET SESSION max_execution_time = 1000",
+                                                  "SET SESSION max_execution_time = DEFAULT"])
+
+
+if __name__ == "__main__":
+    unittest.main()
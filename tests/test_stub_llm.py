@@ -0,0 +1,48 @@
+import json
+import unittest
+
+from fastapi.testclient import TestClient
+
+from benchmarks.stub_llm import QUESTIONS_SQL, REPONSE_CHAT, creer_app, repondre
+
+
+class TestStubLLM(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(creer_app(latency_ms=0, token_delay_ms=0))
+
+    def test_known_question_gets_its_canned_sql(self):
+        # Arrange
+        question, sql = QUESTIONS_SQL[0]
+
+        # Act
+        contenu = repondre(f'Tu es un expert SQL spécialisé en SQLite.\n"{question} (requête 7)"')
+
+        # Assert
+        self.assertEqual(contenu, sql)
+        self.assertEqual(repondre('Tu es un expert SQL.\n"Quel temps fait-il ?"'), "NON_LIE")
+        self.assertEqual(repondre("Tu es un assistant intelligent."), REPONSE_CHAT)
+
+    def test_completion_follows_openai_format_with_usage(self):
+        # Act
+        reponse = self.client.post("/v1/chat/completions", json={
+            "model": "m", "messages": [{"role": "user", "content": "Tu es un assistant intelligent."}]})
+
+        # Assert
+        corps = reponse.json()
+        self.assertEqual(corps["choices"][0]["message"]["content"], REPONSE_CHAT)
+        self.assertGreater(corps["usage"]["prompt_tokens"], 0)
+
+    def test_streaming_sends_one_chunk_per_word_then_done(self):
+        # Act
+        reponse = self.client.post("/v1/chat/completions", json={
+            "model": "m", "stream": True, "messages": [{"role": "user", "content": "Bonjour"}]})
+
+        # Assert
+        lignes = [l[len("data: "):] for l in reponse.text.splitlines() if l.startswith("data: ")]
+        self.assertEqual(lignes[-1], "[DONE]")
+        texte = "".join(json.loads(l)["choices"][0]["delta"].get("content", "") for l in lignes[:-1])
+        self.assertEqual(texte, REPONSE_CHAT)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+from datetime import date, timedelta
+from decimal import Decimal
+
+from backend.summary import preparer_donnees, resumer_resultat
+
+
+def commandes(n):
+    villes = ["Paris", "Lyon", "Nantes"]
+    return [
+        {
+            "id": i,
+            "city": villes[i % 3],
+            "order_date": (date(2025, 1, 1) + timedelta(days=i % 90)).isoformat(),
+            "total_amount": Decimal(i) + Decimal("0.5"),
+        }
+        for i in range(n)
+    ]
+
+
+class TestSummary(unittest.TestCase):
+
+    def test_small_results_are_sent_unchanged(self):
+        data = [{"nombre": 60}]
+
+        prompt = preparer_donnees(data, token_budget=100)
+
+        self.assertFalse(prompt.resume)
+        self.assertEqual(prompt.texte, str(data))
+        self.assertEqual(prompt.reduction, 0.0)
+
+    def test_column_statistics(self):
+        resume = resumer_resultat(commandes(9), echantillon=0)
+
+        self.assertIn("9 lignes", resume)
+        self.assertIn("- total_amount (nombre) : min 0.50, max 8.50, moyenne 4.50, somme 40.50", resume)
+        self.assertIn("- order_date (date) : du 2025-01-01 au 2025-01-09", resume)
+        self.assertIn("- city (texte) : 3 valeurs distinctes", resume)
+        self.assertIn("Paris (3)", resume)
+
+    def test_large_results_are_summarized_within_budget(self):
+        # Act
+        prompt = preparer_donnees(commandes(1000), token_budget=400)
+
+        # Assert
+        self.assertTrue(prompt.resume)
+        self.assertLessEqual(prompt.tokens_envoyes, 400)
+        self.assertGreater(prompt.reduction, 0.95)
+
+
+if __name__ == "__main__":
+    unittest.main()